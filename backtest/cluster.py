@@ -0,0 +1,397 @@
+import hmac
+import ipaddress
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+import requests
+
+from backtest.shards import DAYS_PER_SHARD, _init, _map, plan_shards, shard_bounds
+from bars import CompactBars
+from config import BARS_DIR, COORDINATOR_HOST, COORDINATOR_PORT, JOB_ATTEMPTS, LEASE_SECONDS
+from connector import TIME_UNITS
+from logger import create_logger
+from strategies import StrategyConfig, StrategyFactory
+
+log = create_logger(__name__)
+
+PARAMS_PER_JOB = 16
+SHARDS_PER_JOB = 20
+POLL_SECONDS = 0.5  # idle worker retry while every remaining job is leased
+CONNECT_RETRIES = 20  # worker gives up after this many failed requests in a row
+
+
+# Jobs by id, leased to one worker at a time. A lease that fails or is not completed before its deadline goes back
+# to the front of the queue until the job used up its attempts, only the worker holding the lease can complete it.
+class JobQueue:
+    def __init__(self, jobs: list[dict], lease_seconds: float = LEASE_SECONDS, max_attempts: int = JOB_ATTEMPTS):
+        self.jobs = {job["id"]: job for job in jobs}
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.results: dict[int, dict] = {}
+        self.failed: dict[int, str] = {}  # job id: last error, the job used up its attempts
+        self.attempts: dict[int, int] = {job_id: 0 for job_id in self.jobs}
+
+        self._pending = deque(self.jobs)
+        self._leases: dict[int, tuple[str, float]] = {}  # job id: (worker, deadline)
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) == len(self.jobs)
+
+    @property
+    def finished(self) -> bool:
+        # Done, or a job failed for good and the sweep cannot complete
+        return self.done or bool(self.failed)
+
+    def _retry(self, job_id: int, error: str):
+        del self._leases[job_id]
+        if self.attempts[job_id] >= self.max_attempts:
+            log.error(f"Job {job_id} failed {self.attempts[job_id]} times, giving up: {error}")
+            self.failed[job_id] = error
+            self._cond.notify_all()
+        else:
+            log.warning(f"Job {job_id} requeued: {error}")
+            self._pending.appendleft(job_id)
+
+    def _expire(self, now: float):
+        for job_id, (worker, deadline) in list(self._leases.items()):
+            if deadline < now:
+                self._retry(job_id, f"lease lost by {worker}")
+
+    def lease(self, worker: str) -> Optional[dict]:
+        # None when nothing is pending right now, see `done` for the end of the queue
+        with self._cond:
+            now = time.monotonic()
+            self._expire(now)
+            if not self._pending:
+                return None
+            job_id = self._pending.popleft()
+            self._leases[job_id] = (worker, now + self.lease_seconds)
+            self.attempts[job_id] += 1
+            return self.jobs[job_id]
+
+    def holds(self, job_id: int, worker: str) -> bool:
+        return self._leases.get(job_id, (None,))[0] == worker
+
+    def complete(self, job_id: int, worker: str, result: dict) -> bool:
+        with self._cond:
+            if not self.holds(job_id, worker):
+                return False
+            self.results[job_id] = result
+            del self._leases[job_id]
+            self._cond.notify_all()
+            return True
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        with self._cond:
+            if not self.holds(job_id, worker):
+                return False
+            self._retry(job_id, f"{worker}: {error}")
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.finished:
+                remaining = POLL_SECONDS if deadline is None else min(POLL_SECONDS, deadline - time.monotonic())
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+                self._expire(time.monotonic())
+            return True
+
+    def progress(self) -> tuple[int, int]:
+        with self._cond:
+            return len(self.results), len(self.jobs)
+
+
+# Sweep over many hosts: (param chunk, shard group) jobs served over HTTP, workers lease a job, evaluate it on
+# their own copy of the bars (found by fingerprint) and post the trades back. A group is a fixed span of days, each
+# param combination brings its own shards within it (`plan_shards`). Results assemble in shard order so each param
+# combination gets the same trades as `ShardedBacktest.trades`.
+# Every request carries the shared CLUSTER_TOKEN (from .env) when one is set, serving beyond localhost requires it.
+class Coordinator:
+    def __init__(
+        self,
+        bars: CompactBars,
+        strategy: str,
+        trading_hours: tuple[int, int],
+        tf: tuple,
+        params: list[dict],
+        params_per_job: int = PARAMS_PER_JOB,
+        shards_per_job: int = SHARDS_PER_JOB,
+        days_per_shard: int = DAYS_PER_SHARD,
+        warmup: Optional[int] = None,
+        lease_seconds: float = LEASE_SECONDS,
+        token: Optional[str] = None,
+    ):
+        self.bars = bars
+        self.token = token or os.getenv("CLUSTER_TOKEN") or None
+        self.params = params
+        self.fingerprint = bars.fingerprint()
+        self._bars_body: Optional[bytes] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+        firsts = [first for _, first, _ in shard_bounds(bars, days_per_shard)]
+        self.groups = firsts[::shards_per_job]  # first row of each group
+
+        stra = StrategyFactory.create(strategy, bars, StrategyConfig(trading_hours=trading_hours))
+        plans = []
+        for p in params:
+            grouped = [[] for _ in self.groups]
+            for shard in plan_shards(stra, days_per_shard, warmup, **p):
+                grouped[int(np.searchsorted(self.groups, shard[1], side="right")) - 1].append(list(shard))
+            plans.append(grouped)
+
+        jobs = []
+        for offset in range(0, len(params), params_per_job):
+            for group in range(len(self.groups)):
+                jobs.append(
+                    {
+                        "id": len(jobs),
+                        "fingerprint": self.fingerprint,
+                        "strategy": strategy,
+                        "trading_hours": list(trading_hours),
+                        "tf": [tf[0], tf[1].value],
+                        "offset": offset,
+                        "group": group,
+                        "params": params[offset : offset + params_per_job],
+                        "shards": [plan[group] for plan in plans[offset : offset + params_per_job]],
+                    }
+                )
+        self.queue = JobQueue(jobs, lease_seconds)
+
+    def bars_body(self) -> bytes:
+        # npz of the bars for workers without a local copy, built once
+        if self._bars_body is None:
+            out = BytesIO()
+            self.bars.save(out)
+            self._bars_body = out.getvalue()
+        return self._bars_body
+
+    def serve(self, port: int = COORDINATOR_PORT, host: str = COORDINATOR_HOST) -> "Coordinator":
+        if not self.token and not _loopback(host):
+            raise ValueError(f"Serving jobs on {host} needs CLUSTER_TOKEN, anyone reaching the port could post results")
+        handler = type("CoordinatorHandler", (_CoordinatorHandler,), {"coordinator": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        threading.Thread(target=self._server.serve_forever, name="coordinator", daemon=True).start()
+        log.info(f"Coordinator on port {self.port}: {len(self.queue.jobs)} jobs, bars {self.fingerprint}")
+        return self
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def trades(self, timeout: Optional[float] = None) -> list[tuple[np.ndarray, np.ndarray]]:
+        # (ticks, days) per param combination, in `params` order, blocks until every job is in or one failed for good
+        if not self.queue.wait(timeout):
+            raise TimeoutError(f"{self.queue.progress()} jobs done")
+        if self.queue.failed:
+            job_id, error = next(iter(self.queue.failed.items()))
+            raise RuntimeError(f"Job {job_id} failed {self.queue.attempts[job_id]} times: {error}")
+
+        parts = [[None] * len(self.groups) for _ in self.params]
+        for job_id, result in self.queue.results.items():
+            job = self.queue.jobs[job_id]
+            for i, (ticks, days) in enumerate(result["trades"]):
+                parts[job["offset"] + i][job["group"]] = (ticks, days)
+
+        return [
+            (np.concatenate([np.asarray(p[0], dtype=np.int32) for p in row]), np.concatenate([np.asarray(p[1], dtype=np.int32) for p in row]))
+            for row in parts
+        ]
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "Coordinator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _valid_trades(trades, combinations: int) -> bool:
+    # [(ticks, days)] per param combination of the job, int lists of the same length
+    return (
+        isinstance(trades, list)
+        and len(trades) == combinations
+        and all(
+            isinstance(pair, list)
+            and len(pair) == 2
+            and all(isinstance(values, list) and all(type(v) is int for v in values) for values in pair)
+            and len(pair[0]) == len(pair[1])
+            for pair in trades
+        )
+    )
+
+
+def _loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    coordinator: Coordinator
+
+    def _authorized(self) -> bool:
+        token = self.coordinator.token
+        if token and not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}"):
+            self.send_error(401)
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        queue = self.coordinator.queue
+        if self.path == "/bars/" + self.coordinator.fingerprint:
+            self._send(200, self.coordinator.bars_body(), "application/octet-stream")
+        elif self.path == "/progress":
+            done, total = queue.progress()
+            self._json(200, {"done": done, "total": total})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        queue = self.coordinator.queue
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        if self.path == "/lease":
+            job = queue.lease(body.get("worker", self.client_address[0]))
+            if job is not None:
+                self._json(200, job)
+            else:
+                # 410 tells workers to exit, 204 to poll again
+                self._send(410 if queue.finished else 204, b"", "application/json")
+        elif self.path == "/result":
+            job = queue.jobs.get(body.get("id")) if isinstance(body, dict) else None
+            if job is None or not isinstance(body.get("worker"), str):
+                self.send_error(400)
+            elif "error" in body:
+                self._json(200, {"accepted": queue.fail(job["id"], body["worker"], str(body["error"]))})
+            elif not _valid_trades(body.get("trades"), len(job["params"])):
+                log.warning(f"Malformed result of job {job['id']} from {body['worker']}")
+                self.send_error(400)
+            else:
+                self._json(200, {"accepted": queue.complete(job["id"], body["worker"], body)})
+        else:
+            self.send_error(404)
+
+    def _json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+# Pulls jobs until the coordinator reports the queue finished. Bars come from the local store by fingerprint,
+# downloaded from the coordinator once when missing.
+class Worker:
+    def __init__(self, url: str, directory: str = BARS_DIR, name: Optional[str] = None, token: Optional[str] = None):
+        self.url = url.rstrip("/")
+        self.directory = directory
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.session = requests.Session()
+        token = token or os.getenv("CLUSTER_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._bars: dict[str, CompactBars] = {}
+
+    def path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.npz")
+
+    def bars(self, fingerprint: str) -> CompactBars:
+        if fingerprint in self._bars:
+            return self._bars[fingerprint]
+
+        path = self.path(fingerprint)
+        if not os.path.exists(path):
+            res = self.session.get(f"{self.url}/bars/{fingerprint}", timeout=60)
+            res.raise_for_status()
+            bars = CompactBars.load(BytesIO(res.content))
+            if bars.fingerprint() != fingerprint:
+                raise ValueError(f"Bars {fingerprint} arrived as {bars.fingerprint()}")
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            bars.save(tmp)
+            os.replace(tmp, path)
+
+        bars = CompactBars.load(path)
+        self._bars = {fingerprint: bars}
+        return bars
+
+    def process(self, job: dict) -> list[tuple[list, list]]:
+        _init(self.bars(job["fingerprint"]), job["strategy"], job["trading_hours"], (job["tf"][0], TIME_UNITS(job["tf"][1])))
+
+        trades = []
+        for params, shards in zip(job["params"], job["shards"]):
+            parts = [_map((params, tuple(shard))) for shard in shards]
+            trades.append(([t for p in parts for t in p[0].tolist()], [d for p in parts for d in p[1].tolist()]))
+        return trades
+
+    def run(self) -> int:
+        # Number of jobs done, returns when the queue is finished or the coordinator is gone
+        done, failures = 0, 0
+        while True:
+            try:
+                res = self.session.post(f"{self.url}/lease", json={"worker": self.name}, timeout=30)
+                if res.status_code == 410:
+                    return done
+                if res.status_code == 204:
+                    time.sleep(POLL_SECONDS)
+                    continue
+                res.raise_for_status()
+
+                job = res.json()
+                try:
+                    result = {"trades": self.process(job)}
+                except Exception as e:
+                    # Reported so the coordinator retries elsewhere or gives up, the worker keeps going
+                    log.exception(f"Job {job['id']} failed")
+                    result = {"error": repr(e)}
+                self.session.post(f"{self.url}/result", json={"id": job["id"], "worker": self.name, **result}, timeout=60).raise_for_status()
+                done, failures = done + ("trades" in result), 0
+            except requests.RequestException as e:
+                failures += 1
+                if failures >= CONNECT_RETRIES:
+                    log.warning(f"Coordinator {self.url} unreachable, stopping: {e}")
+                    return done
+                time.sleep(POLL_SECONDS)
+
+
+def _work(url: str, directory: str) -> int:
+    return Worker(url, directory).run()
+
+
+def run_workers(url: str, processes: int = 1, directory: str = BARS_DIR) -> list[multiprocessing.Process]:
+    # Several workers on this host, one process each, spawned since the coordinator may be serving from this process
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_work, args=(url, directory), daemon=True) for _ in range(max(1, processes))]
+    for worker in workers:
+        worker.start()
+    return workers
@@ -0,0 +1,61 @@
+import pandas as pd
+import vectorbt as vbt
+
+from config import TICK_SIZE
+
+TICK_VALUE = 12.5  # ES, USD per tick
+
+STAT_COLUMNS = [
+    "total_ticks",
+    "trades",
+    "wins",
+    "losses",
+    "win_rate",
+    "biggest_win",
+    "average_win",
+    "biggest_loss",
+    "average_loss",
+]
+
+
+def build_portfolio(df: pd.DataFrame, tf: tuple) -> vbt.Portfolio:
+    return vbt.Portfolio.from_signals(
+        df.close,
+        entries=df.long_entries,
+        exits=df.long_exits,
+        freq=f"{tf[0]}{tf[1].name.lower()[0]}",
+        size=1,
+        size_type="amount",
+    )
+
+
+def build_positions(positions) -> pd.DataFrame:
+    df = positions.records_readable
+    df["Ticks"] = ((df["Avg Exit Price"] - df["Avg Entry Price"]) / TICK_SIZE).astype(int)
+    df["Gain"] = df["Ticks"] * TICK_VALUE
+
+    return df
+
+
+def position_stats(positions: pd.DataFrame) -> dict:
+    sum_row = positions[["Ticks", "Gain"]].sum()
+
+    wins = positions[positions["Ticks"] >= 0]
+    losses = positions[positions["Ticks"] < 0]
+
+    biggest_win = wins["Ticks"].max()
+    average_win = wins["Ticks"].mean()
+    biggest_loss = losses["Ticks"].min()
+    average_loss = losses["Ticks"].mean()
+    # cum_win
+    return {
+        "total_ticks": sum_row["Ticks"],
+        "trades": positions.shape[0],
+        "wins": wins.shape[0],
+        "losses": losses.shape[0],
+        "win_rate": (wins.shape[0] / positions.shape[0]) if positions.shape[0] > 0 else 0,
+        "biggest_win": int(biggest_win) if not pd.isna(biggest_win) else "/",
+        "average_win": round(float(average_win), 2) if not pd.isna(average_win) else "/",
+        "biggest_loss": int(biggest_loss) if not pd.isna(biggest_loss) else "/",
+        "average_loss": round(float(average_loss), 2) if not pd.isna(average_loss) else "/",
+    }
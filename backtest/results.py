@@ -0,0 +1,113 @@
+import ast
+import glob
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.portfolio import STAT_COLUMNS
+from backtest.robustness import ROBUSTNESS_COLUMNS
+
+METRIC_COLUMNS = STAT_COLUMNS + ROBUSTNESS_COLUMNS
+
+
+def list_sweeps(directory: str = ".") -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, "_backtest_*.csv")), reverse=True)
+
+
+# Sweep output (`_backtest_*.csv`) indexed by parameter tuple.
+# Rows sit in a dense cube over the sorted values of each parameter, so lookups are a dict hit per axis and
+# slices are numpy views. The file is only read on first access.
+class SweepResults:
+    path: str
+
+    _keys: list[str]
+    _axes: dict[str, np.ndarray]
+    _frame: Optional[pd.DataFrame] = None
+    _rows: np.ndarray  # row position per cell, -1 where the combination is missing
+    _positions: dict[str, dict]  # value -> axis position, per key
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cubes = {}
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        self._ensure()
+        return self._frame
+
+    def _ensure(self):
+        if self._frame is None:
+            self._load()
+
+    def _load(self):
+        df = pd.read_csv(self.path)
+
+        if "params" in df:
+            # Older sweeps store params as a dict literal
+            params = pd.DataFrame([ast.literal_eval(p) for p in df.pop("params")], index=df.index)
+            df = pd.concat([params, df], axis=1)
+
+        self._keys = [c for c in df.columns if c not in METRIC_COLUMNS]
+        for col in METRIC_COLUMNS:
+            if col in df:
+                df[col] = pd.to_numeric(df[col], errors="coerce")  # "/" when there were no wins/losses
+
+        self._axes = {}
+        self._positions = {}
+        codes = []
+        for key in self._keys:
+            values, code = np.unique(df[key].values, return_inverse=True)
+            self._axes[key] = values
+            self._positions[key] = {v.item(): i for i, v in enumerate(values)}
+            codes.append(code)
+
+        self._rows = np.full([len(self._axes[k]) for k in self._keys], -1, dtype=np.int64)
+        self._rows[tuple(codes)] = np.arange(len(df))
+        self._frame = df.reset_index(drop=True)
+
+    @property
+    def keys(self) -> list[str]:
+        self._ensure()
+        return self._keys
+
+    @property
+    def axes(self) -> dict[str, np.ndarray]:
+        self._ensure()
+        return self._axes
+
+    @property
+    def metrics(self) -> list[str]:
+        return [c for c in self.frame.columns if c not in self.keys]
+
+    def _cell(self, params: dict) -> Optional[tuple]:
+        self._ensure()
+        try:
+            return tuple(self._positions[key][params[key]] for key in self.keys)
+        except KeyError:
+            return None
+
+    def row(self, params: dict) -> Optional[pd.Series]:
+        cell = self._cell(params)
+        if cell is None or self._rows[cell] < 0:
+            return None
+        return self.frame.iloc[self._rows[cell]]
+
+    def cube(self, metric: str) -> np.ndarray:
+        # Metric over all parameter axes, NaN where the combination is missing
+        if metric not in self._cubes:
+            self._ensure()
+            values = self.frame[metric].values.astype(np.float64)
+            cube = np.where(self._rows >= 0, values[self._rows], np.nan)
+            self._cubes[metric] = cube
+        return self._cubes[metric]
+
+    def slice(self, metric: str, free: list[str], fixed: dict) -> np.ndarray:
+        # Metric over the `free` axes (in that order) with every other param pinned by `fixed`
+        cube = self.cube(metric)
+        index = tuple(slice(None) if key in free else self._positions[key][fixed[key]] for key in self.keys)
+        view = cube[index]
+
+        remaining = [key for key in self.keys if key in free]
+        return np.transpose(view, [remaining.index(key) for key in free])
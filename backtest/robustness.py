@@ -0,0 +1,170 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from bars import day_codes
+
+RESAMPLES = 2000
+BLOCK_DAYS = 5  # consecutive days drawn together, keeps regime clustering
+SLIPPAGE_TICKS = 1  # max adverse ticks per fill, uniform in [0, max], two fills per trade
+CI = (5, 95)
+TOP = 200  # sweep rows checked, by win_rate
+
+ROBUSTNESS_COLUMNS = [
+    "shuffle_dd_p50",
+    "shuffle_dd_p95",
+    "boot_pnl_p5",
+    "boot_pnl_p50",
+    "boot_pnl_p95",
+    "boot_dd_p50",
+    "boot_dd_p95",
+    "loss_prob",
+]
+
+
+def trade_arrays(positions: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    # Ticks per trade in entry order and the local day of each entry, what the resamples need from `build_positions`
+    if not len(positions):
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+    positions = positions.sort_values("Entry Timestamp")
+    return positions["Ticks"].to_numpy(dtype=np.int32), day_codes(pd.to_datetime(positions["Entry Timestamp"]))
+
+
+def equity_stats(pnl: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Final PnL and max drawdown per row of a (resamples, trades) matrix, in ticks, equity starts at 0
+    equity = np.cumsum(pnl, axis=1, dtype=np.int32)
+    final = equity[:, -1].copy() if equity.shape[1] else np.zeros(len(equity), dtype=np.int32)
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 0, out=peak)
+    np.subtract(peak, equity, out=peak)
+    return final, peak.max(axis=1, initial=0)
+
+
+def max_drawdown(pnl: np.ndarray) -> np.ndarray:
+    return equity_stats(pnl)[1]
+
+
+def slippage(rng: np.random.Generator, shape: tuple, max_ticks: int) -> np.ndarray:
+    # Sum of two fills, each uniform in [0, max_ticks], looked up by inverse CDF from one random byte per trade.
+    # Exact when the (max_ticks + 1)^2 outcomes divide 256 (max_ticks 1, 3, 15), otherwise within 1/256
+    if not max_ticks:
+        return np.zeros(shape, dtype=np.int32)
+    fills = np.arange(max_ticks + 1)
+    outcomes = np.sort(np.add.outer(fills, fills).ravel()).astype(np.int32)
+    table = outcomes[np.arange(256) * len(outcomes) // 256]
+    return table[np.frombuffer(rng.bytes(int(np.prod(shape))), dtype=np.uint8)].reshape(shape)
+
+
+def orders(rng: np.random.Generator, n: int, size: int) -> np.ndarray:
+    # (n, size) random permutations, shared by every config of a sweep
+    return rng.random((n, size), dtype=np.float32).argsort(axis=1).astype(np.int32)
+
+
+def shuffle_drawdowns(
+    ticks: np.ndarray,
+    rng: np.random.Generator,
+    n: int = RESAMPLES,
+    max_slippage: int = SLIPPAGE_TICKS,
+    order: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    # Same trades in random order, PnL only moves by slippage, drawdown shows how much the order flattered the result.
+    # The entries below len(ticks) of a longer permutation are a uniform permutation of the trades
+    k = len(ticks)
+    if order is None or order.shape[1] < k:
+        order = orders(rng, n, k)
+    if order.shape[1] > k:
+        order = order[order < k].reshape(len(order), k)
+
+    pnl = ticks[order]
+    pnl -= slippage(rng, pnl.shape, max_slippage)
+    return max_drawdown(pnl)
+
+
+def block_bootstrap(
+    ticks: np.ndarray,
+    days: np.ndarray,
+    rng: np.random.Generator,
+    n: int = RESAMPLES,
+    block: int = BLOCK_DAYS,
+    max_slippage: int = SLIPPAGE_TICKS,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Resampled histories of the same length in days, (pnl, drawdown) per resample. Trades are sorted by day
+    _, first, counts = np.unique(days, return_index=True, return_counts=True)
+    n_days = len(counts)
+    block = max(1, min(block, n_days))
+
+    starts = rng.integers(0, n_days - block + 1, size=(n, -(-n_days // block)))
+    picks = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :n_days]
+
+    # Trades of the picked days back to back: day start plus the offset of each slot within its day
+    lens = counts[picks]
+    row_len = lens.sum(axis=1)
+    lens = lens.ravel()
+    total = int(row_len.sum())
+    # as a running sum: +1 within a day, a jump to the next day's first trade at each day boundary
+    starts = first[picks].ravel()
+    bounds = np.cumsum(lens) - lens
+    step = np.ones(total, dtype=np.int32)
+    step[bounds[1:]] = starts[1:] - (starts[:-1] + lens[:-1] - 1)
+    step[0] = starts[0]
+    trade = np.cumsum(step, dtype=np.int32)
+
+    # Rows padded with 0 after their last trade, sums and drawdowns are unaffected
+    pnl = np.zeros((n, row_len.max()), dtype=np.int32)
+    pnl[np.arange(row_len.max()) < row_len[:, None]] = ticks[trade] - slippage(rng, (total,), max_slippage)
+
+    return equity_stats(pnl)
+
+
+def robustness(
+    ticks: np.ndarray,
+    days: np.ndarray,
+    n: int = RESAMPLES,
+    block: int = BLOCK_DAYS,
+    max_slippage: int = SLIPPAGE_TICKS,
+    ci: tuple[int, int] = CI,
+    seed: Optional[int] = 0,
+    order: Optional[np.ndarray] = None,
+) -> dict:
+    if not len(ticks):
+        return {col: np.nan for col in ROBUSTNESS_COLUMNS}
+
+    rng = np.random.default_rng(seed)
+    lo, hi = ci
+
+    shuffle_dd = shuffle_drawdowns(ticks, rng, n, max_slippage, order)
+    boot_pnl, boot_dd = block_bootstrap(ticks, days, rng, n, block, max_slippage)
+
+    return {
+        "shuffle_dd_p50": float(np.percentile(shuffle_dd, 50)),
+        "shuffle_dd_p95": float(np.percentile(shuffle_dd, hi)),
+        "boot_pnl_p5": float(np.percentile(boot_pnl, lo)),
+        "boot_pnl_p50": float(np.percentile(boot_pnl, 50)),
+        "boot_pnl_p95": float(np.percentile(boot_pnl, hi)),
+        "boot_dd_p50": float(np.percentile(boot_dd, 50)),
+        "boot_dd_p95": float(np.percentile(boot_dd, hi)),
+        "loss_prob": float((boot_pnl < 0).mean()),
+    }
+
+
+def add_robustness(
+    results: pd.DataFrame, trades: list, top: int = TOP, metric: str = "win_rate", n: int = RESAMPLES, seed: int = 0, **kwargs
+) -> pd.DataFrame:
+    # Robustness columns for the `top` rows by `metric`, `trades[i]` are the trade_arrays of results row i
+    results = results.copy()
+    for col in ROBUSTNESS_COLUMNS:
+        results[col] = np.nan
+
+    rows = results[metric].nlargest(top).index
+    if not len(rows):
+        return results
+
+    order = orders(np.random.default_rng(seed), n, max(len(trades[i][0]) for i in rows))
+    for i in rows:
+        stats = robustness(*trades[i], n=n, seed=seed, order=order, **kwargs)
+        results.loc[i, ROBUSTNESS_COLUMNS] = [stats[col] for col in ROBUSTNESS_COLUMNS]
+
+    return results
@@ -0,0 +1,243 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+import click
+import numpy as np
+import pandas as pd
+
+from backtest.portfolio import build_portfolio, build_positions, position_stats
+from backtest.robustness import trade_arrays
+from bars import CompactBars
+from connector import TIME_UNITS
+from strategies import BaseStrategy, StrategyConfig, StrategyFactory
+from strategies.graph import Position
+
+DAYS_PER_SHARD = 5
+WARMUP_MARGIN = 30  # bars on top of the strategy's longest window, crossover state settling
+
+# (warm-up start, first row, end, entries minus exits before the first row per Position node)
+Shard = tuple[int, int, int, dict[str, int]]
+
+# Per worker process, set once by the pool initializer so tasks only carry params and row bounds
+_worker: dict = {}
+
+
+def _day_starts(day: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.append(True, day[1:] != day[:-1]))
+
+
+# Every `days_per_shard`-th day start as (warm-up start, first row, end) row bounds, the candidate shards of
+# `plan_shards` and the shard groups of the cluster.
+def shard_bounds(bars: CompactBars, days_per_shard: int = DAYS_PER_SHARD, warmup: int = 0) -> list[tuple[int, int, int]]:
+    firsts = _day_starts(bars.day)[::days_per_shard]
+    ends = np.append(firsts[1:], len(bars))
+    return [(max(0, int(first) - warmup), int(first), int(end)) for first, end in zip(firsts, ends)]
+
+
+def _flips(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    # Rows from which `from_signals` switches between flat and long: a lone entry opens when flat, a lone exit
+    # closes, an entry and an exit on the same bar are ignored
+    rows = np.flatnonzero(entries != exits)
+    flips, held = [], False
+    for row, entry in zip(rows.tolist(), entries[rows].tolist()):
+        if entry != held:
+            held = entry
+            flips.append(row + 1)
+    return np.asarray(flips, dtype=np.int64)
+
+
+def plan_shards(stra: BaseStrategy, days_per_shard: int = DAYS_PER_SHARD, warmup: Optional[int] = None, **params) -> list[Shard]:
+    # Shards of `params` over the strategy's bars from one serial pass of the graph (no portfolio), exact against a
+    # full run: exits while flat count across days (`Position`), so each shard carries those counts, and a trade
+    # held overnight would be cut at a day start, so shards only start where the full run is flat.
+    # The warm-up defaults to the longest window of the graph plus a margin
+    columns = stra.columns(**params)
+    warmup = stra.warmup(**params) + WARMUP_MARGIN if warmup is None else warmup
+
+    firsts = _day_starts(columns["day"])[::days_per_shard]
+    flips = _flips(columns["long_entries"], columns["long_exits"])
+    firsts = firsts[np.searchsorted(flips, firsts, side="right") % 2 == 0]
+    ends = np.append(firsts[1:], len(columns["day"]))
+
+    surplus = {}
+    for node in stra.graph.nodes:
+        if isinstance(node, Position):
+            entries, exits = (columns[name].astype(np.int64) for name in node.inputs)
+            surplus[node.name] = np.append(0, np.cumsum(entries - exits))[firsts].tolist()
+
+    return [
+        (max(0, int(first) - warmup), int(first), int(end), {name: counts[i] for name, counts in surplus.items()})
+        for i, (first, end) in enumerate(zip(firsts, ends))
+    ]
+
+
+def _init(bars: CompactBars, strategy: str, trading_hours: tuple[int, int], tf: tuple):
+    _worker.update(bars=bars, strategy=strategy, trading_hours=trading_hours, tf=tf)
+
+
+def _map(task: tuple[dict, Shard]) -> tuple[np.ndarray, np.ndarray]:
+    # Trades entered in the shard's own days as (ticks, day)
+    params, (start, first, end, carry) = task
+
+    stra = StrategyFactory.create(_worker["strategy"], _worker["bars"][start:end], StrategyConfig(trading_hours=_worker["trading_hours"]))
+    stra.carry = {name: (first - start, surplus) for name, surplus in carry.items()}
+    df = stra.run(**params).iloc[first - start :]
+
+    return trade_arrays(build_positions(build_portfolio(df, _worker["tf"]).positions))
+
+
+def day_stats(ticks: np.ndarray, days: np.ndarray) -> pd.DataFrame:
+    # Per local day of entry, the partial sums and extremes the sweep metrics reduce from
+    trades = pd.DataFrame({"day": days, "ticks": ticks.astype(np.int64)})
+    trades["win"] = trades["ticks"] >= 0
+    trades["win_ticks"] = trades["ticks"].where(trades["win"], 0)
+    trades["loss_ticks"] = trades["ticks"].where(~trades["win"], 0)
+    trades["biggest_win"] = trades["ticks"].where(trades["win"])
+    trades["biggest_loss"] = trades["ticks"].where(~trades["win"])
+
+    return trades.groupby("day").agg(
+        trades=("ticks", "size"),
+        wins=("win", "sum"),
+        ticks=("ticks", "sum"),
+        win_ticks=("win_ticks", "sum"),
+        loss_ticks=("loss_ticks", "sum"),
+        biggest_win=("biggest_win", "max"),
+        biggest_loss=("biggest_loss", "min"),
+    )
+
+
+def reduce_days(days: pd.DataFrame) -> dict:
+    # Same metrics as `position_stats`
+    trades, wins = int(days["trades"].sum()), int(days["wins"].sum())
+    losses = trades - wins
+    biggest_win, biggest_loss = days["biggest_win"].max(), days["biggest_loss"].min()
+
+    return {
+        "total_ticks": int(days["ticks"].sum()),
+        "trades": trades,
+        "wins": wins,
+        "losses": losses,
+        "win_rate": (wins / trades) if trades > 0 else 0,
+        "biggest_win": int(biggest_win) if not pd.isna(biggest_win) else "/",
+        "average_win": round(float(days["win_ticks"].sum() / wins), 2) if wins else "/",
+        "biggest_loss": int(biggest_loss) if not pd.isna(biggest_loss) else "/",
+        "average_loss": round(float(days["loss_ticks"].sum() / losses), 2) if losses else "/",
+    }
+
+
+# Map: strategy and portfolio per shard, reduce: per day stats into the usual sweep metrics.
+# Workers get the bars once, a sweep reuses the pool for every param combination. The shards of each combination
+# come from a serial pass over the full history here (`plan_shards`), which shares its indicator memo across the sweep.
+class ShardedBacktest:
+    def __init__(
+        self,
+        bars: CompactBars,
+        strategy: str,
+        trading_hours: tuple[int, int],
+        tf: tuple,
+        workers: Optional[int] = None,
+        days_per_shard: int = DAYS_PER_SHARD,
+        warmup: Optional[int] = None,
+    ):
+        self.days_per_shard = days_per_shard
+        self.warmup = warmup
+        self.workers = workers or os.cpu_count()
+        self._serial = StrategyFactory.create(strategy, bars, StrategyConfig(trading_hours=trading_hours))
+
+        self._pool: Optional[Executor] = None
+        if self.workers > 1:
+            # Spawned, the parent may already run threads (logging, profiler) that a fork would copy mid-state
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init,
+                initargs=(bars, strategy, trading_hours, tf),
+            )
+        else:
+            _init(bars, strategy, trading_hours, tf)
+
+    def shards(self, params: dict) -> list[Shard]:
+        return plan_shards(self._serial, self.days_per_shard, self.warmup, **params)
+
+    def trades(self, params: dict) -> tuple[np.ndarray, np.ndarray]:
+        tasks = [(params, shard) for shard in self.shards(params)]
+        if self._pool:
+            results = list(self._pool.map(_map, tasks, chunksize=max(1, len(tasks) // (4 * self.workers))))
+        else:
+            results = [_map(task) for task in tasks]
+
+        return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+    def run(self, params: dict) -> dict:
+        return reduce_days(day_stats(*self.trades(params)))
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown()
+
+    def __enter__(self) -> "ShardedBacktest":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def synthetic_bars(years: int = 5, seed: int = 0) -> CompactBars:
+    # 1 minute random walk on the ES tick grid, 23h sessions on weekdays, for scaling runs
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2020-01-01", periods=252 * years, tz="Europe/Berlin")
+    minutes = np.arange(23 * 60)
+    times = (days.values.astype("datetime64[ns]").view(np.int64)[:, None] + minutes[None, :] * 60_000_000_000).ravel()
+
+    close = 4 * 5000 + np.cumsum(rng.integers(-2, 3, size=len(times)))
+    open_ = np.append(close[0], close[:-1])
+    high = np.maximum(open_, close) + rng.integers(0, 3, size=len(times))
+    low = np.minimum(open_, close) - rng.integers(0, 3, size=len(times))
+
+    df = pd.DataFrame(
+        {
+            "time": pd.DatetimeIndex(times).tz_localize("UTC").tz_convert("Europe/Berlin"),
+            "open": open_ * 0.25,
+            "high": high * 0.25,
+            "low": low * 0.25,
+            "close": close * 0.25,
+            "volume": rng.integers(1, 500, size=len(times)),
+        }
+    )
+    return CompactBars.from_frame(df)
+
+
+@click.command()
+@click.option("--years", default=5, help="Years of synthetic 1 minute bars.")
+@click.option("--workers", "workers_list", default="1,2,4,8", help="Worker counts to time.")
+def bench(years: int, workers_list: str):
+    bars = synthetic_bars(years)
+    params = {"stop": 28, "fast_ma": 8, "slow_ma": 34}
+    tf = (1, TIME_UNITS.Minute)
+    print(f"{len(bars)} bars, {len(bars.days)} days, {os.cpu_count()} cpus")
+
+    started = time.perf_counter()
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[0, 22]))
+    full = position_stats(build_positions(build_portfolio(stra.run(**params), tf).positions))
+    print(f"full history: {time.perf_counter() - started:.1f}s, {full['trades']} trades")
+    del stra
+
+    for workers in [int(w) for w in workers_list.split(",")]:
+        with ShardedBacktest(bars, "DefaultStrategy", [0, 22], tf, workers=workers) as backtest:
+            started = time.perf_counter()
+            shards = backtest.shards(params)
+            planned = time.perf_counter() - started
+            stats = backtest.run(params)
+            elapsed = time.perf_counter() - started
+            diff = stats["trades"] - full["trades"], int(stats["total_ticks"] - full["total_ticks"])
+            print(
+                f"{workers} workers: {elapsed:.1f}s ({planned:.1f}s serial pass), {len(shards)} shards, "
+                f"{diff[0]:+d} trades {diff[1]:+d} ticks vs full"
+            )
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,114 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.shards import day_stats, reduce_days
+from bars.compact import NS_PER_DAY
+
+IN_SAMPLE_DAYS = 60
+OUT_OF_SAMPLE_DAYS = 10
+MIN_TRADES = 20  # in-sample trades a combination needs to be picked, fewer is noise
+
+SUMS = ("trades", "wins", "ticks")
+METRICS = ("total_ticks", "win_rate", "average_ticks", "trades")
+
+
+def _dates(days: np.ndarray) -> list:
+    return [d.date() for d in pd.to_datetime(np.asarray(days, dtype=np.int64) * NS_PER_DAY)]
+
+
+# Per param combination running sums over the trading days, built once from the sweep's trades.
+# Trades never cross days, so any window of whole days sums like a backtest of that window after warm-up and
+# costs two lookups per combination: overlapping windows share all the work of the sweep.
+class DayTable:
+    days: np.ndarray  # sorted day codes of the bars
+    sums: dict[str, np.ndarray]  # (combinations, days + 1) cumulative, column i holds days[:i]
+
+    def __init__(self, days: np.ndarray, trades: list[tuple[np.ndarray, np.ndarray]]):
+        self.days = np.asarray(days)
+        per_day = np.zeros((len(SUMS), len(trades), len(self.days) + 1), dtype=np.int64)
+        for i, (ticks, trade_days) in enumerate(trades):
+            cols = np.searchsorted(self.days, trade_days) + 1
+            np.add.at(per_day[0, i], cols, 1)
+            np.add.at(per_day[1, i], cols, ticks >= 0)
+            np.add.at(per_day[2, i], cols, ticks)
+        self.sums = dict(zip(SUMS, np.cumsum(per_day, axis=2)))
+
+    def window(self, name: str, lo: int, hi: int) -> np.ndarray:
+        # Sum over days[lo:hi] per combination
+        return self.sums[name][:, hi] - self.sums[name][:, lo]
+
+    def metric(self, name: str, lo: int, hi: int) -> np.ndarray:
+        trades = self.window("trades", lo, hi)
+        if name == "trades":
+            return trades.astype(np.float64)
+        if name == "total_ticks":
+            return self.window("ticks", lo, hi).astype(np.float64)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if name == "win_rate":
+                values = self.window("wins", lo, hi) / trades
+            elif name == "average_ticks":
+                values = self.window("ticks", lo, hi) / trades
+            else:
+                raise ValueError(f"Unknown walk-forward metric {name}, one of {METRICS}")
+        return np.where(trades > 0, values, 0.0)
+
+    def best(self, metric: str, lo: int, hi: int, min_trades: int = MIN_TRADES) -> Optional[int]:
+        # Index of the best combination over days[lo:hi], None when none traded enough
+        values = np.where(self.window("trades", lo, hi) >= min_trades, self.metric(metric, lo, hi), -np.inf)
+        i = int(np.argmax(values))
+        return i if np.isfinite(values[i]) else None
+
+
+def _select(trades: tuple[np.ndarray, np.ndarray], first: int, last: int) -> tuple[np.ndarray, np.ndarray]:
+    ticks, days = trades
+    mask = (days >= first) & (days <= last)
+    return ticks[mask], days[mask]
+
+
+def walk_forward(
+    params: list[dict],
+    trades: list[tuple[np.ndarray, np.ndarray]],
+    days: np.ndarray,
+    in_sample: int = IN_SAMPLE_DAYS,
+    out_of_sample: int = OUT_OF_SAMPLE_DAYS,
+    metric: str = "total_ticks",
+    min_trades: int = MIN_TRADES,
+) -> tuple[pd.DataFrame, dict]:
+    # Rolling windows of trading days: pick the best of the sweep on `in_sample` days, trade it on the next
+    # `out_of_sample`, advance by `out_of_sample`. `trades[i]` are the full history trade_arrays of `params[i]`.
+    # Returns one row per step and the stats of all out-of-sample trades chained together
+    table = DayTable(days, trades)
+    rows, chained = [], []
+
+    for step, lo in enumerate(range(0, len(table.days) - in_sample, out_of_sample)):
+        mid = lo + in_sample
+        hi = min(mid + out_of_sample, len(table.days))
+        best = table.best(metric, lo, mid, min_trades)
+
+        if best is None:
+            oos = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        else:
+            oos = _select(trades[best], table.days[mid], table.days[hi - 1])
+        chained.append(oos)
+
+        in_dates, out_dates = _dates(table.days[[lo, mid - 1]]), _dates(table.days[[mid, hi - 1]])
+        rows.append(
+            {
+                "step": step,
+                "in_sample_from": in_dates[0],
+                "in_sample_to": in_dates[1],
+                "out_of_sample_from": out_dates[0],
+                "out_of_sample_to": out_dates[1],
+                **(params[best] if best is not None else {key: None for key in params[0]}),
+                f"in_sample_{metric}": table.metric(metric, lo, mid)[best] if best is not None else None,
+                **reduce_days(day_stats(*oos)),
+            }
+        )
+
+    if not chained:
+        raise ValueError(f"{len(table.days)} days, need more than {in_sample} for a walk-forward step")
+    oos_ticks, oos_days = np.concatenate([c[0] for c in chained]), np.concatenate([c[1] for c in chained])
+    return pd.DataFrame(rows), reduce_days(day_stats(oos_ticks, oos_days))
@@ -0,0 +1,4 @@
+from bars.compact import CompactBars, day_codes, to_ticks
+from bars.calendar import Calendar, day_code
+from bars.buffer import BarBuffer, OutputBuffer
+from bars.store import HistoryStore
@@ -0,0 +1,266 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from bars.calendar import Calendar, calendar_fields
+from bars.compact import CompactBars
+
+MIN_CAPACITY = 1024
+
+
+# Preallocated, growable columnar bars backing `BaseStrategy.df`.
+# Prices live in a (4, capacity) float64 block so each column and the frame built on top are views, not copies.
+class BarBuffer:
+    time: np.ndarray  # int64 epoch nanos, UTC
+    prices: np.ndarray  # float64, rows: open, high, low, close
+    volume: np.ndarray  # int64
+    day: np.ndarray  # int32 local days since epoch, computed once per bar
+    hour: np.ndarray  # int8 local hour
+    tz: Optional[object]
+    max_history: Optional[int]
+    version: int  # bumped when bars are added or trimmed, keys the cached `Calendar`
+    revision: int  # bumped on any change, including prices of the last bar
+
+    COLUMNS = ["open", "high", "low", "close"]
+
+    def __init__(self, capacity: int = MIN_CAPACITY, tz=None, max_history: Optional[int] = None):
+        if max_history:
+            # Room for max_history more bars before compacting, keeps append amortized O(1)
+            capacity = max(capacity, 2 * max_history)
+        capacity = max(capacity, 1)
+
+        self.time = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty((4, capacity), dtype=np.float64)
+        self.volume = np.empty(capacity, dtype=np.int64)
+        self.day = np.empty(capacity, dtype=np.int32)
+        self.hour = np.empty(capacity, dtype=np.int8)
+        self.tz = tz
+        self.max_history = max_history
+        self.version = 0
+        self.revision = 0
+        self._start = 0
+        self._end = 0
+        self._calendar: Optional[tuple[int, Calendar]] = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, max_history: Optional[int] = None) -> "BarBuffer":
+        times = pd.to_datetime(df["time"])
+        tz = times.dt.tz
+        utc = times.dt.tz_convert("UTC").dt.tz_localize(None) if tz is not None else times
+        volume = df["volume"].fillna(0).values if "volume" in df else np.zeros(len(df), dtype=np.int64)
+
+        buffer = cls(max(MIN_CAPACITY, 2 * len(df)), tz=tz, max_history=max_history)
+        buffer.extend(
+            utc.values.astype("datetime64[ns]").view(np.int64),
+            np.vstack([df[col].values.astype(np.float64) for col in cls.COLUMNS]),
+            volume,
+        )
+        return buffer
+
+    @classmethod
+    def from_compact(cls, bars: CompactBars, max_history: Optional[int] = None) -> "BarBuffer":
+        # Ticks are scaled straight into the price rows, one column at a time, without a float64 copy of
+        # the whole (n, 4) block; day codes are taken from the compact bars, only hours are computed
+        if max_history and len(bars) > max_history:
+            bars = bars[-max_history:]
+        n = len(bars)
+
+        buffer = cls(max(MIN_CAPACITY, 2 * n), tz=bars.tz, max_history=max_history)
+        buffer.time[:n] = bars.time
+        for row in range(4):
+            np.multiply(bars.ohlc[:, row], bars.tick_size, out=buffer.prices[row, :n])
+        buffer.volume[:n] = bars.volume
+        buffer.day[:n] = bars.day
+        buffer.hour[:n] = calendar_fields(bars.time, bars.tz)[1]
+        buffer._end = n
+        buffer._trim()
+        return buffer
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        return self.time.shape[0]
+
+    def _reserve(self, n: int):
+        if self._end + n <= self.capacity:
+            return
+
+        size = len(self)
+        capacity = self.capacity
+        if size + n > capacity // 2:
+            capacity = max(2 * capacity, 2 * (size + n))
+
+        if capacity != self.capacity:
+            time = np.empty(capacity, dtype=np.int64)
+            prices = np.empty((4, capacity), dtype=np.float64)
+            volume = np.empty(capacity, dtype=np.int64)
+            day = np.empty(capacity, dtype=np.int32)
+            hour = np.empty(capacity, dtype=np.int8)
+        else:
+            time, prices, volume, day, hour = self.time, self.prices, self.volume, self.day, self.hour
+
+        # Compact live rows to the front (or into the new arrays)
+        time[:size] = self.time[self._start : self._end]
+        prices[:, :size] = self.prices[:, self._start : self._end]
+        volume[:size] = self.volume[self._start : self._end]
+        day[:size] = self.day[self._start : self._end]
+        hour[:size] = self.hour[self._start : self._end]
+
+        self.time, self.prices, self.volume, self.day, self.hour = time, prices, volume, day, hour
+        self._start, self._end = 0, size
+        self.version += 1
+        self.revision += 1
+
+    def _trim(self):
+        if self.max_history and len(self) > self.max_history:
+            self._start = self._end - self.max_history
+        self.version += 1
+        self.revision += 1
+
+    def extend(self, time: np.ndarray, prices: np.ndarray, volume: np.ndarray):
+        if self.max_history and len(time) > self.max_history:
+            time, prices, volume = time[-self.max_history :], prices[:, -self.max_history :], volume[-self.max_history :]
+
+        n = len(time)
+        self._reserve(n)
+        self.time[self._end : self._end + n] = time
+        self.prices[:, self._end : self._end + n] = prices
+        self.volume[self._end : self._end + n] = volume
+        self.day[self._end : self._end + n], self.hour[self._end : self._end + n] = calendar_fields(time, self.tz)
+        self._end += n
+        self._trim()
+
+    def append(self, time: pd.Timestamp, open_: float, high: float, low: float, close: float, volume: int = 0):
+        self._reserve(1)
+        i = self._end
+        self.time[i] = pd.Timestamp(time).value
+        self.prices[:, i] = (open_, high, low, close)
+        self.volume[i] = volume
+        (self.day[i],), (self.hour[i],) = calendar_fields(self.time[i : i + 1], self.tz)
+        self._end += 1
+        self._trim()
+
+    def update_last(self, high: float, low: float, close: float, volume: int = 0):
+        # Merges a partial bar into the last one, in place
+        i = self._end - 1
+        self.prices[1, i] = max(self.prices[1, i], high)
+        self.prices[2, i] = min(self.prices[2, i], low)
+        self.prices[3, i] = close
+        self.volume[i] += volume
+        self.revision += 1
+
+    def set_last(self, open_: float, high: float, low: float, close: float, volume: int = 0):
+        # Overwrites the last bar, e.g. with the server's version after missed trades
+        i = self._end - 1
+        self.prices[:, i] = (open_, high, low, close)
+        self.volume[i] = volume
+        self.revision += 1
+
+    def column(self, key: str) -> np.ndarray:
+        if key in ("time", "volume", "day", "hour"):
+            return getattr(self, key)[self._start : self._end]
+        return self.prices[self.COLUMNS.index(key), self._start : self._end]
+
+    def calendar(self) -> Calendar:
+        # Same instance until bars are added or trimmed, so session masks are computed once per dataset
+        if self._calendar is None or self._calendar[0] != self.version:
+            self._calendar = (self.version, Calendar(self.column("day"), self.column("hour")))
+        return self._calendar[1]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.prices[3, self._start : self._end]
+
+    def last_time(self) -> pd.Timestamp:
+        ts = pd.Timestamp(self.time[self._end - 1], tz="UTC")
+        return ts.tz_convert(self.tz) if self.tz is not None else ts.tz_localize(None)
+
+    def index(self) -> pd.DatetimeIndex:
+        utc = pd.DatetimeIndex(self.column("time").view("datetime64[ns]")).tz_localize("UTC")
+        return utc.tz_convert(self.tz) if self.tz is not None else utc.tz_localize(None)
+
+    def frame(self, outputs: Optional[dict[str, np.ndarray]] = None) -> pd.DataFrame:
+        # Same layout as `Connector.get_bars` plus `outputs` columns, built without copying:
+        # price, volume and output columns are views, valid until the buffer or the outputs change
+        index = self.index().rename("time")
+
+        columns = {"time": index}
+        columns.update({key: self.column(key) for key in self.COLUMNS + ["volume"]})
+        columns["t_original"] = index.tz_convert("UTC") if self.tz is not None else index
+        columns.update(outputs or {})
+
+        return pd.DataFrame(columns, index=index, copy=False)
+
+
+def _blank(dtype: np.dtype):
+    return np.nan if dtype.kind == "f" else 0
+
+
+# Strategy outputs by bar time, aligned to a `BarBuffer`. Columns are preallocated and overwritten in place
+# by every run, so sweeps over the same bars reuse the same memory.
+class OutputBuffer:
+    time: np.ndarray  # int64 epoch nanos of each row
+    columns: dict[str, np.ndarray]
+
+    def __init__(self, capacity: int = MIN_CAPACITY):
+        self.time = np.empty(max(capacity, 1), dtype=np.int64)
+        self.columns = {}
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    @property
+    def capacity(self) -> int:
+        return self.time.shape[0]
+
+    def _grow(self, n: int):
+        if n <= self.capacity:
+            return
+        capacity = max(2 * self.capacity, n)
+        time = np.empty(capacity, dtype=np.int64)
+        time[: self._len] = self.time[: self._len]
+        self.time = time
+        for name, values in self.columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[: self._len] = values[: self._len]
+            self.columns[name] = grown
+
+    def align(self, times: np.ndarray):
+        # Follows the bars: rows trimmed from the front are dropped, appended ones start blank
+        n = len(times)
+        drop = int(np.searchsorted(self.time[: self._len], times[0])) if n and self._len else self._len
+        keep = self._len - drop
+        if drop:
+            self.time[:keep] = self.time[drop : self._len]
+            for values in self.columns.values():
+                values[:keep] = values[drop : self._len]
+
+        keep = min(keep, n)
+        self._grow(n)
+        self.time[keep:n] = times[keep:]
+        for values in self.columns.values():
+            values[keep:n] = _blank(values.dtype)
+        self._len = n
+
+    def retain(self, names: list[str]):
+        self.columns = {name: values for name, values in self.columns.items() if name in names}
+
+    def write(self, name: str, values: np.ndarray, start: int = 0):
+        values = np.asarray(values)
+        column = self.columns.get(name)
+        if column is None or column.dtype != values.dtype:
+            column = self.columns[name] = np.empty(self.capacity, dtype=values.dtype)
+        column[start : start + len(values)] = values
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name][: self._len]
+
+    def views(self) -> dict[str, np.ndarray]:
+        return {name: values[: self._len] for name, values in self.columns.items()}
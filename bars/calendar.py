@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from bars.compact import NS_PER_DAY
+
+
+def calendar_fields(time: np.ndarray, tz=None) -> tuple[np.ndarray, np.ndarray]:
+    # Local day codes (days since epoch) and hours of UTC epoch nanos
+    index = pd.DatetimeIndex(np.asarray(time, dtype=np.int64).view("datetime64[ns]")).tz_localize("UTC")
+    if tz is not None:
+        index = index.tz_convert(tz)
+    local = index.tz_localize(None).asi8
+    return (local // NS_PER_DAY).astype(np.int32), index.hour.to_numpy().astype(np.int8)
+
+
+def day_code(value) -> int:
+    # Wall clock date of a date or timestamp, same codes as `calendar_fields`
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_localize(None)
+    return int(ts.normalize().value // NS_PER_DAY)
+
+
+# Calendar facts of one set of bars: day codes, hours, per day row bounds and session masks by trading hours.
+# Built once per dataset (`BarBuffer.calendar`) and shared by strategy nodes, backtests and the dashboard.
+# `day` and `hour` are views of the buffer, masks are cached per window and read-only.
+class Calendar:
+    day: np.ndarray  # int32 local days since epoch
+    hour: np.ndarray  # int8 local hour
+
+    def __init__(self, day: np.ndarray, hour: np.ndarray):
+        self.day = day
+        self.hour = hour
+        self._bounds: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._sessions: dict[tuple[int, int], np.ndarray] = {}
+        self._closes: dict[tuple[int, int], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.day.shape[0]
+
+    def bounds(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (day codes, first row, end row) of each day present
+        if self._bounds is None:
+            starts = np.flatnonzero(np.diff(self.day, prepend=self.day[:1] - 1))
+            ends = np.append(starts[1:], len(self.day))
+            self._bounds = (self.day[starts], starts, ends)
+        return self._bounds
+
+    @property
+    def days(self) -> np.ndarray:
+        return self.bounds()[0]
+
+    def day_rows(self, day: int) -> tuple[int, int]:
+        days, starts, ends = self.bounds()
+        i = int(np.searchsorted(days, day))
+        if i == len(days) or days[i] != day:
+            return 0, 0
+        return int(starts[i]), int(ends[i])
+
+    def session(self, hours: tuple[int, int]) -> np.ndarray:
+        # Bar hour within [start, end)
+        key = (int(hours[0]), int(hours[1]))
+        mask = self._sessions.get(key)
+        if mask is None:
+            mask = self._sessions[key] = (self.hour >= key[0]) & (self.hour < key[1])
+            mask.flags.writeable = False
+        return mask
+
+    def session_close(self, hours: tuple[int, int]) -> np.ndarray:
+        # Last in-session bar of each day, the last bar counts as closing
+        key = (int(hours[0]), int(hours[1]))
+        mask = self._closes.get(key)
+        if mask is None:
+            allowed = self.session(key)
+            continues = np.append((self.day[1:] == self.day[:-1]) & allowed[1:], False)
+            mask = self._closes[key] = allowed & ~continues
+            mask.flags.writeable = False
+        return mask
+
+    def dates(self) -> list[date]:
+        return [d.date() for d in pd.to_datetime(self.days.astype(np.int64) * NS_PER_DAY)]
+
+    def disabled_dates(self) -> list[date]:
+        # Days between the first and the last bar without any bars
+        if not len(self.day):
+            return []
+        all_days = np.arange(self.days[0], self.days[-1] + 1)
+        missing = np.setdiff1d(all_days, self.days)
+        return [d.date() for d in pd.to_datetime(missing.astype(np.int64) * NS_PER_DAY)]
@@ -0,0 +1,160 @@
+import hashlib
+from datetime import timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import TICK_SIZE
+
+NS_PER_DAY = 86_400_000_000_000
+
+
+def day_codes(times: pd.Series) -> np.ndarray:
+    # Local calendar day as days since epoch, cheap replacement for object `dt.date` columns
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    return (times.values.astype("datetime64[ns]").view(np.int64) // NS_PER_DAY).astype(np.int32)
+
+
+def to_ticks(prices, tick_size: float = TICK_SIZE) -> np.ndarray:
+    prices = np.asarray(prices, dtype=np.float64)
+    ticks = np.rint(prices / tick_size)
+    if not np.allclose(ticks * tick_size, prices, rtol=0, atol=tick_size * 1e-6, equal_nan=False):
+        raise ValueError(f"Prices are not aligned to tick size {tick_size}")
+    return ticks.astype(np.int32)
+
+
+def _tz_name(tz) -> Optional[str]:
+    if tz is None:
+        return None
+    if isinstance(tz, timezone):
+        return f"offset:{int(tz.utcoffset(None).total_seconds())}"
+    return str(tz)
+
+
+def _tz_from_name(name: Optional[str]):
+    if not name:
+        return None
+    if name.startswith("offset:"):
+        return timezone(timedelta(seconds=int(name.split(":")[1])))
+    return name
+
+
+# OHLCV bars as int32 price ticks, int64 epoch nanos (UTC) and int32 local day codes.
+# Pandas objects are only built on demand (`to_frame`, `price`, `index`).
+class CompactBars:
+
+    time: np.ndarray  # int64 epoch nanos, UTC
+    ohlc: np.ndarray  # int32 ticks, shape (n, 4)
+    volume: np.ndarray  # int32
+    day: np.ndarray  # int32 local days since epoch
+    tick_size: float
+    tz: Optional[object]
+
+    COLUMNS = ["open", "high", "low", "close"]
+
+    def __init__(self, time, ohlc, volume, day, tick_size: float = TICK_SIZE, tz=None):
+        self.time = time
+        self.ohlc = ohlc
+        self.volume = volume
+        self.day = day
+        self.tick_size = tick_size
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, tick_size: float = TICK_SIZE) -> "CompactBars":
+        times = pd.to_datetime(df["time"])
+        tz = times.dt.tz
+
+        utc = times.dt.tz_convert("UTC").dt.tz_localize(None) if tz is not None else times
+        time = utc.values.astype("datetime64[ns]").view(np.int64).copy()
+
+        ohlc = np.empty((len(df), 4), dtype=np.int32)
+        for i, col in enumerate(cls.COLUMNS):
+            ohlc[:, i] = to_ticks(df[col].values, tick_size)
+
+        volume = df["volume"].values.astype(np.int32) if "volume" in df else np.zeros(len(df), dtype=np.int32)
+
+        return cls(time, ohlc, volume, day_codes(times), tick_size, tz)
+
+    def __len__(self) -> int:
+        return self.time.shape[0]
+
+    def __getitem__(self, key: slice) -> "CompactBars":
+        # Slices are views, no copy
+        return CompactBars(self.time[key], self.ohlc[key], self.volume[key], self.day[key], self.tick_size, self.tz)
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + self.ohlc.nbytes + self.volume.nbytes + self.day.nbytes
+
+    @property
+    def days(self) -> np.ndarray:
+        return np.unique(self.day)
+
+    def day_bounds(self, day: int) -> tuple[int, int]:
+        return int(np.searchsorted(self.day, day, side="left")), int(np.searchsorted(self.day, day, side="right"))
+
+    def price(self, column: str) -> np.ndarray:
+        return self.ohlc[:, self.COLUMNS.index(column)] * self.tick_size
+
+    def index(self) -> pd.DatetimeIndex:
+        utc = pd.DatetimeIndex(self.time.view("datetime64[ns]")).tz_localize("UTC")
+        return utc.tz_convert(self.tz) if self.tz is not None else utc.tz_localize(None)
+
+    def to_frame(self) -> pd.DataFrame:
+        # Same layout as `Connector.get_bars`: time index, local `time` and UTC `t_original`
+        index = self.index().rename("time")
+        prices = self.ohlc * self.tick_size
+
+        df = pd.DataFrame(prices, index=index, columns=self.COLUMNS)
+        df.insert(0, "time", index)
+        df["volume"] = self.volume.astype(np.int64)
+        df["t_original"] = index.tz_convert("UTC") if self.tz is not None else index
+
+        return df
+
+    def fingerprint(self) -> str:
+        # Content hash, equal bars give equal fingerprints on any host
+        digest = hashlib.sha256()
+        for array in (self.time, self.ohlc, self.volume, self.day):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update(f"{self.tick_size}|{_tz_name(self.tz) or ''}".encode())
+        return digest.hexdigest()[:20]
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            time=self.time,
+            ohlc=self.ohlc,
+            volume=self.volume,
+            day=self.day,
+            tick_size=self.tick_size,
+            tz=_tz_name(self.tz) or "",
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CompactBars":
+        with np.load(path) as data:
+            return cls(
+                data["time"],
+                data["ohlc"],
+                data["volume"],
+                data["day"],
+                float(data["tick_size"]),
+                _tz_from_name(str(data["tz"])),
+            )
+
+    @classmethod
+    def concat(cls, parts: list["CompactBars"]) -> "CompactBars":
+        # Parts in time order, same tick size and timezone
+        first = parts[0]
+        return cls(
+            np.concatenate([p.time for p in parts]),
+            np.concatenate([p.ohlc for p in parts]),
+            np.concatenate([p.volume for p in parts]),
+            np.concatenate([p.day for p in parts]),
+            first.tick_size,
+            first.tz,
+        )
@@ -0,0 +1,165 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from bars.compact import CompactBars
+from config import HISTORY_DIR, LOCAL_TIMEZONE, PREFETCH_WORKERS, TICK_SIZE
+
+CHUNK_DAYS = 7  # 10k 1 minute bars, one request each
+EMPTY_CHUNK_TTL = pd.Timedelta(hours=24)  # an empty reply is asked again after this, it may be transient or early
+
+EPOCH = pd.Timestamp(0, tz="UTC")
+
+# (start, end) -> bars of [start, end) as a frame with time, open, high, low, close, volume columns
+Retrieve = Callable[[pd.Timestamp, pd.Timestamp], pd.DataFrame]
+
+
+def utc(value) -> pd.Timestamp:
+    # API times are UTC, naive values included
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+
+def chunk_bounds(start: pd.Timestamp, end: pd.Timestamp, days: int = CHUNK_DAYS) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    # Fixed grid from the epoch, so any range maps to the same chunk files
+    step = pd.Timedelta(days=days)
+    first = EPOCH + ((start - EPOCH) // step) * step
+    starts = pd.date_range(first, end, freq=step, inclusive="left" if end > first else "both")
+    return [(s, s + step) for s in starts]
+
+
+def _empty(tz) -> CompactBars:
+    return CompactBars(
+        np.empty(0, dtype=np.int64),
+        np.empty((0, 4), dtype=np.int32),
+        np.empty(0, dtype=np.int32),
+        np.empty(0, dtype=np.int32),
+        TICK_SIZE,
+        tz,
+    )
+
+
+# Downloaded bars per series (`key`, e.g. contract and timeframe) in fixed UTC chunks, `directory/key/<start>.npz`.
+# A chunk is written atomically once its range is in the past, so an interrupted download resumes from the chunks on disk.
+# The chunk still in progress is fetched for the requested range only and never stored. A past chunk without bars only
+# leaves an `<start>.empty` marker, fetched again once older than EMPTY_CHUNK_TTL.
+class HistoryStore:
+    def __init__(self, directory: str = HISTORY_DIR, chunk_days: int = CHUNK_DAYS, tz=LOCAL_TIMEZONE):
+        self.directory = directory
+        self.chunk_days = chunk_days
+        self.tz = tz
+
+    def path(self, key: str, start: pd.Timestamp) -> str:
+        return os.path.join(self.directory, key, f"{start:%Y%m%d}.npz")
+
+    def empty_path(self, key: str, start: pd.Timestamp) -> str:
+        return os.path.join(self.directory, key, f"{start:%Y%m%d}.empty")
+
+    def _known_empty(self, key: str, start: pd.Timestamp) -> bool:
+        try:
+            written = os.path.getmtime(self.empty_path(key, start))
+        except OSError:
+            return False
+        return pd.Timestamp.now(tz="UTC") - pd.Timestamp(written, unit="s", tz="UTC") < EMPTY_CHUNK_TTL
+
+    def chunks(self, start, end) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        return chunk_bounds(utc(start), utc(end), self.chunk_days)
+
+    def missing(self, key: str, start, end) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        return [
+            chunk
+            for chunk in self.chunks(start, end)
+            if not os.path.exists(self.path(key, chunk[0])) and not self._known_empty(key, chunk[0])
+        ]
+
+    def fill(
+        self,
+        key: str,
+        start,
+        end,
+        retrieve: Retrieve,
+        workers: int = PREFETCH_WORKERS,
+        progress: bool = False,
+    ) -> dict[pd.Timestamp, CompactBars]:
+        # Downloads the missing chunks, at most `workers` requests in flight. Returns the open (unstored) chunks by start.
+        # On the first failure pending chunks are dropped, the finished ones stay on disk for the next attempt
+        now = pd.Timestamp.now(tz="UTC")
+        start, end = utc(start), utc(end)
+        open_chunks = {}
+
+        chunks = self.missing(key, start, end)
+        if not chunks:
+            return open_chunks
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            futures = {pool.submit(self._fetch, key, chunk, retrieve, now, start): chunk for chunk in chunks}
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures), desc=key, unit="chunk", disable=not progress):
+                    bars = future.result()
+                    if bars is not None:
+                        open_chunks[futures[future][0]] = bars
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+        return open_chunks
+
+    def _fetch(self, key: str, chunk: tuple, retrieve: Retrieve, now: pd.Timestamp, start: pd.Timestamp) -> Optional[CompactBars]:
+        chunk_start, chunk_end = chunk
+        complete = chunk_end <= now
+        fetch_start = chunk_start if complete else max(chunk_start, start)
+
+        df = retrieve(fetch_start, chunk_end if complete else now)
+        times = pd.to_datetime(df["time"], utc=True)
+        df = df[(times >= fetch_start) & (times < chunk_end)].drop_duplicates("time")
+        bars = self._compact(df)
+
+        if not complete:
+            return bars
+
+        if not len(bars):
+            with open(self.empty_path(key, chunk_start), "w"):
+                pass
+            return None
+
+        path = self.path(key, chunk_start)
+        tmp = path + ".tmp.npz"
+        bars.save(tmp)
+        os.replace(tmp, path)
+        if os.path.exists(self.empty_path(key, chunk_start)):
+            os.remove(self.empty_path(key, chunk_start))
+        return None
+
+    def _compact(self, df: pd.DataFrame) -> CompactBars:
+        if not len(df):
+            return _empty(self.tz)
+        df = df.assign(time=pd.to_datetime(df["time"], utc=True).dt.tz_convert(self.tz)).sort_values("time")
+        return CompactBars.from_frame(df)
+
+    def load(self, key: str, start, end, open_chunks: Optional[dict] = None) -> CompactBars:
+        # Bars in [start, end) from the stored chunks and the open ones of a `fill`
+        start, end = utc(start), utc(end)
+        open_chunks = open_chunks or {}
+
+        parts = []
+        for chunk_start, _ in self.chunks(start, end):
+            if chunk_start in open_chunks:
+                parts.append(open_chunks[chunk_start])
+            elif os.path.exists(self.path(key, chunk_start)):
+                parts.append(CompactBars.load(self.path(key, chunk_start)))
+
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return _empty(self.tz)
+
+        bars = CompactBars.concat(parts)
+        lo, hi = np.searchsorted(bars.time, [start.value, end.value])
+        return bars[lo:hi]
+
+    def get(self, key: str, start, end, retrieve: Retrieve, workers: int = PREFETCH_WORKERS, progress: bool = False) -> CompactBars:
+        return self.load(key, start, end, self.fill(key, start, end, retrieve, workers, progress))
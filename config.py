@@ -3,10 +3,38 @@ APP_NAME = "Radx"
 API_URL = "https://api.topstepx.com"
 MARKET_HUB_URL = "wss://rtc.topstepx.com/hubs/market"
 USER_HUB_URL = "wss://rtc.topstepx.com/hubs/user"
+MARKET_HUB_PROTOCOL = "json"  # or "messagepack", binary frames with native timestamps
 
 LIVE_DATA = False
+LIVE_MAX_HISTORY = 5000  # bars kept by the live strategy, ~2 weeks of 3 minute bars
 LOCAL_TIMEZONE = "Europe/Berlin"
 
+DAEMON_PORT = 8051  # read-only state endpoint of the headless daemon, localhost only
+DAEMON_DIR = "_daemon"  # checkpoint for restart recovery
+
+TRACE_DIR = "_traces"  # per bar tick-to-order traces of trading sessions, see `trading.tracing`
+TRACE_CAPACITY = 20_000  # bars kept in the trace ring, ~6 weeks of 3 minute bars
+
+PROFILE_DIR = "_profile"  # collapsed stacks and summaries of `--profile` runs
+PROFILE_INTERVAL_MS = 10  # stack sampling period
+
+HISTORY_DIR = "_data/history"  # downloaded bars in weekly chunks, see `bars.HistoryStore`
+PREFETCH_WORKERS = 4  # history requests in flight
+HISTORY_PAGE_LIMIT = 20000  # bars per `History/retrieveBars` request, longer chunks are paged
+
+COORDINATOR_PORT = 8052  # job queue of `--coordinator` backtests, workers connect with `--worker`
+COORDINATOR_HOST = "127.0.0.1"  # bind address of the job queue, "0.0.0.0" for workers on other hosts (requires CLUSTER_TOKEN in .env)
+BARS_DIR = "_data/bars"  # backtest bars by fingerprint, a worker's local store
+LEASE_SECONDS = 300  # a job not reported back within this is handed to another worker
+JOB_ATTEMPTS = 3  # leases of a job (failed or lost) before the coordinator gives up on the sweep
+
+TICK_SIZE = 0.25  # ES
+
+CACHE_DIR = "_cache"  # strategy results, positions and figures shared by dashboard processes
+CACHE_MAX_BYTES = 512 * 2**20  # least recently used entries are evicted above this
+
+CHART_WIDTH_PX = 1600  # fallback until the browser reports the chart width
+
 
 PARAMS = {
     "stop": 28,  # 22,  # 33,
@@ -2,16 +2,19 @@ import requests
 import os
 from enum import Enum
 from datetime import datetime, timedelta
-import json
 
 import pandas as pd
 from dotenv import load_dotenv
 
 from logger import create_logger
 
-from config import API_URL, LIVE_DATA, LOCAL_TIMEZONE
+from bars import HistoryStore
+from config import API_URL, HISTORY_PAGE_LIMIT, LIVE_DATA, LOCAL_TIMEZONE, PREFETCH_WORKERS
 from logger import create_logger
+from profiler import timed
+from session import SessionManager
 from strategies import ActionType
+from trading.tracing import mark
 
 log = create_logger(__name__)
 
@@ -42,84 +45,32 @@ class TIME_UNITS(Enum):
 
 class Connector:
     _session: requests.Session = None
-    _token: str = None
     _recent_data: str = None
     _account_id: str = None
+    _manager: SessionManager = None
+    _history: HistoryStore = None
 
     def __init__(self):
         self._account_id = os.getenv("TOPSTEP_ACCOUNT_ID")
-        self._login()
+        self._manager = SessionManager.shared()
+        self._history = HistoryStore()
+        self._session = self._manager.session
         accounts = self.get_accounts()
         account = next((a for a in accounts if a["id"] == int(self._account_id)), None)
         if account:
             log.info(f"Using account >> {account['name']} << with id {account['id']}")
 
-    def _store_token(self, token: str):
-        with open(".token.json", "w") as outfile:
-            json.dump(
-                {
-                    "ts": int(datetime.now().timestamp()),
-                    "token": token,
-                },
-                outfile,
-            )
-
-            log.debug("Token saved l=", len(token))
-
-    def _read_token(self):
-        try:
-            with open(".token.json", "r") as outfile:
-                data = json.load(
-                    outfile,
-                )
-
-                diff = datetime.now() - datetime.fromtimestamp(data["ts"])
-
-                if diff > timedelta(hours=23):
-                    log.debug("Token older than 23h, reloading...")
-                    return None
-
-                log.debug(f"Token loaded from {datetime.fromtimestamp(data["ts"])}")
-                return data["token"]
-        except:
-            return None
-
-    def _login(self):
-        token = self._read_token()
-
-        if not token:
-            username = os.getenv("SECRET_USERNAME")
-            if not username:
-                raise Exception("Missing .env setup")
-            res = requests.post(
-                f"{API_URL}/api/Auth/loginKey",
-                json={
-                    "userName": username,
-                    "apiKey": os.getenv("SECRET_API_KEY"),
-                },
-            )
-
-            data = res.json()
-            if not data["success"]:
-                log.error("Error", data)
-                return
-
-            token = data["token"]
-            self._store_token(token)
+    @property
+    def _token(self) -> str:
+        return self._manager.token
 
-        self._session = requests.Session()
-        self._session.headers = {"Authorization": f"Bearer {token}"}
-        self._token = token
+    def on_token(self, callback):
+        self._manager.on_token(callback)
 
     def revalidate(self):
-        data = self._post("Auth/validate")
-
-        token = data["newToken"]
-        self._session.headers = {"Authorization": f"Bearer {token}"}
-        self._token = token
-
-        log.debug("Token saved l=", len(token))
+        self._manager.refresh()
 
+    @timed("api.post")
     def _post(self, url: str, json: dict = {}):
         api_url = f"{API_URL}/api/{url}"
         log.info(f"POST {API_URL} with {json}")
@@ -136,12 +87,16 @@ class Connector:
         return json_res
 
     def get_accounts(self):
-        data = self._post("account/search", {"onlyActiveAccounts": True})
-        return data["accounts"]
+        return self._manager.cache.get(
+            ("accounts",),
+            lambda: self._post("account/search", {"onlyActiveAccounts": True})["accounts"],
+        )
 
     def get_contracts(self, text="ES"):
-        data = self._post("contract/search", {"live": LIVE_DATA, "searchText": text})
-        return data["contracts"]
+        return self._manager.cache.get(
+            ("contracts", LIVE_DATA, text),
+            lambda: self._post("contract/search", {"live": LIVE_DATA, "searchText": text})["contracts"],
+        )
 
     def find_contract(self, text="ES"):
         contracts = self.get_contracts(text)
@@ -151,6 +106,87 @@ class Connector:
 
         raise ValueError(f"Contract {text} not found")
 
+    def retrieve_bars(
+        self,
+        contract: str,
+        tf: tuple[int, TIME_UNITS],
+        limit: int = HISTORY_PAGE_LIMIT,
+        includePartialBar=False,
+    ):
+        # `bars.store.Retrieve` for one contract, pages back from the end while a response is full
+        def retrieve(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+            pages = []
+            while True:
+                bars = self._post(
+                    "History/retrieveBars",
+                    {
+                        "contractId": contract,
+                        "live": LIVE_DATA,
+                        "startTime": start.isoformat(),
+                        "endTime": end.isoformat(),
+                        "unitNumber": tf[0],
+                        "unit": tf[1].value,
+                        "limit": limit,
+                        "includePartialBar": includePartialBar,
+                    },
+                )["bars"]
+                if not bars:
+                    break
+
+                page = pd.DataFrame(bars)
+                page.columns = ["time", "open", "high", "low", "close", "volume"]
+                pages.append(page)
+
+                # Newest bars come first, a full page means older ones were cut off
+                oldest = pd.to_datetime(page["time"], utc=True).min()
+                if len(bars) < limit or oldest <= start:
+                    break
+                end = oldest
+
+            if not pages:
+                return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+            return pd.concat(pages, ignore_index=True)
+
+        return retrieve
+
+    def _contracts(self, contractId: str) -> list[str]:
+        # Current and 5 previous quarterly contracts, newest first
+        current = contractId.split(".")[-1]  # CON.F.US.EP.H26
+        m, y = current[-3], int(current[-2:])
+        months = ["H", "M", "U", "Z"]
+        month_index = months.index(m)
+
+        contracts = []
+        for i in range(0, 6):
+            month = months[(month_index - i) % len(months)]
+            contracts.append(contractId[:-3] + month + str(y))
+
+            if month == "H":
+                y -= 1
+
+        return contracts
+
+    def _history_key(self, contract: str, tf: tuple[int, TIME_UNITS]) -> str:
+        return f"{contract}_{tf[0]}_{tf[1].value}"
+
+    def prefetch_bars(
+        self,
+        contractId: str,
+        times: tuple[str, str],
+        tf: tuple[int, TIME_UNITS] = (3, TIME_UNITS.Minute),
+        workers: int = PREFETCH_WORKERS,
+    ):
+        # Downloads the missing history chunks of every contract `get_bars` reads, resumes where an earlier run stopped
+        for contract in self._contracts(contractId):
+            self._history.fill(
+                self._history_key(contract, tf),
+                times[0],
+                times[1],
+                self.retrieve_bars(contract, tf),
+                workers=workers,
+                progress=True,
+            )
+
     def get_bars(
         self,
         symbol: str,
@@ -160,7 +196,7 @@ class Connector:
             datetime.now().isoformat(),
         ],
         tf: tuple[int, TIME_UNITS] = (3, TIME_UNITS.Minute),
-        limit=1000000000,  # fetches all the data for contract
+        limit=HISTORY_PAGE_LIMIT,  # bars per request, history is fetched in chunks and pages
         includePartialBar=False,
     ) -> pd.DataFrame:
         main_key = f"{symbol}_{times[0]}_{times[1]}_{tf[0]}_{tf[1].value}"
@@ -171,59 +207,27 @@ class Connector:
                 log.debug("Loading from cache", main_csv_name)
                 return pd.read_csv(main_csv_name)
 
-            current = contractId.split(".")[-1]  # CON.F.US.EP.H26
-            m, y = current[-3], int(current[-2:])
-            months = ["H", "M", "U", "Z"]
-            month_index = months.index(m)
-
             dfs = {}
 
-            for i in range(0, 6):
-                month = months[(month_index - i) % len(months)]
-                contract = contractId[:-3] + month + str(y)
-
-                if month == "H":
-                    y -= 1
-
-                key = f"{contract}_{times[0]}_{times[1]}_{tf[0]}_{tf[1].value}"
-                csv_name = f"_data/{key}.csv"
-
-                if self._recent_data == key or os.path.exists(csv_name):
-                    log.debug("Loading from cache", csv_name)
-                    dfs[contract] = pd.read_csv(csv_name)
-
-                    continue
-
-                data = self._post(
-                    "History/retrieveBars",
-                    {
-                        "contractId": contract,
-                        "live": LIVE_DATA,
-                        "startTime": times[0],
-                        "endTime": times[1],
-                        "unitNumber": tf[0],
-                        "unit": tf[1].value,
-                        "limit": limit,
-                        "includePartialBar": includePartialBar,
-                    },
+            for contract in self._contracts(contractId):
+                # Past chunks come from `_data/history`, only missing ones are downloaded
+                bars = self._history.get(
+                    self._history_key(contract, tf),
+                    times[0],
+                    times[1],
+                    self.retrieve_bars(contract, tf, limit, includePartialBar),
                 )
 
-                bars = data["bars"]
-
                 if len(bars) == 0:
                     log.info(f"No bars returned from API for {contract}")
                     continue
 
-                df = pd.DataFrame(bars)
-                df.columns = ["time", "open", "high", "low", "close", "volume"]
-
-                if not os.path.exists("_data"):
-                    os.mkdir("_data")
+                df = bars.to_frame().reset_index(drop=True)
+                df["time"] = df["t_original"]
+                df = df[["time", "open", "high", "low", "close", "volume"]]
 
                 log.debug(f"Fetched {df.shape} for {contract}")
 
-                df.to_csv(csv_name, index=False)
-
                 dfs[contract] = df
 
             volumes = []
@@ -301,6 +305,7 @@ class Connector:
         # 5 = TrailingStop
         # 6 = JoinBid
         # 7 = JoinAsk
+        mark("order_sent")
         data = self._post(
             "Order/place",
             {
@@ -312,4 +317,5 @@ class Connector:
                 "stopLossBracket": {"ticks": 28, "type": 5 if is_trail else 2},  # or 5 for trail
             },
         )
+        mark("order_ack")
         return data["success"]
@@ -0,0 +1,152 @@
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import pickle
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional
+
+import pandas as pd
+
+from config import CACHE_DIR, CACHE_MAX_BYTES
+from logger import create_logger
+from strategies import BaseStrategy, StrategyFactory
+
+log = create_logger(__name__)
+
+
+def cache_key(kind: str, fingerprint: str, strategy: str, params: dict, date=None, **extra) -> str:
+    # Data fingerprint, strategy, params and (for per day figures) the date, plus whatever else shapes the value
+    parts = [kind, fingerprint, strategy, sorted(params.items()), date and str(pd.Timestamp(date).date()), sorted(extra.items())]
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+# Modules outside the strategies package that shape cached values: bars and their calendar, settings, positions
+# and figures. Globs relative to the repository root
+VIEW_SOURCES = ("bars/*.py", "config.py", "backtest/portfolio.py", "dashboard/chart.py")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def source_files(strategy: str) -> list[str]:
+    views = sorted(path for pattern in VIEW_SOURCES for path in glob.glob(os.path.join(_ROOT, pattern)))
+    return StrategyFactory.source_files(strategy) + views
+
+
+@lru_cache
+def source_hash(strategy: str) -> str:
+    # Code version of a strategy's cached values, entries written by older code stop matching after an edit
+    digest = hashlib.sha1()
+    for path in source_files(strategy):
+        with open(path, "rb") as infile:
+            digest.update(os.path.relpath(path, _ROOT).encode())
+            digest.update(infile.read())
+    return digest.hexdigest()[:16]
+
+
+# Pickled values in one directory, shared by every dashboard process on the host (e.g. gunicorn workers).
+# Writes are atomic renames, a per key file lock makes one process compute while the others wait for its
+# result. Hits refresh the file's mtime, the oldest files go first once the directory exceeds `max_bytes`.
+class SharedCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def load(self, key: str) -> Optional[Any]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as infile:
+                value = pickle.load(infile)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            log.warning(f"Dropping unreadable cache entry {key}: {e}")
+            self._remove(path)
+            return None
+
+    def store(self, key: str, value: Any):
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as outfile:
+            pickle.dump(value, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with open(os.path.join(self.directory, f"{key}.lock"), "w") as lockfile:
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = self.load(key)
+        if value is not None:
+            return value
+
+        with self.lock(key):
+            value = self.load(key)  # computed by another process while we waited
+            if value is None:
+                value = loader()
+                self.store(key, value)
+            return value
+
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)  # lock files stay, removing one could hand the lock to two processes
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def _entries(self) -> list[tuple[str, float, int]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def cached_run(cache: SharedCache, key: str, stra: BaseStrategy, **params) -> pd.DataFrame:
+    # `stra.run(**params)`, restored from the outputs another process computed over the same bars
+    values = cache.load(key)
+    if values is not None:
+        return stra.restore(values, **params)
+
+    with cache.lock(key):
+        values = cache.load(key)
+        if values is not None:
+            return stra.restore(values, **params)
+
+        df = stra.run(**params)
+        cache.store(key, stra.results())
+        return df
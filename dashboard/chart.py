@@ -0,0 +1,310 @@
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from backtest.portfolio import build_portfolio, build_positions
+from bars import day_code
+from config import CHART_WIDTH_PX
+from dashboard.downsample import lttb_finite, nanmax_rollup, ohlc_rollup, rollup_factor
+from profiler import timed
+from strategies import BaseStrategy
+
+MAX_MARKERS = 500  # trade markers drawn in range view, more are only shown when zoomed in
+
+
+def build_table_records(df, date):
+    records = df[df["Entry Timestamp"].dt.date == date.date()]
+    sum_row = records[["Ticks", "Gain"]].sum().to_frame().T
+    sum_row["Direction"] = "TOTAL"
+    records = pd.concat([records, sum_row], ignore_index=True)
+
+    return records.to_dict("records")
+
+
+@timed("chart.build")
+def build_chart(
+    stra: BaseStrategy,
+    positions: Optional[pd.DataFrame],
+    date=datetime.today(),
+    trading_hours: tuple[int, int] = [],
+    last_price: float = None,
+    active: Optional[tuple[float, float, float, float]] = None,
+) -> go.Figure:
+    # Day rows and hours from the dataset calendar, no per-call datetime accessors
+    calendar = stra.calendar
+    lo, hi = calendar.day_rows(day_code(date))
+    df = stra.df.iloc[lo:hi].assign(hour=calendar.hour[lo:hi])
+
+    time_delta = pd.Timedelta(minutes=3)
+
+    positions_scatters = []
+    if positions is not None:
+        df = pd.merge(df, positions, left_on="t_original", right_on="Exit Timestamp", how="left")
+        long_entries = df[df["Entry Timestamp"].notna()]
+        long_exits = df[df["Exit Timestamp"].notna()]
+        positions_scatters = [
+            go.Scatter(
+                x=long_entries["Entry Timestamp"],
+                y=long_entries["Avg Entry Price"],
+                mode="markers",
+                name="Buys",
+                text="Buy",
+                marker=dict(
+                    color="green",
+                    size=20,
+                    symbol="triangle-up",
+                ),
+                textposition="bottom center",
+            ),
+            go.Scatter(
+                x=df["time"],
+                y=df["stops"],
+                mode="lines",
+                name="Stop",
+                line=dict(color="black", width=1),
+            ),
+            go.Scatter(
+                x=long_exits["Exit Timestamp"],
+                y=long_exits["Avg Exit Price"],
+                mode="markers",
+                name="Sell",
+                text=long_exits["Ticks"].apply(lambda x: f"Sell {x:+0.0f}"),
+                marker=dict(
+                    color="red",
+                    size=20,
+                    symbol="triangle-down",
+                ),
+                textposition="top center",
+            ),
+        ]
+
+    if trading_hours:
+        df = df[(df["hour"] >= max((trading_hours[0] - 1), 0) % 25) & (df["hour"] <= trading_hours[1])]
+
+    indicators = map(
+        lambda ind: go.Scatter(
+            x=df["time"],
+            y=df[ind.key],
+            mode=ind.mode,
+            name=ind.key.replace("_", " ").title(),
+            line=dict(color=ind.color, width=ind.width),
+        ),
+        stra.drawable_indicators,
+    )
+
+    def active_candle():
+        if not active:
+            return []
+
+        open_, high, low, close = active
+        return [
+            go.Candlestick(
+                x=df.tail(1)["time"] + time_delta,
+                high=[high],
+                low=[low],
+                open=[open_],
+                close=[close],
+                name="Active",
+                increasing_line_color="gray",
+                decreasing_line_color="gray",
+            ),
+        ]
+
+    fig = go.Figure(
+        data=[
+            go.Candlestick(
+                x=df["time"],
+                open=df["open"],
+                high=df["high"],
+                low=df["low"],
+                close=df["close"],
+                name="Price",
+            ),
+            *active_candle(),
+            *indicators,
+            *positions_scatters,
+        ],
+    )
+
+    trading_allowed = df[df["trading_allowed"]]
+
+    fig.add_vline(
+        x=trading_allowed.iloc[0]["time"],
+        line_width=2,
+        line_dash="dash",
+        line_color="green",
+    )
+
+    if not active:
+        fig.add_vline(
+            x=trading_allowed.iloc[-1]["time"] + time_delta,
+            line_width=1,
+            line_dash="dash",
+            line_color="red",
+        )
+
+    if last_price:
+        fig.add_hline(
+            y=last_price,
+            line_width=1,
+            line_color="black",
+            line_dash="dot",
+            annotation_text=f"Last Price {last_price}",
+            annotation_position="top left",
+        )
+    fig.update_layout(
+        xaxis_rangeslider_visible=False,
+        yaxis=dict(side="right"),
+    )
+
+    if not df.empty:
+        pad = time_delta * 3
+        fig.update_xaxes(range=[df["time"].min(), df["time"].max() + pad])
+
+    return fig
+
+
+def portfolio_views(df: pd.DataFrame, tf: tuple) -> tuple[pd.DataFrame, go.Figure]:
+    # Positions table and summary figure of a strategy run. A plain figure since vbt's widget does not pickle, with
+    # the x values as wall time datetime64 instead of the Timestamp objects vbt leaves there (plotly drops the
+    # offset either way): a year of bars as objects takes most of a minute to unpickle from the cache
+    pf = build_portfolio(df, tf)
+    fig = go.Figure(pf.plot(subplots=["orders", "trade_pnl", "cum_returns"]))
+
+    index = pf.wrapper.index
+    for trace in fig.data:
+        if getattr(trace.x, "dtype", None) == object:
+            times = index if len(trace.x) == len(index) else pd.DatetimeIndex(trace.x)
+            trace.x = (times.tz_localize(None) if times.tz is not None else times).values
+    return build_positions(pf.positions), fig
+
+
+def visible_range(relayout: Optional[dict]) -> Optional[tuple[str, str]]:
+    # Visible x range from a figure's relayoutData, None when autoranged
+    if not relayout:
+        return None
+    if "xaxis.range[0]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if "xaxis.range" in relayout:
+        return tuple(relayout["xaxis.range"])
+    return None
+
+
+def _localize(ts: pd.Timestamp, tz) -> pd.Timestamp:
+    # Plotly reports ranges as wall clock times of the displayed timezone
+    if ts.tzinfo is None and tz is not None:
+        return ts.tz_localize(tz, ambiguous=True, nonexistent="shift_forward")
+    return ts
+
+
+@timed("chart.build_range")
+def build_range_chart(
+    stra: BaseStrategy,
+    positions: Optional[pd.DataFrame],
+    x_range: Optional[tuple[str, str]] = None,
+    width_px: int = CHART_WIDTH_PX,
+    last_price: float = None,
+) -> go.Figure:
+    # Multi-day view, bars are rolled up so the payload stays bounded by the chart width
+    df = stra.df
+    times = df["time"]
+
+    if x_range:
+        start, end = (_localize(pd.Timestamp(x), times.dt.tz) for x in x_range)
+    else:
+        start, end = times.iloc[0], times.iloc[-1]
+
+    lo, hi = int(times.searchsorted(start, "left")), int(times.searchsorted(end, "right"))
+    visible = max(hi - lo, 1)
+    factor = rollup_factor(visible, width_px)
+
+    # Half a window of margin on each side so small pans don't show empty space
+    lo, hi = max(lo - visible // 2, 0), min(hi + visible // 2, len(df))
+    window = df.iloc[lo:hi]
+    window_times = window["time"]
+
+    starts = np.arange(0, len(window), factor)
+    x = window_times.iloc[starts]
+    open_, high, low, close = ohlc_rollup(
+        window["open"].values, window["high"].values, window["low"].values, window["close"].values, factor
+    )
+
+    traces = [
+        go.Candlestick(
+            x=x,
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            name="Price" if factor == 1 else f"Price ({factor} bars)",
+        )
+    ]
+
+    time_ns = window_times.values.view(np.int64)
+    for ind in stra.drawable_indicators:
+        values = window[ind.key].values.astype(np.float64)
+        idx = lttb_finite(time_ns, values, 2 * width_px)
+        traces.append(
+            go.Scatter(
+                x=window_times.iloc[idx],
+                y=values[idx],
+                mode=ind.mode,
+                name=ind.key.replace("_", " ").title(),
+                line=dict(color=ind.color, width=ind.width),
+            )
+        )
+
+    if positions is not None and "stops" in window:
+        traces.append(
+            go.Scatter(
+                x=x,
+                y=nanmax_rollup(pd.to_numeric(window["stops"]).values, factor),
+                mode="lines",
+                name="Stop",
+                line=dict(color="black", width=1),
+            )
+        )
+
+    if positions is not None and not window.empty:
+        shown = positions[positions["Entry Timestamp"].between(window_times.iloc[0], window_times.iloc[-1])]
+        if len(shown) <= MAX_MARKERS:
+            traces += [
+                go.Scatter(
+                    x=shown["Entry Timestamp"],
+                    y=shown["Avg Entry Price"],
+                    mode="markers",
+                    name="Buys",
+                    marker=dict(color="green", size=12, symbol="triangle-up"),
+                ),
+                go.Scatter(
+                    x=shown["Exit Timestamp"],
+                    y=shown["Avg Exit Price"],
+                    mode="markers",
+                    name="Sell",
+                    text=shown["Ticks"].apply(lambda x: f"Sell {x:+0.0f}"),
+                    marker=dict(color="red", size=12, symbol="triangle-down"),
+                ),
+            ]
+
+    fig = go.Figure(data=traces)
+
+    if last_price:
+        fig.add_hline(
+            y=last_price,
+            line_width=1,
+            line_color="black",
+            line_dash="dot",
+            annotation_text=f"Last Price {last_price}",
+            annotation_position="top left",
+        )
+    fig.update_layout(
+        xaxis_rangeslider_visible=False,
+        yaxis=dict(side="right"),
+        uirevision="range",  # keeps the zoom while the data underneath is replaced
+    )
+    fig.update_xaxes(range=[start, end])
+
+    return fig
@@ -0,0 +1,272 @@
+import json
+import multiprocessing
+import re
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from dash import Input, Output, callback, dash_table, dcc, html
+
+from backtest.portfolio import STAT_COLUMNS, build_portfolio, build_positions, position_stats
+from bars import BarBuffer, CompactBars, day_code
+from config import PARAMS
+from dashboard.cache import SharedCache, cache_key, cached_run, source_hash
+from strategies import BaseStrategy, StrategyConfig, StrategyFactory
+
+COLORS = ("royalblue", "darkorange", "seagreen", "crimson", "mediumpurple", "saddlebrown", "deeppink", "teal")
+
+_worker: dict = {}
+
+
+def parse_variant(spec: str) -> tuple[str, dict]:
+    # "DefaultStrategy:fast_ma=5,slow_ma=20,trading_hours=[7,22]" as (strategy, params), values are JSON where they
+    # parse as such, params not given come from PARAMS
+    strategy, _, rest = spec.partition(":")
+    params = dict(PARAMS)
+    for item in re.split(r",(?=\s*\w+=)", rest) if rest.strip() else []:
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Bad parameter {item!r} in {spec!r}, expected name=value")
+        try:
+            params[name.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            params[name.strip()] = value.strip()
+    return strategy.strip(), params
+
+
+def _init(bars: CompactBars, tf: tuple, cache_dir: Optional[str]):
+    _worker.update(bars=bars, tf=tf, cache=cache_dir and SharedCache(cache_dir))
+
+
+def _compute(task: tuple[str, dict, Optional[dict]]) -> tuple[dict[str, np.ndarray], pd.DataFrame]:
+    # Strategy outputs and positions of one variant, through the shared cache when there is one
+    strategy, params, key = task
+    tf, cache = _worker["tf"], _worker["cache"]
+    stra = StrategyFactory.create(strategy, _worker["bars"], StrategyConfig(trading_hours=params.get("trading_hours", [7, 22])))
+
+    if cache is None:
+        df = stra.run(**params)
+        return stra.results(), build_positions(build_portfolio(df, tf).positions)
+
+    df = cached_run(cache, cache_key("run", **key), stra, **params)
+    return stra.results(), cache.get(cache_key("positions", **key, tf=tf), lambda: build_positions(build_portfolio(df, tf).positions))
+
+
+# One strategy and params of the comparison. The pool computes its outputs, the strategy here is restored from
+# them on first use so the chart reads the same frame and indicators as after `run`. Every variant's strategy reads
+# the comparison's one bar buffer, only the outputs are per variant.
+class Variant:
+    def __init__(self, label: str, strategy: str, params: dict, buffer: BarBuffer, future: Future):
+        self.label = label
+        self.strategy = strategy
+        self.params = params
+        self.stra: BaseStrategy = StrategyFactory.create(strategy, buffer, StrategyConfig(trading_hours=params.get("trading_hours", [7, 22])))
+        self.positions: Optional[pd.DataFrame] = None
+        self.stats: Optional[dict] = None
+        self._future = future
+        self._lock = threading.Lock()
+
+    def ready(self) -> "Variant":
+        with self._lock:
+            if self.positions is None:
+                values, positions = self._future.result()
+                self.stra.restore(values, **self.params)
+                self.positions, self.stats = positions, position_stats(positions)
+        return self
+
+
+# Several strategies and parameter sets over the same bars, computed concurrently on a process pool as soon as the
+# comparison is created. Each variant is cached on its own (same keys as the sweep's selection), toggling one in the
+# dashboard only redraws.
+class Comparison:
+    def __init__(
+        self,
+        bars: CompactBars,
+        variants: list[tuple[str, dict]],
+        tf: tuple,
+        cache: Optional[SharedCache] = None,
+        workers: Optional[int] = None,
+    ):
+        self.workers = min(workers or len(variants), len(variants))
+        fingerprint = bars.fingerprint() if cache else None
+        cache_dir = cache and cache.directory
+
+        self._pool: Optional[Executor] = None
+        if self.workers > 1:
+            # Spawned, the dashboard already runs threads (logging, Flask) that a fork would copy mid-state
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init, initargs=(bars, tf, cache_dir)
+            )
+        else:
+            _init(bars, tf, cache_dir)
+        self.buffer = BarBuffer.from_compact(bars)
+
+        self.variants = []
+        for strategy, params in variants:
+            key = cache and dict(
+                fingerprint=fingerprint,
+                strategy=strategy,
+                params=params,
+                trading_hours=params.get("trading_hours", [7, 22]),
+                source=source_hash(strategy),
+            )
+            task = (strategy, params, key)
+            if self._pool:
+                future = self._pool.submit(_compute, task)
+            else:
+                future = Future()
+                future.set_result(_compute(task))
+            self.variants.append(Variant(_label(strategy, params), strategy, params, self.buffer, future))
+
+    def selected(self, indices: list[int]) -> list[tuple[int, Variant]]:
+        return [(i, self.variants[i].ready()) for i in sorted(indices)]
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "Comparison":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _label(strategy: str, params: dict) -> str:
+    changed = {k: v for k, v in params.items() if PARAMS.get(k) != v}
+    return f"{strategy} " + ", ".join(f"{k}={v}" for k, v in changed.items()) if changed else strategy
+
+
+def build_compare_chart(selected: list[tuple[int, Variant]], date, trading_hours: tuple[int, int]) -> go.Figure:
+    # Day candles once, per variant its entries, exits and stop line in the variant's color
+    fig = go.Figure()
+    if not selected:
+        return fig
+
+    stra = selected[0][1].stra
+    lo, hi = stra.calendar.day_rows(day_code(date))
+    hour = stra.calendar.hour[lo:hi]
+    rows = np.arange(lo, hi)
+    if trading_hours:
+        rows = rows[(hour >= max(trading_hours[0] - 1, 0)) & (hour <= trading_hours[1])]
+    df = stra.df.iloc[rows]
+
+    fig.add_trace(go.Candlestick(x=df["time"], open=df["open"], high=df["high"], low=df["low"], close=df["close"], name="Price"))
+
+    for i, variant in selected:
+        color = COLORS[i % len(COLORS)]
+        day = variant.positions[variant.positions["Entry Timestamp"].dt.date == pd.Timestamp(date).date()]
+        exits = day[day["Status"] == "Closed"]
+        fig.add_traces(
+            [
+                go.Scatter(
+                    x=day["Entry Timestamp"],
+                    y=day["Avg Entry Price"],
+                    mode="markers",
+                    name=f"{variant.label} buys",
+                    legendgroup=str(i),
+                    marker=dict(color=color, size=14, symbol="triangle-up"),
+                ),
+                go.Scatter(
+                    x=exits["Exit Timestamp"],
+                    y=exits["Avg Exit Price"],
+                    mode="markers",
+                    name=f"{variant.label} sells",
+                    legendgroup=str(i),
+                    text=exits["Ticks"].apply(lambda x: f"Sell {x:+0.0f}"),
+                    marker=dict(color=color, size=14, symbol="triangle-down", line=dict(color="black", width=1)),
+                ),
+                go.Scatter(
+                    x=df["time"],
+                    y=variant.stra.df["stops"].values[rows],
+                    mode="lines",
+                    name=f"{variant.label} stop",
+                    legendgroup=str(i),
+                    line=dict(color=color, width=1, dash="dash"),
+                ),
+            ]
+        )
+
+    fig.update_layout(xaxis_rangeslider_visible=False, yaxis=dict(side="right"), legend=dict(groupclick="togglegroup"))
+    return fig
+
+
+def build_compare_pnl(selected: list[tuple[int, Variant]]) -> go.Figure:
+    # Cumulative ticks of the closed trades of each variant
+    fig = go.Figure()
+    for i, variant in selected:
+        closed = variant.positions[variant.positions["Status"] == "Closed"].sort_values("Exit Timestamp")
+        fig.add_trace(
+            go.Scatter(
+                x=closed["Exit Timestamp"],
+                y=closed["Ticks"].cumsum(),
+                mode="lines",
+                name=variant.label,
+                line=dict(color=COLORS[i % len(COLORS)], shape="hv"),
+            )
+        )
+    fig.update_layout(title="Cumulative ticks", yaxis_title="ticks")
+    return fig
+
+
+def compare_layout(comparison: Comparison, last_day, trading_hours: tuple[int, int]) -> html.Div:
+    return html.Div(
+        children=[
+            html.Div(
+                children=[
+                    dcc.Checklist(
+                        id="compare-variants",
+                        options=[
+                            {"label": html.Span(v.label, style={"color": COLORS[i % len(COLORS)], "margin": "0 12px 0 4px"}), "value": i}
+                            for i, v in enumerate(comparison.variants)
+                        ],
+                        value=list(range(len(comparison.variants))),
+                        inline=True,
+                    ),
+                    dcc.DatePickerSingle(id="compare-date", date=last_day, display_format="MMM Do, YY", first_day_of_week=1),
+                ],
+                style={"display": "flex", "justifyContent": "center", "alignItems": "center", "gap": 10},
+            ),
+            dcc.RangeSlider(0, 24, 1, value=trading_hours, id="compare-hours"),
+            dcc.Graph(id="compare-chart", style={"height": "70vh"}),
+            html.Div(
+                children=[
+                    dcc.Graph(id="compare-pnl", style={"flex": 1}),
+                    dash_table.DataTable(
+                        id="compare-stats",
+                        columns=[{"name": c, "id": c} for c in ["strategy", *STAT_COLUMNS]],
+                        style_table={"flex": 1, "overflowX": "auto"},
+                    ),
+                ],
+                style={"display": "flex"},
+            ),
+        ]
+    )
+
+
+def register_compare_callbacks(comparison: Comparison):
+    @callback(
+        Output("compare-chart", "figure"),
+        Input("compare-variants", "value"),
+        Input("compare-date", "date"),
+        Input("compare-hours", "value"),
+        prevent_initial_call=False,
+    )
+    def update_chart(indices, date_value, hours):
+        if not date_value:
+            return go.Figure()
+        return build_compare_chart(comparison.selected(indices or []), pd.to_datetime(date_value), hours)
+
+    @callback(
+        Output("compare-pnl", "figure"),
+        Output("compare-stats", "data"),
+        Input("compare-variants", "value"),
+        prevent_initial_call=False,
+    )
+    def update_summary(indices):
+        selected = comparison.selected(indices or [])
+        stats = [{"strategy": v.label, **{c: v.stats[c] for c in STAT_COLUMNS}} for _, v in selected]
+        return build_compare_pnl(selected), stats
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+
+CANDLE_PX = 4  # min horizontal pixels per candle
+
+
+def rollup_factor(bars: int, width_px: int, px_per_point: int = CANDLE_PX) -> int:
+    # Number of source bars per drawn bar so the visible window fits the chart width
+    return max(1, math.ceil(bars * px_per_point / max(width_px, 1)))
+
+
+def rollup_starts(n: int, factor: int) -> np.ndarray:
+    return np.arange(0, n, factor)
+
+
+def ohlc_rollup(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, factor: int):
+    # Aggregates each `factor` consecutive bars into one: first open, max high, min low, last close
+    n = len(open_)
+    if factor <= 1 or n == 0:
+        return open_, high, low, close
+
+    starts = rollup_starts(n, factor)
+    ends = np.minimum(starts + factor, n) - 1
+    return open_[starts], np.maximum.reduceat(high, starts), np.minimum.reduceat(low, starts), close[ends]
+
+
+def nanmax_rollup(values: np.ndarray, factor: int) -> np.ndarray:
+    # Like `ohlc_rollup` high, but NaN where the whole bucket is NaN (gaps in stop lines)
+    n = len(values)
+    if factor <= 1 or n == 0:
+        return values
+
+    starts = rollup_starts(n, factor)
+    finite = np.isfinite(values)
+    filled = np.where(finite, values, -np.inf)
+    out = np.maximum.reduceat(filled, starts)
+    out[np.add.reduceat(finite, starts) == 0] = np.nan
+    return out
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets, returns indices of the points to keep
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # threshold - 2 buckets over the points between first and last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+
+    return out
+
+
+def lttb_finite(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # LTTB over finite points only, indicators have NaN warm-up
+    finite = np.flatnonzero(np.isfinite(y))
+    return finite[lttb(x[finite], y[finite], threshold)]
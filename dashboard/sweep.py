@@ -0,0 +1,188 @@
+from typing import Optional
+
+import pandas as pd
+import plotly.graph_objects as go
+from dash import ALL, Input, Output, State, callback, dcc, html, no_update
+
+from backtest.portfolio import build_portfolio, build_positions, position_stats
+from backtest.results import SweepResults, list_sweeps
+from bars import CompactBars
+from dashboard.cache import SharedCache, cache_key, cached_run, source_hash
+from dashboard.chart import build_chart
+from strategies import StrategyConfig, StrategyFactory
+
+_sweeps: dict[str, SweepResults] = {}
+
+FIXED_ID = "sweep-fixed-param"
+
+
+def _sweep(path: str) -> SweepResults:
+    # Loaded on first use, kept for the lifetime of the server
+    if path not in _sweeps:
+        _sweeps[path] = SweepResults(path)
+    return _sweeps[path]
+
+
+def _params(sweep: SweepResults, values: dict) -> dict:
+    # Plotly hands back floats for int axes
+    return {key: sweep.axes[key].dtype.type(values[key]).item() for key in sweep.keys}
+
+
+def sweep_layout(bars: CompactBars) -> html.Div:
+    last_day = bars.index()[-1]
+
+    return html.Div(
+        children=[
+            html.Div(
+                children=[
+                    dcc.Dropdown(id="sweep-file", options=list_sweeps(), placeholder="Sweep result", style={"width": 320}),
+                    dcc.Dropdown(id="sweep-metric", value="win_rate", clearable=False, style={"width": 180}),
+                    dcc.Dropdown(id="sweep-x", placeholder="x", clearable=False, style={"width": 140}),
+                    dcc.Dropdown(id="sweep-y", placeholder="y", clearable=False, style={"width": 140}),
+                    dcc.DatePickerSingle(id="sweep-date", date=last_day, display_format="MMM Do, YY", first_day_of_week=1),
+                ],
+                style={"display": "flex", "justifyContent": "center", "gap": 10},
+            ),
+            html.Div(id="sweep-fixed"),
+            html.Div(
+                children=[
+                    dcc.Graph(id="sweep-heatmap", style={"flex": 1}),
+                    dcc.Graph(id="sweep-slice", style={"flex": 1}),
+                ],
+                style={"display": "flex"},
+            ),
+            html.H6(id="sweep-selected", style={"textAlign": "center"}),
+            dcc.Graph(id="sweep-chart", style={"height": "85vh"}),
+        ]
+    )
+
+
+def register_sweep_callbacks(bars: CompactBars, strategy: str, tf: tuple, trading_hours: tuple[int, int], cache: Optional[SharedCache] = None):
+    fingerprint = bars.fingerprint() if cache else None
+
+    @callback(
+        Output("sweep-metric", "options"),
+        Output("sweep-x", "options"),
+        Output("sweep-x", "value"),
+        Output("sweep-y", "options"),
+        Output("sweep-y", "value"),
+        Input("sweep-file", "value"),
+    )
+    def load_sweep(path):
+        if not path:
+            return no_update
+
+        sweep = _sweep(path)
+        keys = sweep.keys
+        return sweep.metrics, keys, keys[-1], keys, keys[-2] if len(keys) > 1 else keys[-1]
+
+    @callback(
+        Output("sweep-fixed", "children"),
+        Input("sweep-file", "value"),
+        Input("sweep-x", "value"),
+        Input("sweep-y", "value"),
+    )
+    def fixed_sliders(path, x, y):
+        if not path or not x or not y:
+            return no_update
+
+        sweep = _sweep(path)
+        sliders = []
+        for key in sweep.keys:
+            if key in (x, y):
+                continue
+
+            axis = sweep.axes[key].tolist()
+            label_every = max(1, len(axis) // 20)
+            sliders.append(
+                html.Div(
+                    children=[
+                        html.Label(key),
+                        dcc.Slider(
+                            min=axis[0],
+                            max=axis[-1],
+                            step=None,
+                            value=axis[0],
+                            marks={v: str(v) if i % label_every == 0 else "" for i, v in enumerate(axis)},
+                            id={"type": FIXED_ID, "key": key},
+                        ),
+                    ]
+                )
+            )
+        return sliders
+
+    @callback(
+        Output("sweep-heatmap", "figure"),
+        Input("sweep-file", "value"),
+        Input("sweep-metric", "value"),
+        Input("sweep-x", "value"),
+        Input("sweep-y", "value"),
+        Input({"type": FIXED_ID, "key": ALL}, "value"),
+        State({"type": FIXED_ID, "key": ALL}, "id"),
+    )
+    def heatmap(path, metric, x, y, values, ids):
+        if not path or not metric or not x or not y or x == y:
+            return no_update
+
+        sweep = _sweep(path)
+        fixed = {i["key"]: v for i, v in zip(ids, values)}
+        if set(fixed) != set(sweep.keys) - {x, y}:
+            return no_update  # sliders of the previous axes still mounted
+
+        z = sweep.slice(metric, [y, x], _params(sweep, {**fixed, x: sweep.axes[x][0], y: sweep.axes[y][0]}))
+
+        fig = go.Figure(go.Heatmap(z=z, x=sweep.axes[x], y=sweep.axes[y], colorbar=dict(title=metric)))
+        fig.update_layout(
+            title=", ".join(f"{k}={v}" for k, v in fixed.items()) or metric,
+            xaxis_title=x,
+            yaxis_title=y,
+        )
+        return fig
+
+    @callback(
+        Output("sweep-chart", "figure"),
+        Output("sweep-slice", "figure"),
+        Output("sweep-selected", "children"),
+        Input("sweep-heatmap", "clickData"),
+        Input("sweep-date", "date"),
+        State("sweep-file", "value"),
+        State("sweep-metric", "value"),
+        State("sweep-x", "value"),
+        State("sweep-y", "value"),
+        State({"type": FIXED_ID, "key": ALL}, "value"),
+        State({"type": FIXED_ID, "key": ALL}, "id"),
+    )
+    def select(click, date_value, path, metric, x, y, values, ids):
+        if not click or not path:
+            return no_update
+
+        sweep = _sweep(path)
+        point = click["points"][0]
+        params = _params(sweep, {**{i["key"]: v for i, v in zip(ids, values)}, x: point["x"], y: point["y"]})
+
+        # Fresh strategy over the shared bars so the main chart keeps its own run
+        stra = StrategyFactory.create(strategy, bars, StrategyConfig(trading_hours=trading_hours))
+        if cache:
+            key = dict(fingerprint=fingerprint, strategy=strategy, params=params, trading_hours=trading_hours, source=source_hash(strategy))
+            df = cached_run(cache, cache_key("run", **key), stra, **params)
+            positions = cache.get(cache_key("positions", **key, tf=tf), lambda: build_positions(build_portfolio(df, tf).positions))
+        else:
+            df = stra.run(**params)
+            positions = build_positions(build_portfolio(df, tf).positions)
+        stats = position_stats(positions)
+
+        date = pd.to_datetime(date_value) if date_value else df["time"].max()
+        if cache:
+            chart = cache.get(cache_key("chart", **key, date=date), lambda: build_chart(stra, positions, date, trading_hours))
+        else:
+            chart = build_chart(stra, positions, date, trading_hours)
+
+        # Metric along each param through the selected cell
+        slice_fig = go.Figure(
+            [go.Scatter(x=sweep.axes[key], y=sweep.slice(metric, [key], params), mode="lines+markers", name=key) for key in sweep.keys]
+        )
+        slice_fig.update_layout(title=f"{metric} through selection", yaxis_title=metric)
+
+        selected = ", ".join(f"{k}={v}" for k, v in params.items())
+        summary = ", ".join(f"{k} {v}" for k, v in stats.items())
+        return chart, slice_fig, f"{selected} | {summary}"
@@ -1,21 +1,147 @@
 from datetime import datetime, timezone, time, timedelta
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time as _time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_DIR = "_logs"
+
+# (burst, every) per level: the first `burst` records of a call site within a second are kept, then 1 in `every`.
+# Warnings and errors are never sampled.
+LOG_SAMPLING = {
+    logging.DEBUG: (10, 100),
+    logging.INFO: (20, 10),
+}
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_handler: logging.Handler = None
+_listener: QueueListener = None
+_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rates: dict[int, tuple[int, int]]):
+        super().__init__()
+        self.rates = rates
+        self._counts: dict[tuple[str, int], tuple[int, int]] = {}
+        self._lock = threading.Lock()  # records come from the websocket, clock and main threads
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.mono_ns = _time.monotonic_ns()
+
+        rate = self.rates.get(record.levelno)
+        if not rate:
+            return True
+
+        burst, every = rate
+        key = (record.name, record.lineno)
+        window = record.mono_ns // 1_000_000_000
+        with self._lock:
+            current, count = self._counts.get(key, (window, 0))
+            if current != window:
+                current, count = window, 0
+            count += 1
+            self._counts[key] = (current, count)
+
+        if count <= burst:
+            return True
+        if (count - burst) % every == 0:
+            record.sampled = every
+            return True
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="microseconds"),
+            "mono_ns": getattr(record, "mono_ns", None),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if hasattr(record, "sampled"):
+            entry["sampled"] = record.sampled
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # Same process, so the JSON formatting waits for the writer thread. The message is merged here like the stdlib
+    # handler does, args may be mutated by the caller once the call returns
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _log_path() -> str:
+    return os.path.join(LOG_DIR, datetime.now().strftime("%Y%m%d.jsonl"))
+
+
+def _start() -> logging.Handler:
+    global _handler, _listener
+
+    with _lock:
+        if _handler is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            file_handler = logging.FileHandler(_log_path(), encoding="utf-8", mode="a")
+            file_handler.setFormatter(JsonFormatter())
+
+            _listener = QueueListener(_queue, file_handler, respect_handler_level=True)
+            _listener.start()
+
+            _handler = _DeferredQueueHandler(_queue)
+            _handler.addFilter(SamplingFilter(LOG_SAMPLING))
+
+        return _handler
+
+
+def shutdown_logging():
+    # Drains the queue and closes the file, loggers can be started again after
+    global _handler, _listener
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        if _handler is not None:
+            for logger in logging.Logger.manager.loggerDict.values():
+                if isinstance(logger, logging.Logger) and _handler in logger.handlers:
+                    logger.removeHandler(_handler)
+        _handler, _listener = None, None
+
+
+def _after_fork():
+    # A forked child has the handler and its queue but not the writer thread, records would pile up unwritten.
+    # It gets its own queue and writer on the same files
+    global _queue, _listener, _lock
+
+    _lock = threading.Lock()
+    _queue = queue.SimpleQueue()
+    if _handler is not None:
+        _handler.queue = _queue
+        _listener = QueueListener(_queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_after_fork)
 
 
 def create_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    handler = logging.FileHandler(
-        datetime.now().strftime("_logs/%Y%m%d.log"),
-        encoding="utf-8",
-        mode="a",
-    )
-    formatter = logging.Formatter(
-        "%(asctime)s.%(msecs)03d - %(name)s %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    handler = _start()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
 
     return logger
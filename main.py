@@ -1,26 +1,38 @@
-from datetime import datetime, timezone, time, timedelta
-
+from datetime import datetime
 from typing import Optional
-from zoneinfo import ZoneInfo
 
 import pandas as pd
 from dotenv import load_dotenv
 import json
 import math
 import itertools
+import time
 
-import vectorbt as vbt
-import plotly.graph_objects as go
-from dash import Dash, Input, Output, callback, dcc, html, dash_table
+from dash import Dash, Input, Output, State, callback, clientside_callback, ctx, dcc, html, dash_table, no_update
 import click
+import plotly.graph_objects as go
 from tqdm import tqdm
 
-from config import LOCAL_TIMEZONE, APP_NAME, PARAMS, BACKTESTING_PARAMS
+from backtest.portfolio import build_portfolio, build_positions, position_stats
+from backtest.robustness import TOP as ROBUSTNESS_TOP, add_robustness, trade_arrays
+from backtest.cluster import Coordinator, run_workers
+from backtest.shards import ShardedBacktest, day_stats, reduce_days
+from backtest.walkforward import walk_forward
+from bars import CompactBars
+from config import LOCAL_TIMEZONE, APP_NAME, PARAMS, BACKTESTING_PARAMS, LIVE_MAX_HISTORY, CHART_WIDTH_PX, DAEMON_PORT, PREFETCH_WORKERS, COORDINATOR_PORT
 from connector import TIME_UNITS, Connector
+from dashboard.cache import SharedCache, cache_key, cached_run, source_hash
+from dashboard.compare import Comparison, compare_layout, parse_variant, register_compare_callbacks
+from dashboard.chart import build_chart, build_range_chart, build_table_records, portfolio_views, visible_range
+from dashboard.sweep import register_sweep_callbacks, sweep_layout
+from profiler import profiling
+from trading.daemon import DaemonClient, TradingDaemon, live_window
+from trading.runner import StrategyRunner
 from trading.trader import Trader
-from ws import Websocket
+from trading.tracing import tracer
+from ws import UserHub, Websocket
 
-from strategies import ActionType, BaseStrategy, StrategyFactory, StrategyConfig
+from strategies import ActionType, StrategyFactory, StrategyConfig
 
 from logger import create_logger
 import logging
@@ -30,14 +42,80 @@ log = create_logger(__name__)
 load_dotenv()
 
 
+def _variants(ctx, param, values: tuple[str, ...]) -> list[tuple[str, dict]]:
+    try:
+        return [parse_variant(value) for value in values]
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
 @click.command()
 @click.option("--strategy", default="DefaultStrategy", help="Strategy name.")
 @click.option("--ui", is_flag=True, help="Show dash dashboard.")
 @click.option("--stream", default=False, is_flag=True, help="With live webosocket.")
 @click.option("--backtest", default=False, is_flag=True, help="Backtesting.")
 @click.option("--trade", default=False, is_flag=True, help="Trade.")
-def main(strategy: str, ui: bool, stream: bool, backtest: bool, trade: bool):
-    log.info(f"Starting with strategy={strategy}, ui={ui}, stream={stream}, backtest={backtest}, trade={trade}")
+@click.option("--headless", default=False, is_flag=True, help="Trade without the dashboard.")
+@click.option("--attach", default=None, help=f"Read-only dashboard of a headless daemon, e.g. http://127.0.0.1:{DAEMON_PORT}.")
+@click.option("--workers", default=0, help="Backtest day shards in parallel on this many processes.")
+@click.option("--coordinator", default=False, is_flag=True, help=f"Serve the backtest sweep as jobs to --worker hosts on port {COORDINATOR_PORT}.")
+@click.option("--worker", default=None, help=f"Run backtest jobs of a coordinator, e.g. http://host:{COORDINATOR_PORT}, --workers processes.")
+@click.option("--walk-forward", nargs=2, type=int, default=None, help="Backtest walk-forward: IN_SAMPLE OUT_OF_SAMPLE trading days, e.g. 60 10.")
+@click.option("--prefetch", nargs=3, default=None, help="Download SYMBOL history FROM TO into the local store, e.g. ES 2025-01-01 2026-03-10.")
+@click.option(
+    "--compare",
+    multiple=True,
+    callback=_variants,
+    help="Dashboard Compare tab: also run STRATEGY[:name=value,...] next to --strategy and PARAMS, repeatable.",
+)
+@click.option("--profile", default=False, is_flag=True, help="Sample stacks of the running mode, written to _profile/ on exit.")
+def main(
+    strategy: str,
+    ui: bool,
+    stream: bool,
+    backtest: bool,
+    trade: bool,
+    headless: bool,
+    attach: Optional[str],
+    workers: int,
+    coordinator: bool,
+    worker: Optional[str],
+    walk_forward: Optional[tuple[int, int]],
+    prefetch: Optional[tuple[str, str, str]],
+    compare: list[tuple[str, dict]],
+    profile: bool,
+):
+    with profiling(profile):
+        return run_mode(strategy, ui, stream, backtest, trade, headless, attach, workers, coordinator, worker, walk_forward, prefetch, compare)
+
+
+def run_mode(
+    strategy: str,
+    ui: bool,
+    stream: bool,
+    backtest: bool,
+    trade: bool,
+    headless: bool,
+    attach: Optional[str],
+    workers: int,
+    coordinator: bool,
+    worker: Optional[str],
+    walk_forward: Optional[tuple[int, int]],
+    prefetch: Optional[tuple[str, str, str]],
+    compare: list[tuple[str, dict]] = (),
+):
+    log.info(f"Starting with strategy={strategy}, ui={ui}, stream={stream}, backtest={backtest}, trade={trade}, headless={headless}")
+
+    if attach:
+        daemon = DaemonClient(attach)
+        state = daemon.state()
+        config = (state["contract_id"], state["symbol"], [state["tf"][0], TIME_UNITS(state["tf"][1])], state["strategy"], True)
+        return run_ui(daemon.bars().to_frame(), None, None, config, True, daemon=daemon)
+
+    if worker:
+        for process in run_workers(worker, workers or 1):
+            process.join()
+        return
 
     con = Connector()
     # print(con.get_open_positions())
@@ -47,35 +125,48 @@ def main(strategy: str, ui: bool, stream: bool, backtest: bool, trade: bool):
     # return
 
     symbol, tf = "ES", [3, TIME_UNITS.Minute]
+
+    if prefetch:
+        symbol, start, end = prefetch
+        return con.prefetch_bars(con.find_contract(symbol), (start, end), tf=tf, workers=workers or PREFETCH_WORKERS)
+
     contract_id = con.find_contract(symbol)
     config = (contract_id, symbol, tf, strategy, stream)
     # times = ["2026-02-19T00:00:00", "2026-02-20T00:00:00"]
     times = ["2026-02-27T00:00:00", "2026-02-28T00:00:00"]
     # times = ["2025-01-01T00:00:00", "2026-03-10T00:00:00"]
 
-    ws = Websocket(contract_id, con).run() if stream or trade else None
+    if headless:
+        return TradingDaemon(con, config).run()
 
-    if trade:
-        now_utc = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).astimezone(timezone.utc)
-        start = (datetime.combine(now_utc, time.min) - timedelta(days=1)).isoformat()  # .replace("10T", "08T")  # ytd midnight
-        end = now_utc.isoformat()  # .replace("11T", "09T")  # now
+    ws = Websocket(contract_id, con, tf=tf) if stream or trade else None
+    if stream and not trade:
+        ws.run()
 
-        times = [start, end]
+    if trade:
+        times = live_window()
     df = con.get_bars(symbol, contract_id, tf=tf, times=times, includePartialBar=stream or trade)
 
     if ui or trade:
-        return run_ui(df, con, ws, config, trade)
+        return run_ui(df, con, ws, config, trade, compare=compare)
 
     if backtest:
-        return run_backtest(df, config)
+        bars = CompactBars.from_frame(df)
+        del df
+        return run_backtest(bars, config, workers, coordinator, walk_forward)
 
 
-def run_backtest(df: pd.DataFrame, config: tuple):
+def run_backtest(bars: CompactBars, config: tuple, workers: int = 0, coordinator: bool = False, walk: Optional[tuple[int, int]] = None):
     (contract_id, symbol, tf, strategy, stream) = config
 
     params = BACKTESTING_PARAMS
+    trading_hours = params.get("trading_hours")
 
-    stra = StrategyFactory.create(strategy, df, StrategyConfig(trading_hours=params.get("trading_hours")))
+    sharded = stra = None
+    if workers and not coordinator:
+        sharded = ShardedBacktest(bars, strategy, trading_hours, tf, workers=workers)
+    elif not coordinator:
+        stra = StrategyFactory.create(strategy, bars, StrategyConfig(trading_hours=trading_hours))
 
     del params["trading_hours"]
 
@@ -83,7 +174,7 @@ def run_backtest(df: pd.DataFrame, config: tuple):
 
     combinations = math.prod([params[key]["max"] - params[key]["min"] + 1 for key in keys])
     print(f"Running backtest for...")
-    print(f"{combinations} combination, {df['time'].dt.date.nunique()} days, {df.shape[0]} candles")
+    print(f"{combinations} combination, {len(bars.days)} days, {len(bars)} candles")
 
     def yielder(key):
         start = params[key]["min"]
@@ -95,161 +186,195 @@ def run_backtest(df: pd.DataFrame, config: tuple):
         for xs in itertools.product(*[yielder(key) for key in keys]):
             yield dict(zip(keys, xs))
 
-    results = []
-    for p in tqdm(generate_params()):
-        df = stra.run(**p)
-
-        pf = vbt.Portfolio.from_signals(
-            df.close,
-            entries=df.long_entries,
-            exits=df.long_exits,
-            freq=f"{tf[0]}{tf[1].name.lower()[0]}",
-            size=1,
-            size_type="amount",
-        )
-
-        positions = build_positions(pf.positions)
-
-        sum_row = positions[["Ticks", "Gain"]].sum()
-
-        wins = positions[positions["Ticks"] >= 0]
-        losses = positions[positions["Ticks"] < 0]
-
-        biggest_win = wins["Ticks"].max()
-        average_win = wins["Ticks"].mean()
-        biggest_loss = losses["Ticks"].min()
-        average_loss = losses["Ticks"].mean()
-        # cum_win
-        res = {
-            "params": p,
-            "total_ticks": sum_row["Ticks"],
-            "trades": positions.shape[0],
-            "wins": wins.shape[0],
-            "losses": losses.shape[0],
-            "win_rate": (wins.shape[0] / positions.shape[0]) if positions.shape[0] > 0 else 0,
-            "biggest_win": int(biggest_win) if not pd.isna(biggest_win) else "/",
-            "average_win": round(float(average_win), 2) if not pd.isna(average_win) else "/",
-            "biggest_loss": int(biggest_loss) if not pd.isna(biggest_loss) else "/",
-            "average_loss": round(float(average_loss), 2) if not pd.isna(average_loss) else "/",
-        }
+    if coordinator:
+        # Trades of every combination come back from the workers at once
+        with Coordinator(bars, strategy, trading_hours, tf, list(generate_params())).serve() as cluster:
+            print(f"Waiting for workers: uv run main.py --worker http://<host>:{cluster.port} --workers N")
+            if workers:
+                run_workers(f"http://127.0.0.1:{cluster.port}", workers)
+            remote = dict(enumerate(cluster.trades()))
 
+    sweep = []
+    results = []
+    trades = []
+    for i, p in enumerate(tqdm(generate_params())):
+        if coordinator:
+            ticks, days = remote.pop(i)
+            stats = reduce_days(day_stats(ticks, days))
+        elif sharded:
+            ticks, days = sharded.trades(p)
+            stats = reduce_days(day_stats(ticks, days))
+        else:
+            df = stra.run(**p)
+            positions = build_positions(build_portfolio(df, tf).positions)
+            stats = position_stats(positions)
+            ticks, days = trade_arrays(positions)
+
+        # Param columns first, indexed by `SweepResults`
+        res = {**p, **stats}
+
+        sweep.append(p)
         results.append(res)
+        trades.append((ticks, days))
+
+    if sharded:
+        sharded.close()
 
     df = pd.DataFrame(results)
+    df = add_robustness(df, trades, top=ROBUSTNESS_TOP)
     df.sort_values(by="win_rate", ascending=False, inplace=True)
-    df.to_csv(f"_backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", index=False)
-
-
-def build_positions(positions) -> pd.DataFrame:
-    df = positions.records_readable
-    df["Ticks"] = ((df["Avg Exit Price"] - df["Avg Entry Price"]) / 0.25).astype(int)
-    df["Gain"] = df["Ticks"] * 12.5
-
-    return df
-
-
-def run_ui(df: pd.DataFrame, con: Connector, ws: Websocket, config: tuple, trade: bool):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    df.to_csv(f"_backtest_{stamp}.csv", index=False)
+
+    if walk:
+        # Windows are picked from the sweep's per day trades, no extra strategy runs
+        steps, oos = walk_forward(sweep, trades, bars.days, *walk)
+        steps.to_csv(f"_walkforward_{stamp}.csv", index=False)
+        print(f"Walk-forward {walk[0]}/{walk[1]} days, {len(steps)} steps, out-of-sample: {oos}")
+
+
+def run_ui(
+    df: pd.DataFrame,
+    con: Connector,
+    ws: Websocket,
+    config: tuple,
+    trade: bool,
+    daemon: Optional[DaemonClient] = None,
+    compare: list[tuple[str, dict]] = (),
+):
     (contract_id, symbol, tf, strategy, stream) = config
     title = f"{APP_NAME} - {strategy} - {symbol} - {tf[0]} {tf[1].name} ({LOCAL_TIMEZONE})"
 
-    stra = StrategyFactory.create(strategy, df, StrategyConfig(trading_hours=PARAMS.get("trading_hours", [7, 22])))
-    df = stra.run(**PARAMS)
-
-    pf = vbt.Portfolio.from_signals(
-        df.close,
-        entries=df.long_entries,
-        exits=df.long_exits,
-        freq=f"{tf[0]}{tf[1].name.lower()[0]}",
-        size=1,
-        size_type="amount",
+    bars = CompactBars.from_frame(df)
+    stra = StrategyFactory.create(
+        strategy,
+        bars,
+        StrategyConfig(trading_hours=PARAMS.get("trading_hours", [7, 22]), max_history=LIVE_MAX_HISTORY if trade else None),
     )
 
+    # Backtest views are the same in every dashboard process over the same bars, shared through the disk cache.
+    # Trading views follow live bars and stay per process.
+    # Keys carry the strategy's source hash, so entries persist across restarts until the data, params or code change
+    cache = None if trade else SharedCache()
+    key = dict(fingerprint=bars.fingerprint(), strategy=strategy, params=PARAMS, trading_hours=stra.config.trading_hours, source=source_hash(strategy))
+
+    # Compared variants start computing on their own processes while this one runs the main strategy
+    comparison = Comparison(bars, [(strategy, PARAMS), *compare], tf, cache) if compare and not trade else None
+    if cache:
+        started = time.perf_counter()
+        df = cached_run(cache, cache_key("run", **key), stra, **PARAMS)
+        positions, summary_fig = cache.get(cache_key("portfolio", **key, tf=tf), lambda: portfolio_views(df, tf))
+        log.info(f"Backtest views ready in {time.perf_counter() - started:.2f}s")
+    else:
+        df = stra.run(**PARAMS)
+        positions, summary_fig = portfolio_views(df, tf)
+
     # Get last trading day for initial load
     last_day = df["time"].max()
 
-    positions = build_positions(pf.positions)
-
-    summary_fig = pf.plot(subplots=["orders", "trade_pnl", "cum_returns"])
+    def day_chart(date, hours, last_price=None) -> go.Figure:
+        if cache is None or last_price is not None:
+            return build_chart(stra, positions, date, hours, last_price=last_price)
+        return cache.get(cache_key("chart", **key, date=date, hours=hours), lambda: build_chart(stra, positions, date, hours))
 
     app = Dash(APP_NAME, prevent_initial_callbacks=True)
     app.title = APP_NAME
 
-    all_dates = pd.date_range(df["time"].min(), df["time"].max(), freq="D", tz=LOCAL_TIMEZONE)
-    present_dates = df["time"].dt.date.unique().tolist()
-    disabled_dates = sorted(set(all_dates.date) - set(pd.to_datetime(present_dates).date))
+    disabled_dates = stra.calendar.disabled_dates()
 
     trading_hours = stra.config.trading_hours
-    time_delta = pd.Timedelta(minutes=tf[0])
-
-    if trade:
 
-        trader = Trader("CON.F.US.EP.H26", con)
-
-        def _build_candle(bucket):
-            open_ = bucket[0]
-            high = max(bucket)
-            low = min(bucket)
-            close = bucket[-1]
-            return open_, high, low, close
+    if trade and daemon:
 
+        # Attached to a headless daemon, bars and the forming candle come from its state endpoint
         @callback(
             Output("chart", "figure"),
             Input("interval", "n_intervals"),
         )
         def update_output(n_intervals):
-            bucket, candles_poped = ws.pop_bucket()
-            if bucket:
-                open_, high, low, close = _build_candle(bucket)
-
-                log.info(candles_poped)
-                last_ts = stra.df.iloc[-1]["time"]
-                if candles_poped == 1:  # Updates first partial candle
-                    partial_candle = stra.df.iloc[-1].copy()
-                    last_idx = stra.df.index[-1]
-                    stra.df.at[last_idx, "high"] = max(partial_candle["high"], high)
-                    stra.df.at[last_idx, "low"] = min(partial_candle["low"], low)
-                    stra.df.at[last_idx, "close"] = close
-                else:
-                    # /home/rad/Projects/rad/radx/main.py:211: FutureWarning:
-                    # The behavior of DataFrame concatenation with empty or all-pd.NA entries is deprecated. In a future version, this will no longer exclude empty or all-NA columns when determining the result dtypes. To retain the old behavior, exclude the relevant entries before the concat operation.
-                    stra.df.loc[len(stra.df)] = {
-                        "time": last_ts + time_delta,
-                        "open": open_,
-                        "high": high,
-                        "low": low,
-                        "close": close,
-                        "trading_allowed": True,
-                    }
-
-                    # Update strategy
-                    action = stra.update()
-                    if action:
-                        log.info(f"Action: {action.action_type}, Stop: {action.stop}")
-                        trader.execute(action)
-
-            active = ws.get_current_bucket()
+            state = daemon.sync(stra)
 
             return build_chart(
-                stra, positions, last_day, trading_hours, last_price=ws and ws.last_price, active=active and _build_candle(active)  # None,
+                stra,
+                positions,
+                stra.df["time"].iloc[-1],
+                trading_hours,
+                last_price=state["last_price"],
+                active=state["candle"] and tuple(state["candle"]),
             )
 
+    elif trade:
+
+        # Bars close on the websocket thread and drive the strategy directly, the chart only observes
+        user_hub = UserHub(con).run()
+        runner = StrategyRunner(stra, Trader("CON.F.US.EP.H26", con, user_hub.account))
+        ws.on_bar_close(runner.on_bar_close)
+        ws.on_backfill(runner.on_backfill)
+        ws.run()
+
+        @callback(
+            Output("chart", "figure"),
+            Input("interval", "n_intervals"),
+        )
+        def update_output(n_intervals):
+            active = ws.current_candle()
+
+            # Bars are appended on the websocket thread, the chart reads them under the same lock
+            with runner.lock:
+                return build_chart(
+                    stra,
+                    positions,
+                    stra.df["time"].iloc[-1],
+                    trading_hours,
+                    last_price=ws.last_price,
+                    active=active and active.ohlc(),
+                )
+
     else:
 
         @callback(
             Output("chart", "figure"),
             Input("date-picker", "date"),
             Input("trading-hours-slider", "value"),
+            Input("view-mode", "value"),
+            Input("chart", "relayoutData"),
+            State("chart-width", "data"),
         )
-        def update_output(date_value, slider_value):
-            if date_value:
-                return build_chart(
+        def update_output(date_value, slider_value, view_mode, relayout, width_px):
+            if view_mode == "range":
+                if ctx.triggered_id == "chart" and not visible_range(relayout) and not (relayout or {}).get("xaxis.autorange"):
+                    return no_update
+                return build_range_chart(
                     stra,
                     positions,
-                    pd.to_datetime(date_value),
-                    slider_value,
+                    visible_range(relayout) if ctx.triggered_id == "chart" else None,
+                    width_px=width_px or CHART_WIDTH_PX,
                     last_price=ws and ws.last_price,
                 )
 
+            if ctx.triggered_id == "chart":
+                return no_update
+
+            if date_value:
+                return day_chart(pd.to_datetime(date_value), slider_value, last_price=ws and ws.last_price)
+
+        register_sweep_callbacks(bars, strategy, tf, BACKTESTING_PARAMS.get("trading_hours", trading_hours), cache)
+        if comparison:
+            register_compare_callbacks(comparison)
+
+        # Plot width in pixels, drives the range view resolution
+        clientside_callback(
+            """
+            function(relayout) {
+                const chart = document.getElementById("chart");
+                return chart ? chart.offsetWidth : window.innerWidth;
+            }
+            """,
+            Output("chart-width", "data"),
+            Input("chart", "relayoutData"),
+            prevent_initial_call=False,
+        )
+
         @callback(
             Output("table-records", "data"),
             Input("date-picker", "date"),
@@ -260,7 +385,7 @@ def run_ui(df: pd.DataFrame, con: Connector, ws: Websocket, config: tuple, trade
 
     graph = dcc.Graph(
         id="chart",
-        figure=build_chart(stra, positions if not trade else None, last_day, trading_hours=trading_hours),
+        figure=build_chart(stra, None, last_day, trading_hours=trading_hours) if trade else day_chart(last_day, trading_hours),
         style={"height": "85vh"},
     )
     app.layout = html.Div(
@@ -269,214 +394,90 @@ def run_ui(df: pd.DataFrame, con: Connector, ws: Websocket, config: tuple, trade
             if trade
             else [
                 dcc.Interval(id="interval", interval=1 * 1000) if stream else None,  # updates every 1 secs
-                html.Div(
-                    children=[
-                        html.H4(
-                            id="header",
-                            children=title,
-                            style={"textAlign": "center", "margin-right": 20},
-                        ),
-                        dcc.DatePickerSingle(
-                            id="date-picker",
-                            date=df["time"].max(),
-                            min_date_allowed=df["time"].min(),
-                            max_date_allowed=df["time"].max(),
-                            display_format="MMM Do, YY",
-                            disabled_days=disabled_dates,
-                            first_day_of_week=1,
-                            clearable=True,
-                            with_portal=True,
-                        ),
-                    ],
-                    style={"display": "flex", "justifyContent": "center"},
-                ),
-                dcc.RangeSlider(0, 24, 1, value=trading_hours, id="trading-hours-slider"),
-                html.Div(
+                dcc.Tabs(
                     children=[
-                        dcc.Graph(id="summary_chart", figure=summary_fig),
-                        html.Div(
+                        dcc.Tab(
+                            label="Chart",
                             children=[
-                                graph,
-                                html.H6(children=f"Buys {pf.orders.buy.count()}, Sells {pf.orders.sell.count()}"),
+                                html.Div(
+                                    children=[
+                                        html.H4(
+                                            id="header",
+                                            children=title,
+                                            style={"textAlign": "center", "margin-right": 20},
+                                        ),
+                                        dcc.DatePickerSingle(
+                                            id="date-picker",
+                                            date=df["time"].max(),
+                                            min_date_allowed=df["time"].min(),
+                                            max_date_allowed=df["time"].max(),
+                                            display_format="MMM Do, YY",
+                                            disabled_days=disabled_dates,
+                                            first_day_of_week=1,
+                                            clearable=True,
+                                            with_portal=True,
+                                        ),
+                                        dcc.RadioItems(
+                                            id="view-mode",
+                                            options=[{"label": "Day", "value": "day"}, {"label": "Range", "value": "range"}],
+                                            value="day",
+                                            inline=True,
+                                            style={"margin-left": 20, "alignSelf": "center"},
+                                        ),
+                                        dcc.Store(id="chart-width", data=CHART_WIDTH_PX),
+                                    ],
+                                    style={"display": "flex", "justifyContent": "center"},
+                                ),
+                                dcc.RangeSlider(0, 24, 1, value=trading_hours, id="trading-hours-slider"),
+                                html.Div(
+                                    children=[
+                                        dcc.Graph(id="summary_chart", figure=summary_fig),
+                                        html.Div(
+                                            children=[
+                                                graph,
+                                                html.H6(children=f"Buys {len(positions)}, Sells {int((positions['Status'] == 'Closed').sum())}"),
+                                            ],
+                                            style={"flex": 1},
+                                        ),
+                                    ],
+                                    style={"display": "flex"},
+                                ),
+                                dash_table.DataTable(
+                                    data=build_table_records(positions, last_day),
+                                    columns=[
+                                        {"name": i, "id": i}
+                                        for i in [
+                                            "Direction",
+                                            "Size",
+                                            "PnL",
+                                            "Entry Timestamp",
+                                            "Avg Entry Price",
+                                            "Exit Timestamp",
+                                            "Avg Exit Price",
+                                            "Ticks",
+                                            "Gain",
+                                            "Status",
+                                        ]
+                                    ],
+                                    id="table-records",
+                                ),
                             ],
-                            style={"flex": 1},
                         ),
-                    ],
-                    style={"display": "flex"},
-                ),
-                dash_table.DataTable(
-                    data=build_table_records(positions, last_day),
-                    columns=[
-                        {"name": i, "id": i}
-                        for i in [
-                            "Direction",
-                            "Size",
-                            "PnL",
-                            "Entry Timestamp",
-                            "Avg Entry Price",
-                            "Exit Timestamp",
-                            "Avg Exit Price",
-                            "Ticks",
-                            "Gain",
-                            "Status",
-                        ]
-                    ],
-                    id="table-records",
+                        dcc.Tab(label="Sweep", children=sweep_layout(bars)),
+                        *([dcc.Tab(label="Compare", children=compare_layout(comparison, last_day, trading_hours))] if comparison else []),
+                    ]
                 ),
             ]
         ),
     )
 
-    app.run()
-
-
-def build_table_records(df, date):
-    records = df[df["Entry Timestamp"].dt.date == date.date()]
-    sum_row = records[["Ticks", "Gain"]].sum().to_frame().T
-    sum_row["Direction"] = "TOTAL"
-    records = pd.concat([records, sum_row], ignore_index=True)
-
-    return records.to_dict("records")
-
-
-def build_chart(
-    stra: BaseStrategy,
-    positions: Optional[pd.DataFrame],
-    date=datetime.today(),
-    trading_hours: tuple[int, int] = [],
-    last_price: float = None,
-    active: Optional[tuple[float, float, float, float]] = None,
-) -> go.Figure:
-    df = stra.df
-    df = df[df["time"].dt.date == date.date()]
-
-    time_delta = pd.Timedelta(minutes=3)
-
-    positions_scatters = []
-    if positions is not None:
-        df = pd.merge(df, positions, left_on="t_original", right_on="Exit Timestamp", how="left")
-        long_entries = df[df["Entry Timestamp"].notna()]
-        long_exits = df[df["Exit Timestamp"].notna()]
-        positions_scatters = [
-            go.Scatter(
-                x=long_entries["Entry Timestamp"],
-                y=long_entries["Avg Entry Price"],
-                mode="markers",
-                name="Buys",
-                text="Buy",
-                marker=dict(
-                    color="green",
-                    size=20,
-                    symbol="triangle-up",
-                ),
-                textposition="bottom center",
-            ),
-            go.Scatter(
-                x=df["time"],
-                y=df["stops"],
-                mode="lines",
-                name="Stop",
-                line=dict(color="black", width=1),
-            ),
-            go.Scatter(
-                x=long_exits["Exit Timestamp"],
-                y=long_exits["Avg Exit Price"],
-                mode="markers",
-                name="Sell",
-                text=long_exits["Ticks"].apply(lambda x: f"Sell {x:+0.0f}"),
-                marker=dict(
-                    color="red",
-                    size=20,
-                    symbol="triangle-down",
-                ),
-                textposition="top center",
-            ),
-        ]
-
-    if trading_hours:
-        df = df[(df["time"].dt.hour >= max((trading_hours[0] - 1), 0) % 25) & (df["time"].dt.hour <= trading_hours[1])]
-
-    indicators = map(
-        lambda ind: go.Scatter(
-            x=df["time"],
-            y=df[ind.key],
-            mode=ind.mode,
-            name=ind.key.replace("_", " ").title(),
-            line=dict(color=ind.color, width=ind.width),
-        ),
-        stra.drawable_indicators,
-    )
-
-    def active_candle():
-        if not active:
-            return []
-
-        open_, high, low, close = active
-        return [
-            go.Candlestick(
-                x=df.tail(1)["time"] + time_delta,
-                high=[high],
-                low=[low],
-                open=[open_],
-                close=[close],
-                name="Active",
-                increasing_line_color="gray",
-                decreasing_line_color="gray",
-            ),
-        ]
-
-    fig = go.Figure(
-        data=[
-            go.Candlestick(
-                x=df["time"],
-                open=df["open"],
-                high=df["high"],
-                low=df["low"],
-                close=df["close"],
-                name="Price",
-            ),
-            *active_candle(),
-            *indicators,
-            *positions_scatters,
-        ],
-    )
-
-    trading_allowed = df[df["trading_allowed"]]
-
-    fig.add_vline(
-        x=trading_allowed.iloc[0]["time"],
-        line_width=2,
-        line_dash="dash",
-        line_color="green",
-    )
-
-    if not active:
-        fig.add_vline(
-            x=trading_allowed.iloc[-1]["time"] + time_delta,
-            line_width=1,
-            line_dash="dash",
-            line_color="red",
-        )
-
-    if last_price:
-        fig.add_hline(
-            y=last_price,
-            line_width=1,
-            line_color="black",
-            line_dash="dot",
-            annotation_text=f"Last Price {last_price}",
-            annotation_position="top left",
-        )
-    fig.update_layout(
-        xaxis_rangeslider_visible=False,
-        yaxis=dict(side="right"),
-    )
-
-    if not df.empty:
-        pad = time_delta * 3
-        fig.update_xaxes(range=[df["time"].min(), df["time"].max() + pad])
-
-    return fig
+    try:
+        app.run()
+    finally:
+        if trade and not daemon:
+            tracer.dump()
+        if comparison:
+            comparison.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Optional
+
+from config import PROFILE_DIR, PROFILE_INTERVAL_MS
+from logger import create_logger
+
+log = create_logger(__name__)
+
+_active: Optional["SamplingProfiler"] = None
+
+
+class Timers:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats: dict[str, list[int]] = {}  # name -> [calls, total nanos, max nanos]
+
+    def add(self, name: str, elapsed_ns: int):
+        with self._lock:
+            stats = self.stats.setdefault(name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += elapsed_ns
+            stats[2] = max(stats[2], elapsed_ns)
+
+
+@contextmanager
+def timer(name: str):
+    # Scoped timer, only recorded while a profiler runs
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profiler.timers.add(name, time.perf_counter_ns() - start)
+
+
+def timed(name: str) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return fn(*args, **kwargs)
+
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.timers.add(name, time.perf_counter_ns() - start)
+
+        return wrapper
+
+    return decorator
+
+
+# Wall-clock sampling of every thread's stack from a background thread, nothing is hooked into the profiled code.
+# Writes `<stamp>.collapsed` (one `thread;outer;...;inner count` line per stack, input of flamegraph.pl / speedscope)
+# and `<stamp>.txt` (per-function self/total samples and the scoped timers) on `stop`.
+class SamplingProfiler:
+    def __init__(self, directory: str = PROFILE_DIR, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self.timers = Timers()
+        self._labels: dict = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        global _active
+
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        _active = self
+        return self
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> tuple[str, str]:
+        global _active
+
+        if _active is self:
+            _active = None
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        collapsed = os.path.join(self.directory, f"{stamp}.collapsed")
+        summary = os.path.join(self.directory, f"{stamp}.txt")
+
+        with open(collapsed, "w", encoding="utf-8") as f:
+            f.writelines(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items())
+        with open(summary, "w", encoding="utf-8") as f:
+            f.write(self.summary())
+
+        log.info(f"Profile written to {collapsed} and {summary}")
+        return collapsed, summary
+
+    def functions(self) -> list[tuple[str, int, int]]:
+        # (function, self samples, total samples), total counts a function once per stack
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        return sorted(((label, own[label], n) for label, n in total.items()), key=lambda row: (-row[2], -row[1]))
+
+    def summary(self, top: int = 50) -> str:
+        elapsed = time.perf_counter() - self._started
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms over {elapsed:.1f} s", ""]
+
+        lines.append(f"{'self':>8} {'total':>8}  function")
+        for label, own, total in self.functions()[:top]:
+            lines.append(f"{own:>8} {total:>8}  {label}")
+
+        lines += ["", f"{'calls':>8} {'total ms':>10} {'mean ms':>10} {'max ms':>10}  timer"]
+        for name, (calls, total_ns, max_ns) in sorted(self.timers.stats.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{calls:>8} {total_ns / 1e6:>10.1f} {total_ns / calls / 1e6:>10.3f} {max_ns / 1e6:>10.3f}  {name}")
+
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profiling(enabled: bool = True, **kwargs):
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler(**kwargs).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
@@ -0,0 +1,195 @@
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+import requests
+
+from config import API_URL
+from logger import create_logger
+
+log = create_logger(__name__)
+
+TOKEN_PATH = ".token.json"
+TOKEN_TTL = timedelta(hours=24)
+REFRESH_MARGIN = timedelta(hours=1)  # refresh this long before expiry
+RETRY_INTERVAL = 60  # seconds between failed refresh attempts
+LOOKUP_TTL = 300  # seconds accounts/contracts lookups are cached
+
+
+class TTLCache:
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._data: dict[Any, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader: Callable[[], Any]):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+
+        value = loader()
+        with self._lock:
+            self._data[key] = (now + self._ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+def _token_expiry(token: str, issued: datetime) -> datetime:
+    # JWT `exp` when present, otherwise assume the documented 24h lifetime
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return datetime.fromtimestamp(claims["exp"])
+    except Exception:
+        return issued + TOKEN_TTL
+
+
+# One authenticated requests.Session per process, shared by every Connector.
+# The token is kept in memory and refreshed in the background before it expires, listeners (websockets) get the new one.
+class SessionManager:
+    _shared: Optional["SessionManager"] = None
+    _shared_pid: Optional[int] = None
+    _shared_lock = threading.Lock()
+
+    session: requests.Session
+    token: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+    def __init__(self, token_path: str = TOKEN_PATH):
+        self.session = requests.Session()
+        self.cache = TTLCache(LOOKUP_TTL)
+        self._token_path = token_path
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    @classmethod
+    def shared(cls) -> "SessionManager":
+        with cls._shared_lock:
+            # Forked workers get their own session
+            if cls._shared is None or cls._shared_pid != os.getpid():
+                cls._shared = cls()
+                cls._shared_pid = os.getpid()
+                cls._shared.start()
+            return cls._shared
+
+    def start(self):
+        stored = self._read_token()
+        if stored:
+            self._set_token(*stored)
+        else:
+            self._login()
+        self._schedule()
+
+    def stop(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def on_token(self, callback: Callable[[str], None]):
+        self._listeners.append(callback)
+
+    def _store_token(self, token: str, issued: datetime):
+        with open(self._token_path, "w") as outfile:
+            json.dump({"ts": int(issued.timestamp()), "token": token}, outfile)
+
+        log.debug(f"Token saved l={len(token)}")
+
+    def _read_token(self) -> Optional[tuple[str, datetime]]:
+        try:
+            with open(self._token_path, "r") as outfile:
+                data = json.load(outfile)
+        except (OSError, ValueError):
+            return None
+
+        issued = datetime.fromtimestamp(data["ts"])
+        if _token_expiry(data["token"], issued) - datetime.now() < REFRESH_MARGIN:
+            log.debug("Stored token about to expire, reloading...")
+            return None
+
+        log.debug(f"Token loaded from {issued}")
+        return data["token"], issued
+
+    def _set_token(self, token: str, issued: datetime):
+        with self._lock:
+            self.token = token
+            self.expires_at = _token_expiry(token, issued)
+            # Update in place, other headers set on the shared session survive
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+        for callback in self._listeners:
+            try:
+                callback(token)
+            except Exception as e:
+                log.error(f"Token listener failed: {e}")
+
+    def _login(self):
+        username = os.getenv("SECRET_USERNAME")
+        if not username:
+            raise Exception("Missing .env setup")
+
+        res = requests.post(
+            f"{API_URL}/api/Auth/loginKey",
+            json={
+                "userName": username,
+                "apiKey": os.getenv("SECRET_API_KEY"),
+            },
+        )
+
+        data = res.json()
+        if not data["success"]:
+            raise Exception(f"Login failed: {data.get('errorCode')} -> {data.get('errorMessage')}")
+
+        issued = datetime.now()
+        self._store_token(data["token"], issued)
+        self._set_token(data["token"], issued)
+
+    def refresh(self):
+        # Auth/validate returns a fresh token for a still valid one, full login otherwise
+        try:
+            res = self.session.post(f"{API_URL}/api/Auth/validate", json={})
+            data = res.json() if res.ok else {}
+        except requests.RequestException as e:
+            log.error(f"Token validate failed: {e}")
+            data = {}
+
+        if data.get("success") and data.get("newToken"):
+            issued = datetime.now()
+            self._store_token(data["newToken"], issued)
+            self._set_token(data["newToken"], issued)
+            log.info("Token refreshed")
+        else:
+            log.info("Token validate rejected, logging in again")
+            self._login()
+
+    def _schedule(self, delay: Optional[float] = None):
+        if delay is None:
+            delay = max((self.expires_at - REFRESH_MARGIN - datetime.now()).total_seconds(), 0)
+
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._refresh_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+            self._schedule()
+        except Exception as e:
+            log.error(f"Token refresh failed, retrying in {RETRY_INTERVAL}s: {e}")
+            self._schedule(RETRY_INTERVAL)
@@ -1,9 +1,15 @@
-from typing import Any, List, Optional, Tuple
+from typing import Any, List, Optional, Tuple, Union
 from enum import Enum
 
+import numpy as np
 import pandas as pd
 import os
+import glob
 import importlib
+import inspect
+
+from bars import BarBuffer, Calendar, CompactBars, OutputBuffer
+from profiler import timed
 
 
 class ActionType(Enum):
@@ -31,20 +37,79 @@ class DrawableIndicator:
 
 class StrategyConfig:
     trading_hours: Tuple[int, int]
+    max_history: Optional[int]
 
-    def __init__(self, trading_hours: Tuple[int, int] = [0, 24]):
+    def __init__(self, trading_hours: Tuple[int, int] = [0, 24], max_history: Optional[int] = None):
         self.trading_hours = trading_hours
+        self.max_history = max_history  # bars kept in memory, None keeps all
 
 
 class BaseStrategy:
-    df: pd.DataFrame
+    bars: Optional[CompactBars] = None
+    buffer: BarBuffer
+    outputs: OutputBuffer
     drawable_indicators: List[DrawableIndicator] = []
     config: StrategyConfig
     _params: dict[str, Any]
-
-    def __init__(self, df: pd.DataFrame, config: StrategyConfig):
-        self.df = df.copy()
+    _df: pd.DataFrame
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Scoped timers for `--profile`, plain calls otherwise
+        for name in ("run", "update"):
+            if name in cls.__dict__:
+                setattr(cls, name, timed(f"strategy.{name}")(cls.__dict__[name]))
+
+    def __init__(self, df: Union[pd.DataFrame, CompactBars, BarBuffer], config: StrategyConfig):
+        # A BarBuffer is used as is, strategies over the same fixed bars (e.g. compared variants) share it.
+        # CompactBars stay the source (`self.bars`: caches, fingerprints, shards); the indicator kernels and
+        # vectorbt need float64 prices, so only the kept tail is scaled into the buffer
         self.config = config
+        if isinstance(df, (CompactBars, BarBuffer)):
+            if isinstance(df, CompactBars):
+                self.bars = df
+                df = BarBuffer.from_compact(df, max_history=config.max_history)
+            self.buffer = df
+            self.outputs = OutputBuffer(self.buffer.capacity)
+            self._frame()
+        else:
+            self.df = df
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Bars and outputs as views, valid until the next run/update/append; copy to keep
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        # Replaces the bars, strategy outputs are recomputed by the next run/update
+        self.buffer = BarBuffer.from_frame(df, max_history=self.config.max_history)
+        self.outputs = OutputBuffer(self.buffer.capacity)
+        self._frame()
+
+    @property
+    def calendar(self) -> Calendar:
+        # Day codes, hours and session masks of the current bars, shared with the dashboard
+        return self.buffer.calendar()
+
+    def _frame(self) -> pd.DataFrame:
+        # Zero-copy frame over the bars and the outputs aligned to them
+        self.outputs.align(self.buffer.column("time"))
+        self._df = self.buffer.frame(self.outputs.views())
+        return self._df
+
+    def append_bar(self, time: pd.Timestamp, open_: float, high: float, low: float, close: float, volume: int = 0):
+        # New bar with blank outputs until the next update
+        self.buffer.append(time, open_, high, low, close, volume)
+        self._frame()
+
+    def update_bar(self, high: float, low: float, close: float, volume: int = 0):
+        # Partial last bar, the frame sees it through its views
+        self.buffer.update_last(high, low, close, volume)
+
+    def replace_bar(self, open_: float, high: float, low: float, close: float, volume: int = 0):
+        # Corrected last bar, strategy outputs are recomputed by the next update
+        self.buffer.set_last(open_, high, low, close, volume)
 
     def run(self, **params) -> pd.DataFrame:
         raise IMPL_ERROR
@@ -52,6 +117,18 @@ class BaseStrategy:
     def update(self) -> Optional[Action]:
         raise IMPL_ERROR
 
+    def results(self) -> dict[str, np.ndarray]:
+        raise IMPL_ERROR
+
+    def restore(self, values: dict[str, np.ndarray], **params) -> pd.DataFrame:
+        raise IMPL_ERROR
+
+    def columns(self, **params) -> dict[str, np.ndarray]:
+        raise IMPL_ERROR
+
+    def warmup(self, **params) -> int:
+        raise IMPL_ERROR
+
 
 class StrategyFactory:
     _strategies = {}
@@ -61,13 +138,25 @@ class StrategyFactory:
         cls._strategies[strategy_class.__name__.lower()] = strategy_class
 
     @classmethod
-    def create(cls, strategy_name: str, df: pd.DataFrame, config: StrategyConfig) -> BaseStrategy:
+    def create(cls, strategy_name: str, df: Union[pd.DataFrame, CompactBars, BarBuffer], config: StrategyConfig) -> BaseStrategy:
         strategy_name = strategy_name.lower()
         if strategy_name in cls._strategies:
             return cls._strategies[strategy_name](df, config)
         else:
             raise ValueError(f"Unknown strategy: {strategy_name}")
 
+    @classmethod
+    def source_files(cls, strategy_name: str) -> list[str]:
+        # Files of this package the strategy's results depend on: its own module and the shared code (base classes,
+        # graph nodes, indicators), other strategies' modules left out
+        strategy = cls._strategies.get(strategy_name.lower())
+        if strategy is None:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+        own = os.path.abspath(inspect.getsourcefile(strategy))
+        others = {os.path.abspath(inspect.getsourcefile(s)) for s in cls._strategies.values()} - {own}
+        files = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "**", "*.py"), recursive=True)
+        return sorted(f for f in files if f not in others)
+
 
 # Dynamically register all strategies in the strategies directory
 strategies_dir = os.path.dirname(__file__)
@@ -77,5 +166,6 @@ for file in os.listdir(strategies_dir):
         module = importlib.import_module(module_name)
         for attr in dir(module):
             obj = getattr(module, attr)
-            if isinstance(obj, type) and issubclass(obj, BaseStrategy) and obj is not BaseStrategy:
+            # Only classes defined in the module, bases like GraphStrategy are imported, not registered
+            if isinstance(obj, type) and issubclass(obj, BaseStrategy) and obj.__module__ == module_name:
                 StrategyFactory.register_strategy(obj)
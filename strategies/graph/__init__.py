@@ -0,0 +1,16 @@
+from strategies.graph.nodes import (
+    FIELDS,
+    CrossAbove,
+    CrossBelow,
+    Expr,
+    Indicator,
+    Node,
+    Position,
+    SMA,
+    Session,
+    SessionClose,
+    SkipFirstExit,
+    TradeId,
+    TrailingStop,
+)
+from strategies.graph.engine import Graph, GraphStrategy, bar_fields
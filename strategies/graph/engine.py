@@ -0,0 +1,213 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from bars import BarBuffer, Calendar
+from strategies import IMPL_ERROR, Action, BaseStrategy, DrawableIndicator
+from strategies.graph.nodes import FIELDS, Indicator, Node
+
+MEMO_COLUMNS = 64  # indicator columns a strategy keeps across runs over the same bars, oldest dropped first
+
+
+def bar_fields(buffer: BarBuffer, start: int = 0) -> dict[str, np.ndarray]:
+    # Views of the buffer, `hour` and `day` were computed once when the bars were added
+    return {key: buffer.column(key)[start:] for key in FIELDS}
+
+
+def _toposort(nodes: list[Node]) -> list[Node]:
+    by_name = {node.name: node for node in nodes}
+    if len(by_name) != len(nodes):
+        raise ValueError("Duplicate node names")
+
+    ordered, done, visiting = [], set(FIELDS), set()
+
+    def visit(node: Node):
+        if node.name in done:
+            return
+        if node.name in visiting:
+            raise ValueError(f"Cycle through node {node.name}")
+        visiting.add(node.name)
+        for name in node.inputs:
+            if name not in by_name and name not in FIELDS:
+                raise ValueError(f"Node {node.name} reads unknown input {name}")
+            if node.lookahead and name not in FIELDS:
+                raise ValueError(f"Lookahead node {node.name} can only read bar fields, not {name}")
+            if name in by_name:
+                visit(by_name[name])
+        visiting.discard(node.name)
+        done.add(node.name)
+        ordered.append(node)
+
+    for node in nodes:
+        visit(node)
+    return ordered
+
+
+# Strategy definition as a graph of nodes, evaluated over whole columns or one bar at a time
+class Graph:
+    nodes: list[Node]
+
+    def __init__(self, nodes: list[Node]):
+        self.nodes = _toposort(nodes)
+
+    @property
+    def outputs(self) -> list[str]:
+        return [node.name for node in self.nodes if not node.name.startswith("_")]
+
+    def drawables(self) -> list[DrawableIndicator]:
+        return [DrawableIndicator(node.name, *node.draw) for node in self.nodes if node.draw]
+
+    def run(self, fields: dict[str, np.ndarray], calendar: Optional[Calendar] = None, memo: Optional[dict] = None) -> dict[str, np.ndarray]:
+        # Calendar nodes read cached masks of the dataset when `calendar` is given. `memo` keeps columns of nodes
+        # that only read bar fields by `memo_key`, it must be dropped when the fields change
+        values = dict(fields)
+        for node in self.nodes:
+            if calendar is not None and node.calendar:
+                values[node.name] = node.from_calendar(calendar)
+                continue
+
+            key = node.memo_key() if memo is not None and all(name in FIELDS for name in node.inputs) else None
+            if key is not None and key in memo:
+                values[node.name] = memo[key]
+                continue
+
+            values[node.name] = node.batch(*[values[name] for name in node.inputs])
+            if key is not None:
+                if len(memo) >= MEMO_COLUMNS:
+                    memo.pop(next(iter(memo)))
+                values[node.name].flags.writeable = False
+                memo[key] = values[node.name]
+        return values
+
+    def initial(self) -> dict:
+        return {node.name: node.initial() for node in self.nodes}
+
+    def step(self, states: dict, row: dict, ahead: Optional[dict] = None) -> tuple[dict, dict]:
+        # Values of one bar and the node states after it, `ahead` holds the next bar's fields once it exists
+        values, after = dict(row), {}
+        for node in self.nodes:
+            args = [values[name] for name in node.inputs]
+            if node.lookahead:
+                next_args = ahead and tuple(ahead[name] for name in node.inputs)
+                values[node.name], after[node.name] = node.step(states[node.name], *args, ahead=next_args)
+            else:
+                values[node.name], after[node.name] = node.step(states[node.name], *args)
+        return values, after
+
+    def states(self, fields: dict[str, np.ndarray], k: int) -> dict:
+        # Node states after the first `k` bars, the same as stepping them but node by node over whole columns.
+        # `fields` needs the bar after them for lookahead nodes
+        values, states = dict(fields), {}
+        for node in self.nodes:
+            values[node.name], states[node.name] = node.seed(k, *[values[name] for name in node.inputs])
+        return states
+
+
+def _rows(fields: dict[str, np.ndarray]) -> list[dict]:
+    columns = [fields[key].tolist() for key in FIELDS]
+    return [dict(zip(FIELDS, values)) for values in zip(*columns)]
+
+
+# Strategy defined by `nodes()`. `run` evaluates the graph vectorized, `update` only steps the bars added since.
+# The last bar stays provisional (lookahead nodes, partial bar updates): node states are kept as of the bar before it,
+# and each update re-steps from there.
+class GraphStrategy(BaseStrategy):
+    graph: Graph
+    _states: Optional[dict] = None  # after the bar before `_time`, None until the first update
+    _time: int  # epoch nanos of the provisional bar
+    _run_buffer: Optional[BarBuffer] = None
+    _memo: dict
+    _memo_for: Optional[tuple[BarBuffer, int]] = None  # buffer and revision the memo was computed on
+    carry: dict = {}  # node name: carried state for batch runs over a slice of the bars, e.g. `Position.carry`
+
+    def nodes(self, **params) -> list[Node]:
+        raise IMPL_ERROR
+
+    def action(self, last: pd.Series) -> Optional[Action]:
+        raise IMPL_ERROR
+
+    def run(self, **params) -> pd.DataFrame:
+        return self._store(self.columns(**params))
+
+    def columns(self, **params) -> dict[str, np.ndarray]:
+        # Every column of the graph over all bars, intermediate ones included, without touching the strategy frame
+        self._build(params)
+        if self._memo_for != (self.buffer, self.buffer.revision):
+            # Indicator columns are reused by runs over the same bars, e.g. every combination of a sweep
+            self._memo, self._memo_for = {}, (self.buffer, self.buffer.revision)
+        return self.graph.run(bar_fields(self.buffer), self.buffer.calendar(), self._memo)
+
+    def warmup(self, **params) -> int:
+        # Bars of history the graph needs before its columns match a run over the full history
+        return max((node.warmup() for node in Graph(self.nodes(**params)).nodes), default=0)
+
+    def results(self) -> dict[str, np.ndarray]:
+        # Output columns of the last run, copies that outlive later updates
+        return {name: self.outputs.column(name).copy() for name in self.graph.outputs}
+
+    def restore(self, values: dict[str, np.ndarray], **params) -> pd.DataFrame:
+        # Same state as `run(**params)` from its `results()` over the same bars, e.g. from a cache
+        self._build(params)
+        return self._store(values)
+
+    def _build(self, params: dict):
+        self._params = params
+        self.graph = Graph(self.nodes(**params))
+        for node in self.graph.nodes:
+            if node.name in self.carry:
+                node.carry = self.carry[node.name]
+            if isinstance(node, Indicator):
+                node.history = self.config.max_history
+        self.drawable_indicators = self.graph.drawables()
+
+    def _store(self, values: dict[str, np.ndarray]) -> pd.DataFrame:
+        self.outputs.align(self.buffer.column("time"))
+        self.outputs.retain(self.graph.outputs)
+        for name in self.graph.outputs:
+            self.outputs.write(name, values[name])
+        self._time = int(self.buffer.column("time")[-1])
+        self._states = None
+        self._run_buffer = self.buffer
+
+        return self._write()
+
+    def update(self) -> Optional[Action]:
+        if not self._advance():
+            self.run(**self._params)
+        return self.action(self.df.iloc[-1])
+
+    def _write(self) -> pd.DataFrame:
+        return self._frame()
+
+    def _advance(self) -> bool:
+        if self._run_buffer is not self.buffer:
+            return False  # bars replaced through the `df` setter
+
+        times = self.buffer.column("time")
+        k = int(np.searchsorted(times, self._time))
+        if k == len(times) or times[k] != self._time:
+            return False  # provisional bar trimmed away
+
+        if self._states is None:
+            # Node states once, from the committed bars
+            self._states = self.graph.states({key: values[: k + 1] for key, values in bar_fields(self.buffer).items()}, k)
+
+        rows = _rows(bar_fields(self.buffer, k))
+        new = {name: [] for name in self.graph.outputs}
+        for i, row in enumerate(rows):
+            ahead = rows[i + 1] if i + 1 < len(rows) else None
+            values, states = self.graph.step(self._states, row, ahead)
+            if ahead is not None:
+                self._states = states
+            for name in new:
+                new[name].append(values[name])
+
+        # Written in place from the old provisional bar on
+        self.outputs.align(times)
+        for name, values in new.items():
+            self.outputs.write(name, np.asarray(values, dtype=self.outputs.columns[name].dtype), start=k)
+
+        self._time = int(times[-1])
+        self._write()
+        return True
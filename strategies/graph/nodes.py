@@ -0,0 +1,322 @@
+import math
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+from vectorbt.generic.nb import crossed_above_1d_nb
+
+from strategies.indicators import f64, kernel
+
+SETTLE_PERIODS = 5  # warm-up of recursive TA-Lib kernels, in multiples of their period
+DEFAULT_TIMEPERIOD = 30  # TA-Lib's default when an Indicator gives none
+
+# Per bar inputs every graph gets, `hour` and `day` (days since epoch) are local to the bars timezone
+FIELDS = ("time", "open", "high", "low", "close", "volume", "hour", "day")
+
+
+# One column of a strategy. `batch` computes the whole column from its input columns (backtests),
+# `step` one bar from the node state and the bar's input values (live). Both must agree bar for bar.
+# Nodes named with a leading underscore are intermediate and not written to the strategy frame.
+class Node:
+    name: str
+    inputs: tuple[str, ...] = ()
+    draw: Optional[tuple[str, str, int]] = None  # (mode, color, width) on the chart
+    lookahead: bool = False  # step also gets the next bar's inputs, None while the bar is the last one
+    calendar: bool = False  # batch can be read from the dataset's `Calendar` instead
+
+    def from_calendar(self, calendar):
+        raise NotImplementedError
+
+    def memo_key(self) -> Optional[tuple]:
+        # Hashable description of `batch` for nodes that only read bar fields, a sweep then computes the column
+        # once per dataset and reuses it across param combinations (`Graph.run` memo)
+        return None
+
+    def warmup(self) -> int:
+        # Bars of history before a value matches the one computed over the full history
+        return 0
+
+    def batch(self, *inputs: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def initial(self):
+        return None
+
+    def step(self, state, *inputs):
+        # -> (value, state after this bar)
+        raise NotImplementedError
+
+    def seed(self, n: int, *columns: np.ndarray) -> tuple[np.ndarray, object]:
+        # Values of the first `n` bars and the state after them, by stepping. Columns hold at least `n` rows, bar
+        # fields one more for lookahead nodes. Nodes with a vectorized way to their state override it
+        rows = list(zip(*[np.asarray(column).tolist() for column in columns]))
+        state, values = self.initial(), []
+        for i in range(n):
+            if self.lookahead:
+                value, state = self.step(state, *rows[i], ahead=rows[i + 1] if i + 1 < len(rows) else None)
+            else:
+                value, state = self.step(state, *rows[i])
+            values.append(value)
+        return np.asarray(values), state
+
+
+class Expr(Node):
+    # Elementwise and stateless, `fn` must work on arrays and on scalars alike
+    def __init__(self, name: str, fn: Callable, *inputs: str, draw: Optional[tuple[str, str, int]] = None):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        self.draw = draw
+
+    def batch(self, *inputs):
+        return self.fn(*inputs)
+
+    def step(self, state, *inputs):
+        return self.fn(*inputs), state
+
+
+class SMA(Node):
+    # Tick aligned prices sum exactly in float64, so the rolling and the per bar mean are identical
+    def __init__(self, name: str, src: str, window: int, draw: Optional[tuple[str, str, int]] = None):
+        self.name = name
+        self.inputs = (src,)
+        self.window = window
+        self.draw = draw
+
+    def memo_key(self):
+        return ("SMA", self.inputs, self.window)
+
+    def warmup(self):
+        return self.window
+
+    def batch(self, src):
+        return pd.Series(src, dtype=np.float64).rolling(self.window).mean().to_numpy()
+
+    def initial(self):
+        return ()
+
+    def step(self, state, x):
+        state = (state + (float(x),))[-self.window :]
+        return (math.fsum(state) / self.window if len(state) == self.window else np.nan), state
+
+
+class Indicator(Node):
+    # TA-Lib function by name (`strategies.indicators`), e.g. Indicator("atr", "ATR", "high", "low", "close", timeperiod=14).
+    # The kernels are causal, so `step` runs the kernel over the inputs so far and takes the last value: same as batch,
+    # O(bars) per step in C. The state is the inputs of the last `history` bars, the bars a live strategy keeps
+    # (`max_history`): recursive kernels (EMA, RSI) depend on where the bars start, so a step after the buffer is
+    # trimmed matches a batch over the trimmed bars
+    history: Optional[int] = None
+
+    def __init__(
+        self,
+        name: str,
+        fn: str,
+        *inputs: str,
+        output: Optional[int] = None,
+        draw: Optional[tuple[str, str, int]] = None,
+        **params,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs
+        self.output = output
+        self.params = params
+        self.draw = draw
+
+    def memo_key(self):
+        return ("Indicator", self.fn, self.inputs, self.output, tuple(sorted(self.params.items())))
+
+    def warmup(self):
+        # Recursive kernels (EMA, RSI, ATR) keep settling for several periods after the first value
+        return SETTLE_PERIODS * int(self.params.get("timeperiod", DEFAULT_TIMEPERIOD))
+
+    def batch(self, *inputs):
+        return kernel(self.fn, *[f64(x) for x in inputs], output=self.output, **self.params)
+
+    def initial(self):
+        return np.empty((len(self.inputs), 0), dtype=np.float64)
+
+    def step(self, state, *inputs):
+        window = np.concatenate([state, np.array(inputs, dtype=np.float64)[:, None]], axis=1)
+        if self.history:
+            window = window[:, -self.history :]
+        values = kernel(self.fn, *window, output=self.output, **self.params)
+        return float(values[-1]), window
+
+    def seed(self, n, *columns):
+        # One kernel run over the first `n` bars, the same as stepping them while they fit in `history`
+        inputs = np.stack([f64(column[:n]) for column in columns])
+        return self.batch(*inputs), inputs[:, -self.history :] if self.history else inputs
+
+
+class CrossAbove(Node):
+    # Same rules as vectorbt's crossed_above (wait=0): NaN resets, equality delays the cross by a bar
+    def __init__(self, name: str, a: str, b: str):
+        self.name = name
+        self.inputs = (a, b)
+
+    def batch(self, a, b):
+        return crossed_above_1d_nb(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+
+    def initial(self):
+        return False, -1  # was below, bars since the cross
+
+    def step(self, state, a, b):
+        was_below, ago = state
+        if np.isnan(a) or np.isnan(b):
+            return False, (False, -1)
+        if a > b:
+            if was_below:
+                return ago + 1 == 0, (was_below, ago + 1)
+            return False, state
+        if a == b:
+            return False, (was_below, -1)
+        return False, (True, -1)
+
+
+def CrossBelow(name: str, a: str, b: str) -> CrossAbove:
+    return CrossAbove(name, b, a)
+
+
+class Session(Node):
+    # Bar hour within [start, end)
+    calendar = True
+
+    def __init__(self, name: str, hours: tuple[int, int]):
+        self.name = name
+        self.inputs = ("hour",)
+        self.start, self.end = hours
+
+    def from_calendar(self, calendar):
+        return calendar.session((self.start, self.end))
+
+    def batch(self, hour):
+        return (hour >= self.start) & (hour < self.end)
+
+    def step(self, state, hour):
+        return bool(self.start <= hour < self.end), state
+
+
+class SessionClose(Node):
+    # Last in-session bar of its day, decided by the next bar, so the last known bar counts as closing
+    lookahead = True
+    calendar = True
+
+    def __init__(self, name: str, hours: tuple[int, int]):
+        self.name = name
+        self.inputs = ("day", "hour")
+        self.start, self.end = hours
+
+    def from_calendar(self, calendar):
+        return calendar.session_close((self.start, self.end))
+
+    def batch(self, day, hour):
+        allowed = (hour >= self.start) & (hour < self.end)
+        continues = np.append((day[1:] == day[:-1]) & allowed[1:], False)
+        return allowed & ~continues
+
+    def step(self, state, day, hour, ahead=None):
+        allowed = self.start <= hour < self.end
+        if ahead is None:
+            return bool(allowed), state
+        next_day, next_hour = ahead
+        return bool(allowed and not (next_day == day and self.start <= next_hour < self.end)), state
+
+
+class SkipFirstExit(Node):
+    # Drops the exit when it is the first signal of the day
+    def __init__(self, name: str, entries: str, exits: str):
+        self.name = name
+        self.inputs = (entries, exits, "day")
+
+    def batch(self, entries, exits, day):
+        signals = np.flatnonzero(entries | exits)
+        first = signals[np.append(True, day[signals][1:] != day[signals][:-1])] if len(signals) else signals
+        exits = exits.copy()
+        exits[first] = False
+        return exits
+
+    def initial(self):
+        return None, False  # day, signal seen that day
+
+    def step(self, state, entry, exit_, day):
+        seen = state[1] if state[0] == day else False
+        return bool(exit_ and seen), (day, seen or bool(entry or exit_))
+
+
+class Position(Node):
+    # Open entries, counting exits only up to the entries so far. With `hold_exit_bar` the exit bar is still in position.
+    # Exits while flat are counted too and absorb later entries, so the value depends on all history before the bars:
+    # `carry` = (row, entries minus exits before it) continues the full history's counts from `row` on in a batch over
+    # a slice of the bars, rows before it are warm-up
+    carry: Optional[tuple[int, int]] = None
+
+    def __init__(self, name: str, entries: str, exits: str, hold_exit_bar: bool = False):
+        self.name = name
+        self.inputs = (entries, exits)
+        self.hold_exit_bar = hold_exit_bar
+
+    def batch(self, entries, exits):
+        entries_cs = np.cumsum(entries.astype(np.int64))
+        exits_cs = np.cumsum(exits.astype(np.int64))
+        if self.carry is not None:
+            row, surplus = self.carry
+            if row:
+                entries_cs -= entries_cs[row - 1]
+                exits_cs -= exits_cs[row - 1]
+            entries_cs += max(surplus, 0)
+            exits_cs += max(-surplus, 0)
+        valid_exits_cs = np.minimum(exits_cs, entries_cs)
+        if self.hold_exit_bar:
+            return entries_cs - np.append(0, valid_exits_cs[:-1])
+        return entries_cs - valid_exits_cs
+
+    def initial(self):
+        return 0, 0, 0  # entries, exits, valid exits so far
+
+    def step(self, state, entry, exit_):
+        entries_cs, exits_cs, prev_valid = state
+        entries_cs, exits_cs = entries_cs + int(entry), exits_cs + int(exit_)
+        valid = min(exits_cs, entries_cs)
+        return entries_cs - (prev_valid if self.hold_exit_bar else valid), (entries_cs, exits_cs, valid)
+
+
+class TradeId(Node):
+    # Entry count while in position, 0 otherwise
+    def __init__(self, name: str, entries: str, position: str):
+        self.name = name
+        self.inputs = (entries, position)
+
+    def batch(self, entries, position):
+        return (np.cumsum(entries.astype(np.int64)) * (position > 0)).astype(np.int64)
+
+    def initial(self):
+        return 0
+
+    def step(self, state, entry, position):
+        state += int(entry)
+        return state * int(position > 0), state
+
+
+class TrailingStop(Node):
+    # `distance` below the highest high of the trade, NaN while flat
+    def __init__(self, name: str, position: str, trade_id: str, distance: float, src: str = "high"):
+        self.name = name
+        self.inputs = (src, position, trade_id)
+        self.distance = distance
+
+    def batch(self, high, position, trade_id):
+        stops = np.where(position > 0, high - self.distance, np.nan)
+        return pd.Series(stops).groupby(trade_id).cummax().to_numpy()
+
+    def initial(self):
+        return 0, np.nan  # trade id, stop
+
+    def step(self, state, high, position, trade_id):
+        if position <= 0:
+            return np.nan, (trade_id, np.nan)
+        stop = high - self.distance
+        if state[0] == trade_id and not np.isnan(state[1]):
+            stop = max(stop, state[1])
+        return stop, (trade_id, stop)
@@ -0,0 +1,77 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import talib
+
+from strategies import DrawableIndicator
+
+# Batched TA-Lib indicators. Inputs are converted to contiguous float64 once per call and every window runs the
+# C kernel on the same buffers; results are (windows, bars) arrays, rows in `windows` order, NaN during warm-up.
+
+
+def f64(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def kernel(name: str, *inputs: np.ndarray, output: Optional[int] = None, **params) -> np.ndarray:
+    # One TA-Lib function by name, `output` picks one of several outputs (e.g. 0 upper band of BBANDS)
+    values = getattr(talib, name)(*inputs, **params)
+    return values if output is None else values[output]
+
+
+def batch(name: str, windows: Sequence[int], *inputs, output: Optional[int] = None, **params) -> np.ndarray:
+    arrays = [f64(x) for x in inputs]
+    out = np.empty((len(windows), len(arrays[0])), dtype=np.float64)
+    for i, window in enumerate(windows):
+        out[i] = kernel(name, *arrays, output=output, timeperiod=int(window), **params)
+    return out
+
+
+def sma(close, windows: Sequence[int]) -> np.ndarray:
+    return batch("SMA", windows, close)
+
+
+def ema(close, windows: Sequence[int]) -> np.ndarray:
+    return batch("EMA", windows, close)
+
+
+def wma(close, windows: Sequence[int]) -> np.ndarray:
+    return batch("WMA", windows, close)
+
+
+def rsi(close, windows: Sequence[int]) -> np.ndarray:
+    return batch("RSI", windows, close)
+
+
+def stddev(close, windows: Sequence[int], nbdev: float = 1.0) -> np.ndarray:
+    return batch("STDDEV", windows, close, nbdev=nbdev)
+
+
+def atr(high, low, close, windows: Sequence[int]) -> np.ndarray:
+    return batch("ATR", windows, high, low, close)
+
+
+def natr(high, low, close, windows: Sequence[int]) -> np.ndarray:
+    return batch("NATR", windows, high, low, close)
+
+
+def adx(high, low, close, windows: Sequence[int]) -> np.ndarray:
+    return batch("ADX", windows, high, low, close)
+
+
+def bbands(close, windows: Sequence[int], nbdev: float = 2.0) -> np.ndarray:
+    # (3, windows, bars): upper, middle, lower
+    close = f64(close)
+    out = np.empty((3, len(windows), len(close)), dtype=np.float64)
+    for i, window in enumerate(windows):
+        out[:, i] = talib.BBANDS(close, timeperiod=int(window), nbdevup=nbdev, nbdevdn=nbdev)
+    return out
+
+
+def columns(name: str, windows: Sequence[int], values: np.ndarray) -> dict[str, np.ndarray]:
+    # Rows as strategy output columns, `ema_20`, `ema_50`, ...
+    return {f"{name}_{window}": row for window, row in zip(windows, values)}
+
+
+def drawables(name: str, windows: Sequence[int], colors: Sequence[str], mode: str = "lines", width: int = 1) -> list[DrawableIndicator]:
+    return [DrawableIndicator(f"{name}_{window}", mode, color, width) for window, color in zip(windows, colors)]
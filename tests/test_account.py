@@ -0,0 +1,144 @@
+import time
+
+from strategies import Action, ActionType
+from trading.account import AccountState
+from trading.trader import Trader
+from ws import UserHub
+
+CONTRACT = "CON.F.US.EP.H26"
+
+
+# Stand-in for the signalr user hub connection, events are emitted by the test
+class LocalHub:
+    def __init__(self):
+        self.handlers = {}
+        self.sent = []
+        self._on_open = None
+        self._on_reconnect = None
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def on_open(self, callback):
+        self._on_open = callback
+
+    def on_reconnect(self, callback):
+        self._on_reconnect = callback
+
+    def on_close(self, callback):
+        pass
+
+    def on_error(self, callback):
+        pass
+
+    def send(self, method, args):
+        self.sent.append((method, args))
+
+    def start(self):
+        self._on_open()
+
+    def stop(self):
+        pass
+
+    def reconnect(self):
+        self._on_reconnect()
+
+    def emit(self, event, payload: dict):
+        for handler in self.handlers.get(event, []):
+            handler([payload])
+
+
+class _Connector:
+    _account_id = "42"
+
+    def __init__(self, orders=(), positions=()):
+        self.orders = list(orders)
+        self.positions = list(positions)
+        self.placed = []
+
+    def get_open_orders(self):
+        return self.orders
+
+    def get_open_positions(self):
+        return self.positions
+
+    def place_order(self, contract_id, side, size, stop_price, is_trail):
+        self.placed.append((contract_id, side))
+        return True
+
+
+def _order(id_, status, side=0):
+    return {"id": id_, "accountId": 42, "contractId": CONTRACT, "status": status, "side": side, "size": 1}
+
+
+def _position(size, type_=1):
+    return {"id": 7, "accountId": 42, "contractId": CONTRACT, "type": type_, "size": size, "averagePrice": 6000.0}
+
+
+def test_subscribes_and_seeds():
+    con = _Connector(positions=[_position(2, type_=2)])
+    hub = LocalHub()
+    account = UserHub(con, connection=hub).run().account
+
+    assert ("SubscribeOrders", [42]) in hub.sent
+    assert ("SubscribePositions", [42]) in hub.sent
+    assert account.seeded
+    assert account.net_size(CONTRACT) == -2
+
+
+def test_order_position_lifecycle():
+    con = _Connector()
+    hub = LocalHub()
+    account = UserHub(con, connection=hub).run().account
+
+    hub.emit("GatewayUserOrder", _order(1, status=1))
+    assert len(account.open_orders(CONTRACT)) == 1
+
+    hub.emit("GatewayUserOrder", _order(1, status=2))
+    hub.emit("GatewayUserTrade", {"id": 100, "contractId": CONTRACT, "orderId": 1, "price": 6000.25, "size": 1, "side": 0})
+    hub.emit("GatewayUserPosition", _position(1))
+    assert not account.open_orders(CONTRACT)
+    assert account.net_size(CONTRACT) == 1
+    assert 100 in account.fills
+
+    hub.emit("GatewayUserTrade", {"id": 100, "contractId": CONTRACT, "voided": True})
+    hub.emit("GatewayUserPosition", _position(0))
+    assert not account.in_position(CONTRACT)
+    assert 100 not in account.fills
+
+    # Reconnect replaces the state with a fresh snapshot
+    con.orders = [_order(2, status=1)]
+    hub.reconnect()
+    assert [o["id"] for o in account.open_orders(CONTRACT)] == [2]
+
+
+def test_trader_checks_local_state():
+    con = _Connector()
+    account = AccountState()
+    trader = Trader(CONTRACT, con, account)
+
+    account.apply_order(_order(1, status=1))
+    trader.execute(Action(ActionType.BUY, 10.0))
+    assert not con.placed
+
+    account.apply_order(_order(1, status=2))
+    account.apply_position(_position(1))
+    trader.execute(Action(ActionType.SELL, 10.0))
+    assert not con.placed
+
+    account.apply_position(_position(0))
+    trader.execute(Action(ActionType.BUY, 10.0))
+    assert con.placed == [(CONTRACT, ActionType.BUY)]
+
+
+def test_local_check_is_fast():
+    account = AccountState()
+    for i in range(50):
+        account.apply_order({**_order(i, status=3), "contractId": f"C{i}"})
+    account.apply_position(_position(1))
+    trader = Trader(CONTRACT, None, account)
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        trader.in_position and trader.has_working_orders()
+    assert (time.perf_counter() - start) / 10_000 < 50e-6
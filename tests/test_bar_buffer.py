@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from bars import BarBuffer, CompactBars
+from strategies import ActionType, StrategyConfig, StrategyFactory
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data.csv", parse_dates=["time"], index_col=False)
+
+
+def test_append_grows():
+    data = _read_test_data()
+    buffer = BarBuffer.from_frame(data.head(10))
+    capacity = buffer.capacity
+
+    for _, row in data.iloc[10:].iterrows():
+        buffer.append(row["time"], row["open"], row["high"], row["low"], row["close"], row["volume"])
+
+    assert len(buffer) == len(data)
+    assert buffer.capacity == capacity
+    assert (buffer.close == data["close"].values).all()
+    assert buffer.last_time() == data["time"].iloc[-1]
+
+
+def test_max_history():
+    data = _read_test_data()
+    buffer = BarBuffer.from_frame(data.head(10), max_history=20)
+    capacity = buffer.capacity
+
+    for _ in range(20):
+        for _, row in data.iterrows():
+            buffer.append(row["time"], row["open"], row["high"], row["low"], row["close"])
+
+    assert len(buffer) == 20
+    assert buffer.capacity == capacity
+    assert (buffer.close == data["close"].values[-20:]).all()
+
+
+def test_from_compact():
+    data = pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time", "t_original"], index_col=False)
+    bars = CompactBars.from_frame(data)
+    expected = BarBuffer.from_frame(data, max_history=50)
+    buffer = BarBuffer.from_compact(bars, max_history=50)
+
+    assert len(buffer) == len(expected) == 50
+    for key in BarBuffer.COLUMNS + ["time", "volume", "day", "hour"]:
+        assert (buffer.column(key) == expected.column(key)).all(), key
+
+
+def test_frame_is_view():
+    buffer = BarBuffer.from_frame(_read_test_data())
+    df = buffer.frame()
+
+    assert np.shares_memory(df["close"].values, buffer.prices)
+
+    buffer.update_last(high=10_000, low=0, close=5_000)
+    assert df["close"].iloc[-1] == 5_000
+    assert df["high"].iloc[-1] == 10_000
+
+
+def test_live_bars():
+    raw_data = _read_test_data()
+    data = raw_data.head(94)
+
+    params = {"stop": 100, "fast_ma": 8, "slow_ma": 34, "trading_hours": [21, 24]}
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(data), StrategyConfig(trading_hours=params["trading_hours"]))
+    stra.run(**params)
+
+    row = raw_data.iloc[94]
+    stra.append_bar(row["time"], row["open"], row["open"], row["open"], row["open"])
+    stra.update_bar(row["high"], row["low"], row["close"])
+
+    assert stra.df["close"].iloc[-1] == row["close"]
+
+    action = stra.update()
+    assert action.action_type == ActionType.CLOSE
+    assert str(stra.df["time"].iloc[-1]) == str(row["time"])
+    assert stra.df["in_position"].value_counts()[1] == 31
+
+
+def test_outputs_reused_without_copies():
+    data = _read_test_data()
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(data), StrategyConfig(trading_hours=[21, 24]))
+
+    first = stra.run(stop=100, fast_ma=8, slow_ma=34)
+    stops = stra.outputs.columns["stops"]
+    fast = first["fast_ma"].values.copy()
+
+    df = stra.run(stop=50, fast_ma=5, slow_ma=20)
+    assert stra.outputs.columns["stops"] is stops
+    assert np.shares_memory(df["stops"].values, stops)
+    assert np.shares_memory(df["close"].values, stra.buffer.prices)
+    assert not np.allclose(df["fast_ma"].values, fast, equal_nan=True)
+
+
+def test_outputs_follow_trimmed_bars():
+    data = _read_test_data()
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(data.head(40)), StrategyConfig(max_history=40))
+    stra.run(stop=100, fast_ma=8, slow_ma=34)
+    ma = stra.df["slow_ma"].values[-1]
+
+    row = data.iloc[40]
+    stra.append_bar(row["time"], row["open"], row["high"], row["low"], row["close"])
+    assert len(stra.df) == 40
+    assert stra.df["slow_ma"].values[-2] == ma
+    assert np.isnan(stra.df["slow_ma"].values[-1])
+
+    stra.update()
+    assert (stra.outputs.time[: len(stra.outputs)] == stra.buffer.column("time")).all()
+    assert stra.df["slow_ma"].values[-1] == data["close"].values[7:41].mean()
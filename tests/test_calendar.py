@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from bars import BarBuffer, CompactBars, day_code
+from strategies import StrategyConfig, StrategyFactory
+from strategies.graph import Session, SessionClose, bar_fields
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time", "t_original"], index_col=False)
+
+
+def test_matches_pandas():
+    data = _read_test_data()
+    calendar = BarBuffer.from_frame(data).calendar()
+
+    assert (calendar.hour == data["time"].dt.hour.values).all()
+    assert calendar.dates() == sorted(data["time"].dt.date.unique())
+
+    for date in data["time"].dt.date.unique():
+        lo, hi = calendar.day_rows(day_code(date))
+        assert (data["time"].iloc[lo:hi].dt.date == date).all()
+        assert hi - lo == (data["time"].dt.date == date).sum()
+
+    present = set(data["time"].dt.date)
+    all_dates = pd.date_range(data["time"].min(), data["time"].max(), freq="D").date
+    assert calendar.disabled_dates() == sorted(set(all_dates) - present)
+
+
+def test_cached_per_dataset():
+    data = _read_test_data()
+    buffer = BarBuffer.from_frame(data.head(100))
+    calendar = buffer.calendar()
+
+    assert buffer.calendar() is calendar
+    assert calendar.session((7, 22)) is calendar.session([7, 22])
+
+    row = data.iloc[100]
+    buffer.append(row["time"], row["open"], row["high"], row["low"], row["close"])
+    assert buffer.calendar() is not calendar
+    assert len(buffer.calendar()) == 101
+    assert buffer.calendar().hour[-1] == row["time"].hour
+
+
+def test_session_nodes_from_calendar():
+    buffer = BarBuffer.from_frame(_read_test_data())
+    fields = bar_fields(buffer)
+
+    for hours in [(0, 24), (7, 22), (21, 24)]:
+        for node in [Session("s", hours), SessionClose("c", hours)]:
+            assert (node.from_calendar(buffer.calendar()) == node.batch(*[fields[name] for name in node.inputs])).all()
+
+
+def test_strategy_shares_calendar():
+    bars = CompactBars.from_frame(_read_test_data())
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+
+    stra.run(stop=100, fast_ma=8, slow_ma=34)
+    mask = stra.calendar.session((7, 22))
+    df = stra.run(stop=50, fast_ma=5, slow_ma=20)
+
+    assert stra.calendar.session((7, 22)) is mask
+    assert (df["trading_allowed"].values == mask).all()
+    assert (df["date"].values == bars.day).all()
@@ -0,0 +1,206 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bars import CompactBars
+from connector import TIME_UNITS
+from strategies import ActionType, StrategyConfig, StrategyFactory
+from trading.candles import CandleBuilder, tf_nanos
+from trading.runner import StrategyRunner
+from ws import Websocket
+
+TF_NS = tf_nanos((3, TIME_UNITS.Minute))
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data.csv", parse_dates=["time"], index_col=False)
+
+
+def _trades(row) -> list[tuple[int, float, int]]:
+    start = row["time"].value
+    return [
+        (start, row["open"], 1),
+        (start + 10**9, row["high"], 1),
+        (start + 2 * 10**9, row["low"], 1),
+        (start + 3 * 10**9, row["close"], 1),
+    ]
+
+
+def test_closes_on_next_bucket():
+    closed = []
+    builder = CandleBuilder(TF_NS, closed.append)
+
+    for ts, price, volume in [(0, 10.0, 1), (10**9, 12.0, 2), (2 * 10**9, 9.0, 3), (3 * 10**9, 11.0, 4)]:
+        builder.add(ts, price, volume)
+    assert not closed
+
+    builder.add(TF_NS + 1, 11.5, 1)
+    assert len(closed) == 1
+    assert closed[0].ohlc() == (10.0, 12.0, 9.0, 11.0)
+    assert closed[0].volume == 10
+    assert closed[0].closed_ns > 0
+    assert builder.current.time == TF_NS
+
+    # Already closed, must not reopen the bar
+    builder.add(TF_NS - 1, 100.0, 1)
+    assert builder.late_trades == 1
+    assert builder.current.high == 11.5
+
+
+def test_closes_by_clock():
+    closed = []
+    builder = CandleBuilder(TF_NS, closed.append)
+    builder.add(0, 10.0)
+
+    builder.close_due(TF_NS - 1)
+    assert not closed
+
+    builder.close_due(TF_NS)
+    assert len(closed) == 1
+    assert builder.current is None
+
+    builder.close_due(2 * TF_NS)
+    assert len(closed) == 1
+
+
+def test_close_callbacks_outside_lock():
+    builder = CandleBuilder(TF_NS)
+    closed, release = [], threading.Event()
+
+    def on_close(candle):
+        # Reads the builder and waits like a slow order call, trades of the next bar keep merging meanwhile
+        closed.append((candle.time, builder.current.time))
+        release.wait(5)
+
+    builder.on_close(on_close)
+    builder.add(0, 10.0)
+    closing = threading.Thread(target=builder.add, args=(TF_NS, 11.0))
+    closing.start()
+    while not closed:
+        time.sleep(0.001)
+
+    builder.add(TF_NS + 1, 12.0, 2)
+    assert builder.current.high == 12.0 and builder.current.volume == 2
+    release.set()
+    closing.join()
+    assert closed == [(0, TF_NS)]
+
+
+def test_clock_thread():
+    closed = []
+    builder = CandleBuilder(10**8, closed.append)
+    builder.add(time.time_ns(), 10.0)
+    builder.start_clock(grace=0.01)
+
+    time.sleep(0.3)
+    builder.stop()
+    assert len(closed) == 1
+
+
+def test_runner_drives_strategy():
+    raw_data = _read_test_data()
+    params = {"stop": 100, "fast_ma": 8, "slow_ma": 34, "trading_hours": [21, 24]}
+    stra = StrategyFactory.create(
+        "DefaultStrategy", CompactBars.from_frame(raw_data.head(94)), StrategyConfig(trading_hours=params["trading_hours"])
+    )
+    stra.run(**params)
+
+    runner = StrategyRunner(stra)
+    builder = CandleBuilder(TF_NS, runner.on_bar_close)
+
+    row = raw_data.iloc[94]
+    for trade in _trades(row):
+        builder.add(*trade)
+    builder.add(raw_data.iloc[95]["time"].value, raw_data.iloc[95]["open"])
+
+    assert len(stra.df) == 95
+    assert stra.df["time"].iloc[-1] == row["time"]
+    assert stra.df["close"].iloc[-1] == row["close"]
+    assert runner.last_action.action_type == ActionType.CLOSE
+    assert runner.latency_stats()["bars"] == 1
+
+
+def test_runner_merges_partial_bar():
+    raw_data = _read_test_data()
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(raw_data.head(95)), StrategyConfig(trading_hours=[21, 24]))
+    stra.run(stop=100, fast_ma=8, slow_ma=34)
+
+    # History already holds the bar being closed
+    runner = StrategyRunner(stra)
+    builder = CandleBuilder(TF_NS, runner.on_bar_close)
+    row = raw_data.iloc[94]
+    builder.add(row["time"].value, row["open"])
+    builder.add(row["time"].value + 1, row["high"] + 1)
+    builder.close_due(row["time"].value + TF_NS)
+
+    assert len(stra.df) == 95
+    assert stra.df["high"].iloc[-1] == row["high"] + 1
+
+
+class _Bars:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.requests = []
+
+    def retrieve_bars(self, contract, tf, includePartialBar=False):
+        def retrieve(start, end):
+            self.requests.append((start, end))
+            return self.df[(self.df["time"] >= start) & (self.df["time"] < end)]
+
+        return retrieve
+
+
+def test_reconnect_backfills_gap():
+    raw_data = _read_test_data()
+    params = {"stop": 100, "fast_ma": 8, "slow_ma": 34}
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(raw_data.head(90)), StrategyConfig(trading_hours=[21, 24]))
+    stra.run(**params)
+    runner = StrategyRunner(stra)
+
+    # Server has the full bars 90-93 and the partial bar 94
+    con = _Bars(raw_data.iloc[90:95])
+    ws = Websocket("CON.F.US.EP.H26", con, tf=(3, TIME_UNITS.Minute))
+    ws.on_bar_close(runner.on_bar_close)
+    ws.on_backfill(runner.on_backfill)
+
+    # Disconnected after the open of bar 90, the clock closes it incomplete
+    row = raw_data.iloc[90]
+    ws.handle_trades([{"timestamp": row["time"].isoformat(), "price": row["open"], "volume": 1}])
+    ws.candles.close_due(row["time"].value + TF_NS)
+    assert len(stra.df) == 91 and stra.df["high"].iloc[-1] == row["open"]
+
+    ws._gap = True
+    live = raw_data.iloc[94]
+    ws.handle_trades([{"timestamp": (live["time"] + pd.Timedelta(seconds=5)).isoformat(), "price": live["close"], "volume": 1}])
+
+    assert con.requests[0][0] == row["time"]
+    assert len(stra.df) == 94
+    assert (stra.df["close"].values == raw_data["close"].values[:94]).all()
+    assert stra.df["high"].iloc[90] == row["high"]
+    assert ws.current_candle().time == live["time"].value
+    assert ws.current_candle().open == live["open"]
+
+    # The partial bar ends before the message that triggered the backfill, its trade counts once
+    assert con.requests[0][1] < live["time"] + pd.Timedelta(seconds=5)
+    assert ws.current_candle().volume == live["volume"] + 1
+
+    expected = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(raw_data.head(94)), StrategyConfig(trading_hours=[21, 24]))
+    expected.run(**params)
+    np.testing.assert_allclose(stra.df["fast_ma"].values, expected.df["fast_ma"].values)
+    np.testing.assert_allclose(stra.df["stops"].values, expected.df["stops"].values)
+
+
+def test_backfill_without_partial_keeps_candle():
+    raw_data = _read_test_data()
+    row = raw_data.iloc[90]
+    ws = Websocket("CON.F.US.EP.H26", _Bars(raw_data.iloc[:0]), tf=(3, TIME_UNITS.Minute))
+    ws.handle_trades([{"timestamp": row["time"].isoformat(), "price": row["open"], "volume": 1}])
+
+    ws._gap = True
+    ws.handle_trades([{"timestamp": (row["time"] + pd.Timedelta(seconds=5)).isoformat(), "price": row["open"] + 1, "volume": 2}])
+
+    assert ws.current_candle().time == row["time"].value
+    assert ws.current_candle().ohlc() == (row["open"], row["open"] + 1, row["open"], row["open"] + 1)
+    assert ws.current_candle().volume == 3
@@ -0,0 +1,122 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from backtest.cluster import Coordinator, JobQueue, Worker, run_workers
+from backtest.shards import ShardedBacktest
+from bars import CompactBars
+from connector import TIME_UNITS
+
+TF = (3, TIME_UNITS.Minute)
+HOURS = [7, 22]
+SWEEP = [{"stop": stop, "fast_ma": fast, "slow_ma": 34} for stop in (20, 28) for fast in (5, 8, 13)]
+
+
+def _bars() -> CompactBars:
+    return CompactBars.from_frame(pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time"], index_col=False))
+
+
+def test_fingerprint():
+    bars = _bars()
+    assert bars.fingerprint() == _bars().fingerprint()
+    assert bars[1:].fingerprint() != bars.fingerprint()
+
+
+def test_lost_lease_requeued():
+    queue = JobQueue([{"id": 0}, {"id": 1}], lease_seconds=0.05)
+
+    assert queue.lease("a")["id"] == 0
+    assert queue.lease("b")["id"] == 1
+    assert queue.lease("c") is None
+
+    time.sleep(0.1)
+    assert queue.complete(1, "b", {"trades": "b"})
+    assert queue.lease("c")["id"] == 0
+    assert not queue.complete(0, "a", {"trades": "a"})
+    assert queue.complete(0, "c", {"trades": "c"})
+    assert queue.done and queue.results[0] == {"trades": "c"}
+
+
+def test_failed_job_gives_up():
+    queue = JobQueue([{"id": 0}], max_attempts=2)
+
+    assert queue.lease("a")["id"] == 0
+    assert not queue.fail(0, "b", "not the holder")
+    assert queue.fail(0, "a", "ZeroDivisionError")
+    assert not queue.finished
+
+    assert queue.lease("b")["id"] == 0
+    assert queue.fail(0, "b", "ZeroDivisionError")
+    assert queue.finished and not queue.done
+    assert queue.lease("c") is None and queue.wait(1)
+
+
+def _lease_and_die(url: str):
+    # A worker that takes a job and crashes before reporting it
+    requests.post(f"{url}/lease", json={"worker": "crashed"}, timeout=5)
+
+
+def test_workers_match_sharded(tmp_path):
+    bars = _bars()
+    coordinator = Coordinator(bars, "DefaultStrategy", HOURS, TF, SWEEP, params_per_job=2, shards_per_job=1, days_per_shard=1, warmup=120, lease_seconds=2)
+    with coordinator.serve(port=0, host="127.0.0.1"):
+        url = f"http://127.0.0.1:{coordinator.port}"
+
+        crashed = multiprocessing.Process(target=_lease_and_die, args=(url,))
+        crashed.start()
+        crashed.join()
+
+        # The second host already has the bars, the others download them
+        Worker(url, str(tmp_path / "b")).bars(coordinator.fingerprint)
+        workers = run_workers(url, 2, str(tmp_path / "a")) + run_workers(url, 1, str(tmp_path / "b"))
+        trades = coordinator.trades(timeout=120)
+        for worker in workers:
+            worker.join(timeout=10)
+
+    assert len(coordinator.queue.jobs) == 3 * len(coordinator.groups)
+    with ShardedBacktest(bars, "DefaultStrategy", HOURS, TF, workers=1, days_per_shard=1, warmup=120) as backtest:
+        for params, (ticks, days) in zip(SWEEP, trades):
+            expected = backtest.trades(params)
+            assert np.array_equal(ticks, expected[0])
+            assert np.array_equal(days, expected[1])
+
+    assert (tmp_path / "a" / f"{coordinator.fingerprint}.npz").exists()
+
+
+def test_worker_reports_failures():
+    coordinator = Coordinator(_bars(), "DefaultStrategy", HOURS, TF, SWEEP[:1], days_per_shard=5, lease_seconds=60)
+    with coordinator.serve(port=0, host="127.0.0.1"):
+        url = f"http://127.0.0.1:{coordinator.port}"
+
+        # Only the lease holder can post, and only trades shaped like the job
+        job = requests.post(f"{url}/lease", json={"worker": "a"}, timeout=5).json()
+        assert not requests.post(f"{url}/result", json={"id": job["id"], "worker": "b", "trades": [[[], []]]}, timeout=5).json()["accepted"]
+        assert requests.post(f"{url}/result", json={"id": job["id"], "worker": "a", "trades": [[[1], []]]}, timeout=5).status_code == 400
+        assert requests.post(f"{url}/result", json={"id": job["id"], "worker": "a", "error": "lost"}, timeout=5).json()["accepted"]
+
+        worker = Worker(url)
+        worker.process = lambda job: 1 / 0
+        assert worker.run() == 0
+        with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+            coordinator.trades(timeout=5)
+
+    assert coordinator.queue.attempts[job["id"]] == coordinator.queue.max_attempts
+
+
+def test_token_required():
+    coordinator = Coordinator(_bars(), "DefaultStrategy", HOURS, TF, SWEEP[:1], days_per_shard=5, token="s3cret")
+    with pytest.raises(ValueError):
+        Coordinator(_bars(), "DefaultStrategy", HOURS, TF, SWEEP[:1], days_per_shard=5, token="").serve(port=0, host="0.0.0.0")
+
+    with coordinator.serve(port=0, host="127.0.0.1"):
+        url = f"http://127.0.0.1:{coordinator.port}"
+        assert requests.post(f"{url}/lease", json={"worker": "a"}, timeout=5).status_code == 401
+        assert requests.post(f"{url}/result", json={"id": 0, "worker": "a", "error": "x"}, timeout=5).status_code == 401
+        assert requests.get(f"{url}/bars/{coordinator.fingerprint}", timeout=5).status_code == 401
+
+        worker = Worker(url, token="s3cret")
+        assert worker.session.post(f"{url}/lease", json={"worker": worker.name}, timeout=5).json()["id"] == 0
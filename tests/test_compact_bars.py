@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import CompactBars, day_codes, to_ticks
+from strategies import StrategyConfig, StrategyFactory
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time", "t_original"], index_col=False)
+
+
+def _history(days: int) -> pd.DataFrame:
+    # Same layout as `Connector.get_bars` output
+    t_original = pd.date_range("2025-01-01", periods=days * 1440, freq="1min", tz="UTC")
+    close = 6000 + np.cumsum(np.random.default_rng(0).integers(-4, 5, len(t_original))) * 0.25
+    df = pd.DataFrame(
+        {
+            "time": t_original.tz_convert("Europe/Berlin"),
+            "open": close,
+            "high": close + 1,
+            "low": close - 1,
+            "close": close,
+            "volume": np.full(len(t_original), 500),
+            "t_original": t_original,
+        }
+    )
+    df.set_index(df["time"], inplace=True)
+    df["date"] = df["time"].dt.date
+    return df
+
+
+def test_roundtrip():
+    data = _read_test_data()
+    bars = CompactBars.from_frame(data)
+
+    assert bars.ohlc.dtype == np.int32
+    assert bars.time.dtype == np.int64
+
+    df = bars.to_frame()
+    assert (df["close"].values == data["close"].values).all()
+    assert (df["volume"].values == data["volume"].values).all()
+    assert (df["time"].values == data["time"].values).all()
+    assert str(df["time"].iloc[0]) == "2026-02-19 01:00:00+01:00"
+    assert (df["t_original"].values == data["t_original"].values).all()
+
+    assert len(bars.days) == data["time"].dt.date.nunique()
+
+
+def test_slices_are_views():
+    bars = CompactBars.from_frame(_read_test_data())
+    head = bars[:10]
+
+    assert len(head) == 10
+    assert np.shares_memory(head.ohlc, bars.ohlc)
+
+
+def test_off_tick_prices():
+    with pytest.raises(ValueError):
+        to_ticks([6000.1])
+
+
+def test_day_codes():
+    data = _read_test_data()
+    codes = day_codes(data["time"])
+
+    assert codes.dtype == np.int32
+    assert (pd.Series(codes).diff().fillna(0) >= 0).all()
+    assert len(np.unique(codes)) == data["time"].dt.date.nunique()
+
+
+def test_save_load(tmp_path):
+    bars = CompactBars.from_frame(_history(2))
+    bars.save(tmp_path / "bars.npz")
+
+    loaded = CompactBars.load(tmp_path / "bars.npz")
+    assert (loaded.ohlc == bars.ohlc).all()
+    assert str(loaded.tz) == "Europe/Berlin"
+
+
+def test_memory():
+    df = _history(30)
+    bars = CompactBars.from_frame(df)
+
+    assert bars.nbytes * 3 < df.memory_usage(index=True, deep=True).sum()
+
+
+def test_strategy_on_compact_bars():
+    data = _read_test_data()
+    params = {"stop": 28, "fast_ma": 8, "slow_ma": 34, "trading_hours": [0, 22]}
+
+    expected = StrategyFactory.create("DefaultStrategy", data, StrategyConfig(trading_hours=params["trading_hours"])).run(**params)
+    df = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(data), StrategyConfig(trading_hours=params["trading_hours"])).run(
+        **params
+    )
+
+    assert (df["long_entries"].values == expected["long_entries"].values).all()
+    assert (df["long_exits"].values == expected["long_exits"].values).all()
+    assert (df["in_position"].values == expected["in_position"].values).all()
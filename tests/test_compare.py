@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from bars import CompactBars
+from config import PARAMS
+from connector import TIME_UNITS
+from dashboard.cache import SharedCache
+from dashboard.compare import Comparison, build_compare_chart, build_compare_pnl, parse_variant
+from strategies import StrategyConfig, StrategyFactory
+
+TF = (3, TIME_UNITS.Minute)
+
+
+def _bars() -> CompactBars:
+    return CompactBars.from_frame(pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time"], index_col=False))
+
+
+def test_parse_variant():
+    strategy, params = parse_variant("DefaultStrategy:fast_ma=5, slow_ma=20,trading_hours=[7,22]")
+    assert strategy == "DefaultStrategy"
+    assert params == {**PARAMS, "fast_ma": 5, "slow_ma": 20, "trading_hours": [7, 22]}
+    assert parse_variant("DefaultStrategy") == ("DefaultStrategy", PARAMS)
+    with pytest.raises(ValueError):
+        parse_variant("DefaultStrategy:fast_ma")
+
+
+def test_variants_match_direct_runs(tmp_path):
+    bars = _bars()
+    variants = [parse_variant("DefaultStrategy"), parse_variant("DefaultStrategy:fast_ma=5,slow_ma=20")]
+
+    with Comparison(bars, variants, TF, SharedCache(str(tmp_path)), workers=2) as comparison:
+        selected = comparison.selected([1, 0])
+    assert [i for i, _ in selected] == [0, 1]
+    assert selected[1][1].label == "DefaultStrategy fast_ma=5, slow_ma=20"
+    assert selected[0][1].stra.buffer is selected[1][1].stra.buffer
+
+    for (_, variant), (strategy, params) in zip(selected, variants):
+        stra = StrategyFactory.create(strategy, bars, StrategyConfig(trading_hours=params["trading_hours"]))
+        expected = stra.run(**params)
+        pd.testing.assert_frame_equal(variant.stra.df, expected)
+        assert variant.stats["trades"] == len(variant.positions)
+
+    # Computed once, the next comparison over the same bars only reads the cache
+    with Comparison(bars, variants[1:], TF, SharedCache(str(tmp_path))) as again:
+        pd.testing.assert_frame_equal(again.selected([0])[0][1].positions, selected[1][1].positions)
+
+    date = selected[0][1].stra.df["time"].max()
+    chart = build_compare_chart(selected, date, (0, 24))
+    assert [t.name for t in chart.data][1:4] == ["DefaultStrategy buys", "DefaultStrategy sells", "DefaultStrategy stop"]
+    assert len(chart.data) == 1 + 3 * len(selected)
+    assert len(build_compare_pnl(selected[:1]).data) == 1
@@ -0,0 +1,103 @@
+import pandas as pd
+
+from bars import CompactBars
+from connector import TIME_UNITS
+from strategies import Action, ActionType, StrategyConfig, StrategyFactory
+from trading.daemon import Checkpoint, DaemonClient, TradingDaemon, serve_state
+from trading.runner import StrategyRunner
+
+CONFIG = ("CON.F.US.EP.H26", "ES", [3, TIME_UNITS.Minute], "DefaultStrategy", True)
+PARAMS = {"stop": 100, "fast_ma": 8, "slow_ma": 34}
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data.csv", parse_dates=["time"], index_col=False)
+
+
+class _History:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.requests = []
+
+    def get_bars(self, symbol, contract_id, tf, times, includePartialBar=False):
+        self.requests.append(times)
+        return self.df[self.df["time"] >= pd.Timestamp(times[0])]
+
+
+def _strategy(df: pd.DataFrame):
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(df), StrategyConfig(trading_hours=[21, 24]))
+    stra.run(**PARAMS)
+    return stra
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    data = _read_test_data()
+    checkpoint = Checkpoint(str(tmp_path))
+    assert checkpoint.load() is None
+
+    checkpoint.save(CompactBars.from_frame(data), {"last_action": {"type": "BUY", "stop": 10.0}})
+    bars, state = checkpoint.load()
+
+    assert (bars.to_frame()["close"].values == data["close"].values).all()
+    assert state["last_action"]["type"] == "BUY"
+
+
+def _live_window(data: pd.DataFrame, monkeypatch):
+    window = [data["time"].iloc[0].isoformat(), data["time"].iloc[-1].isoformat()]
+    monkeypatch.setattr("trading.daemon.live_window", lambda: window)
+    return window
+
+
+def test_restart_fetches_gap_only(tmp_path, monkeypatch):
+    data = _read_test_data()
+    _live_window(data, monkeypatch)
+    daemon = TradingDaemon(_History(data), CONFIG, port=None, directory=str(tmp_path))
+    Checkpoint(str(tmp_path)).save(CompactBars.from_frame(data.head(90)), daemon.identity())
+
+    bars, _ = daemon.load_history()
+
+    assert pd.Timestamp(daemon.con.requests[0][0]) == data["time"].iloc[89]
+    assert len(bars) == len(data)
+    assert (bars.to_frame()["close"].values == data["close"].values).all()
+
+
+def test_checkpoint_of_other_config_or_stale_discarded(tmp_path, monkeypatch):
+    data = _read_test_data()
+    start, _ = _live_window(data.iloc[50:], monkeypatch)
+    daemon = TradingDaemon(_History(data), CONFIG, port=None, directory=str(tmp_path))
+
+    Checkpoint(str(tmp_path)).save(CompactBars.from_frame(data.iloc[50:90]), {**daemon.identity(), "tf": [5, CONFIG[2][1].value]})
+    daemon.load_history()
+    assert daemon.con.requests[-1][0] == start
+
+    Checkpoint(str(tmp_path)).save(CompactBars.from_frame(data.head(40)), daemon.identity())
+    daemon.load_history()
+    assert daemon.con.requests[-1][0] == start
+
+
+def test_attach_read_only(tmp_path):
+    data = _read_test_data()
+
+    daemon = TradingDaemon(_History(data), CONFIG, port=None, directory=str(tmp_path))
+    daemon.stra = _strategy(data.head(90))
+    daemon.runner = StrategyRunner(daemon.stra)
+    daemon.runner.last_action = Action(ActionType.SELL, 12.5)
+    server = serve_state(daemon, port=0)
+
+    try:
+        client = DaemonClient(f"http://127.0.0.1:{server.server_address[1]}")
+        local = _strategy(client.bars().to_frame())
+        assert len(local.df) == 90
+
+        for _, row in data.iloc[90:95].iterrows():
+            daemon.stra.append_bar(row["time"], row["open"], row["high"], row["low"], row["close"], row["volume"])
+
+        state = client.sync(local)
+        assert state["bars"] == 95
+        assert state["last_action"] == {"type": "SELL", "stop": 12.5}
+        assert len(local.df) == 95
+        assert (local.df["close"].values == data["close"].values[:95]).all()
+        assert "fast_ma" in local.df
+    finally:
+        server.shutdown()
+        server.server_close()
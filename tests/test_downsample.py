@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from bars import CompactBars
+from dashboard.chart import build_range_chart, visible_range
+from dashboard.downsample import lttb, lttb_finite, nanmax_rollup, ohlc_rollup, rollup_factor
+from strategies import StrategyConfig, StrategyFactory
+
+
+def _history(days: int) -> pd.DataFrame:
+    time = pd.date_range("2025-01-01", periods=days * 480, freq="3min", tz="Europe/Berlin")
+    close = 6000 + np.cumsum(np.random.default_rng(0).integers(-4, 5, len(time))) * 0.25
+    return pd.DataFrame({"time": time, "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 100})
+
+
+def test_ohlc_rollup():
+    open_ = np.array([1.0, 2, 3, 4, 5])
+    high = np.array([2.0, 5, 4, 6, 7])
+    low = np.array([0.0, 1, -1, 3, 4])
+    close = np.array([1.5, 2.5, 3.5, 4.5, 5.5])
+
+    o, h, l, c = ohlc_rollup(open_, high, low, close, 2)
+    assert o.tolist() == [1, 3, 5]
+    assert h.tolist() == [5, 6, 7]
+    assert l.tolist() == [0, -1, 4]
+    assert c.tolist() == [2.5, 4.5, 5.5]
+
+
+def test_nanmax_rollup():
+    values = np.array([np.nan, np.nan, 1.0, np.nan, 3.0, 2.0])
+    out = nanmax_rollup(values, 2)
+
+    assert np.isnan(out[0])
+    assert out[1:].tolist() == [1.0, 3.0]
+
+
+def test_lttb():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[500] = 10  # spike must survive
+
+    idx = lttb(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert (np.diff(idx) > 0).all()
+    assert 500 in idx
+
+    assert len(lttb(x, y, 2000)) == 1000
+
+
+def test_lttb_finite():
+    y = np.r_[np.full(10, np.nan), np.arange(90, dtype=np.float64)]
+    idx = lttb_finite(np.arange(100), y, 20)
+
+    assert idx[0] == 10
+    assert np.isfinite(y[idx]).all()
+
+
+def test_rollup_factor():
+    assert rollup_factor(100, 1600) == 1
+    assert rollup_factor(100_000, 1600) == 250
+
+
+def test_visible_range():
+    assert visible_range(None) is None
+    assert visible_range({"xaxis.autorange": True}) is None
+    assert visible_range({"xaxis.range[0]": "2025-01-02", "xaxis.range[1]": "2025-01-03"}) == ("2025-01-02", "2025-01-03")
+
+
+def test_range_chart_is_bounded():
+    params = {"stop": 28, "fast_ma": 8, "slow_ma": 34}
+    stra = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(_history(120)), StrategyConfig(trading_hours=[0, 22]))
+    stra.run(**params)
+
+    fig = build_range_chart(stra, None, width_px=1000)
+    assert all(len(trace.x) <= 2000 for trace in fig.data)
+
+    # Zoomed into a few hours, full detail
+    fig = build_range_chart(stra, None, ("2025-03-03 10:00:00", "2025-03-03 14:00:00"), width_px=1000)
+    assert fig.data[0].name == "Price"
+    assert len(fig.data[0].x) == 81 + 2 * 40  # plus half a window each side
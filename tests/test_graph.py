@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import BarBuffer, CompactBars
+from strategies import StrategyConfig, StrategyFactory
+from strategies.graph import SMA, CrossAbove, Expr, Graph, Position, bar_fields
+from strategies.graph.engine import _rows
+
+PARAMS = {"stop": 28, "fast_ma": 8, "slow_ma": 34}
+COLUMNS = ["long_entries", "long_exits", "fast_ma", "slow_ma", "in_position", "trade_id", "stops", "stop_signals"]
+
+
+def _read_test_data(dataset: str = "_2") -> pd.DataFrame:
+    return pd.read_csv(f"tests/data/test_data{dataset}.csv", parse_dates=["time"], index_col=False)
+
+
+def _assert_same(a: pd.DataFrame, b: pd.DataFrame):
+    for col in COLUMNS:
+        assert np.array_equal(a[col].to_numpy(), b[col].to_numpy(), equal_nan=a[col].dtype.kind == "f"), col
+
+
+def test_step_matches_batch():
+    data = _read_test_data()
+    stra = StrategyFactory.create("DefaultStrategy", data, StrategyConfig(trading_hours=[0, 22]))
+    stra.run(**PARAMS)
+
+    graph = stra.graph
+    batch = graph.run(bar_fields(stra.buffer))
+
+    rows = _rows(bar_fields(stra.buffer))
+    states = graph.initial()
+    for i, row in enumerate(rows):
+        ahead = rows[i + 1] if i + 1 < len(rows) else None
+        values, states = graph.step(states, row, ahead)
+        for node in graph.nodes:
+            assert values[node.name] == batch[node.name][i] or (np.isnan(values[node.name]) and np.isnan(batch[node.name][i]))
+
+
+def test_states_match_stepping():
+    stra = StrategyFactory.create("DefaultStrategy", _read_test_data(), StrategyConfig(trading_hours=[0, 22]))
+    stra.run(**PARAMS)
+
+    fields = bar_fields(stra.buffer)
+    rows = _rows(fields)
+    states = stra.graph.initial()
+    for i in range(300):
+        _, states = stra.graph.step(states, rows[i], rows[i + 1])
+
+    assert stra.graph.states(fields, 300) == states
+
+
+@pytest.mark.parametrize("trading_hours", [[0, 22], [21, 24], [15, 17]])
+def test_incremental_matches_run(trading_hours):
+    data = _read_test_data()
+    live = StrategyFactory.create("DefaultStrategy", CompactBars.from_frame(data.head(60)), StrategyConfig(trading_hours=trading_hours))
+    live.run(**PARAMS)
+
+    actions = []
+    for _, row in data.iloc[60:].iterrows():
+        live.append_bar(row["time"], row["open"], row["open"], row["open"], row["open"])
+        live.update()
+        live.update_bar(row["high"], row["low"], row["close"])
+        actions.append(live.update())
+
+    batch = StrategyFactory.create("DefaultStrategy", data, StrategyConfig(trading_hours=trading_hours))
+    _assert_same(live.df, batch.run(**PARAMS))
+    assert any(actions)
+
+
+def test_drawables_from_nodes():
+    stra = StrategyFactory.create("DefaultStrategy", _read_test_data(), StrategyConfig())
+    df = stra.run(**PARAMS)
+
+    assert [(d.key, d.color) for d in stra.drawable_indicators] == [("fast_ma", "purple"), ("slow_ma", "blue")]
+    assert "_session_close" not in df
+    assert "in_position" in df
+
+
+def test_graph_errors():
+    with pytest.raises(ValueError, match="unknown input"):
+        Graph([SMA("ma", "closes", 3)])
+    with pytest.raises(ValueError, match="Cycle"):
+        Graph([Expr("a", lambda b: b, "b"), Expr("b", lambda a: a, "a")])
+
+    # Declaration order does not matter
+    graph = Graph([CrossAbove("cross", "fast", "slow"), SMA("slow", "close", 4), SMA("fast", "close", 2)])
+    assert [node.name for node in graph.nodes] == ["fast", "slow", "cross"]
+
+    buffer = BarBuffer.from_frame(_read_test_data())
+    assert graph.run(bar_fields(buffer))["cross"].any()
+
+
+@pytest.mark.parametrize("hold_exit_bar", [False, True])
+def test_position_carry_continues_history(hold_exit_bar):
+    rng = np.random.default_rng(3)
+    entries, exits = rng.random(400) < 0.1, rng.random(400) < 0.3
+    full = Position("p", "e", "x", hold_exit_bar).batch(entries, exits)
+
+    for start, first in [(0, 0), (50, 120), (200, 201), (390, 399)]:
+        node = Position("p", "e", "x", hold_exit_bar)
+        node.carry = (first - start, int(entries[:first].sum()) - int(exits[:first].sum()))
+        assert np.array_equal(node.batch(entries[start:], exits[start:])[first - start :], full[first:])
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import HistoryStore
+from bars.store import chunk_bounds, utc
+
+
+def _retriever(calls: list, fail_after: int = None):
+    # 1 minute bars for any range, like `Connector.retrieve_bars`
+    def retrieve(start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        if fail_after is not None and len(calls) >= fail_after:
+            raise ConnectionError("dropped")
+        calls.append((start, end))
+
+        times = pd.date_range(start, end, freq="1min", inclusive="left")
+        close = 6000 + (np.arange(len(times)) % 40) * 0.25
+        return pd.DataFrame(
+            {
+                "time": times.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+                "open": close,
+                "high": close + 1,
+                "low": close - 1,
+                "close": close,
+                "volume": np.full(len(times), 10),
+            }
+        )
+
+    return retrieve
+
+
+def test_chunk_bounds_grid():
+    a = chunk_bounds(utc("2025-01-03"), utc("2025-01-20"))
+    b = chunk_bounds(utc("2025-01-05"), utc("2025-01-20"))
+
+    assert a == b
+    assert a[0][0] <= utc("2025-01-03") and a[-1][1] >= utc("2025-01-20")
+    assert all(s1 == e0 for (_, e0), (s1, _) in zip(a, a[1:]))
+
+
+def test_get_and_cache(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    calls = []
+
+    bars = store.get("ES", "2025-01-03", "2025-01-20", _retriever(calls))
+
+    assert len(bars) == 17 * 1440
+    assert pd.Timestamp(bars.time[0], tz="UTC") == utc("2025-01-03")
+    assert (np.diff(bars.time) > 0).all()
+    assert len(calls) == len(store.chunks("2025-01-03", "2025-01-20"))
+
+    again = store.get("ES", "2025-01-03", "2025-01-20", _retriever(calls))
+    assert len(calls) == len(store.chunks("2025-01-03", "2025-01-20"))
+    assert (again.ohlc == bars.ohlc).all()
+
+
+def test_resume_after_failure(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    calls = []
+
+    with pytest.raises(ConnectionError):
+        store.fill("ES", "2024-01-01", "2024-06-01", _retriever(calls, fail_after=5), workers=1)
+
+    stored = len(calls)
+    assert len(store.missing("ES", "2024-01-01", "2024-06-01")) == len(store.chunks("2024-01-01", "2024-06-01")) - stored
+
+    resumed = []
+    store.fill("ES", "2024-01-01", "2024-06-01", _retriever(resumed), workers=4)
+
+    assert len(resumed) == len(store.chunks("2024-01-01", "2024-06-01")) - stored
+    assert not store.missing("ES", "2024-01-01", "2024-06-01")
+    assert not any(name.endswith(".tmp.npz") for name in os.listdir(tmp_path / "ES"))
+
+
+def test_open_chunk_not_stored(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    now = pd.Timestamp.now(tz="UTC").floor("min")
+    start = now - pd.Timedelta(hours=2)
+
+    bars = store.get("ES", start, now, _retriever([]))
+
+    assert len(bars) == 120
+    assert store.missing("ES", start, now) == store.chunks(start, now)[-1:]
+
+
+def test_empty_chunk_retried_after_ttl(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    calls = []
+    (start, end), = store.chunks("2025-01-02", "2025-01-09")
+
+    def nothing(start, end):
+        calls.append((start, end))
+        return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+
+    assert len(store.get("ES", start, end, nothing)) == 0
+    assert not os.path.exists(store.path("ES", start))
+    assert store.missing("ES", start, end) == []
+
+    # Past the TTL the chunk is asked again, and stored once bars arrive
+    os.utime(store.empty_path("ES", start), (0, 0))
+    assert len(store.get("ES", start, end, _retriever(calls))) == 7 * 1440
+    assert len(calls) == 2 and os.path.exists(store.path("ES", start))
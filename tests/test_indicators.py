@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+import talib
+
+from bars import BarBuffer
+from strategies import indicators
+from strategies.graph import Graph, Indicator, bar_fields
+from strategies.graph.engine import _rows
+
+WINDOWS = [5, 14, 30]
+
+
+def _read_test_data() -> pd.DataFrame:
+    return pd.read_csv("tests/data/test_data.csv", parse_dates=["time"], index_col=False)
+
+
+def test_batched_matches_talib():
+    data = _read_test_data()
+    high, low, close = (data[col].values for col in ["high", "low", "close"])
+
+    ema = indicators.ema(close, WINDOWS)
+    assert ema.shape == (len(WINDOWS), len(data))
+    assert ema.dtype == np.float64 and ema.flags.c_contiguous
+    for row, window in zip(ema, WINDOWS):
+        np.testing.assert_array_equal(row, talib.EMA(close, timeperiod=window))
+
+    for row, window in zip(indicators.atr(high, low, close, WINDOWS), WINDOWS):
+        np.testing.assert_array_equal(row, talib.ATR(high, low, close, timeperiod=window))
+
+    bands = indicators.bbands(close, WINDOWS)
+    assert bands.shape == (3, len(WINDOWS), len(data))
+    upper, middle, lower = talib.BBANDS(close, timeperiod=14, nbdevup=2.0, nbdevdn=2.0)
+    np.testing.assert_array_equal(bands[:, 1], np.vstack([upper, middle, lower]))
+
+
+def test_columns_and_drawables():
+    close = _read_test_data()["close"]
+    values = indicators.rsi(close, WINDOWS)
+
+    columns = indicators.columns("rsi", WINDOWS, values)
+    assert list(columns) == ["rsi_5", "rsi_14", "rsi_30"]
+    assert np.shares_memory(columns["rsi_14"], values)
+
+    drawables = indicators.drawables("rsi", WINDOWS, ["red", "green", "blue"])
+    assert [(d.key, d.color) for d in drawables] == [("rsi_5", "red"), ("rsi_14", "green"), ("rsi_30", "blue")]
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        Indicator("ema", "EMA", "close", timeperiod=10),
+        Indicator("rsi", "RSI", "close", timeperiod=14),
+        Indicator("atr", "ATR", "high", "low", "close", timeperiod=14),
+        Indicator("upper", "BBANDS", "close", output=0, timeperiod=20),
+    ],
+)
+def test_indicator_node_step_matches_batch(node):
+    graph = Graph([node])
+    buffer = BarBuffer.from_frame(_read_test_data())
+    batch = graph.run(bar_fields(buffer))
+
+    rows = _rows(bar_fields(buffer))
+    states = graph.initial()
+    stepped = []
+    for row in rows:
+        # Provisional step on a partial bar first, its state is dropped
+        graph.step(states, {**row, "close": row["open"]})
+        values, states = graph.step(states, row)
+        stepped.append(values[node.name])
+
+    np.testing.assert_array_equal(np.array(stepped), batch[node.name])
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        Indicator("ema", "EMA", "close", timeperiod=10),
+        Indicator("rsi", "RSI", "close", timeperiod=14),
+        Indicator("atr", "ATR", "high", "low", "close", timeperiod=14),
+        Indicator("upper", "BBANDS", "close", output=0, timeperiod=20),
+    ],
+)
+def test_indicator_node_step_matches_trimmed_batch(node):
+    # A live buffer keeps the last 60 bars, each step sees the same bars as a batch over the buffer
+    data = _read_test_data()
+    node.history = 60
+    graph = Graph([node])
+    buffer = BarBuffer.from_frame(data.head(80), max_history=60)
+    states = graph.states(bar_fields(buffer), len(buffer))
+
+    for _, row in data.iloc[80:200].iterrows():
+        values, states = graph.step(states, {"open": row["open"], "high": row["high"], "low": row["low"], "close": row["close"]})
+        buffer.append(row["time"], row["open"], row["high"], row["low"], row["close"])
+        assert len(buffer) == 60
+        assert values[node.name] == graph.run(bar_fields(buffer))[node.name][-1]
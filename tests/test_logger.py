@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+
+import logger
+from logger import SamplingFilter, create_logger, shutdown_logging
+
+
+def _record(level=logging.INFO, lineno=1) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, lineno, "msg", None, None)
+
+
+def test_sampling():
+    sampling = SamplingFilter({logging.INFO: (5, 10)})
+
+    kept = [sampling.filter(_record()) for _ in range(105)]
+    assert sum(kept) == 5 + 10
+
+    # Other call sites and levels are counted separately
+    assert sampling.filter(_record(lineno=2))
+    assert all(sampling.filter(_record(level=logging.WARNING)) for _ in range(100))
+
+
+def test_json_lines(tmp_path, monkeypatch):
+    shutdown_logging()
+    monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path))
+
+    log = create_logger("test_json_lines")
+    for i in range(3):
+        log.info("bar %s closed", i)
+    log.warning("order rejected")
+    shutdown_logging()
+
+    lines = [json.loads(line) for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert [line["msg"] for line in lines] == ["bar 0 closed", "bar 1 closed", "bar 2 closed", "order rejected"]
+    assert lines[-1]["level"] == "WARNING"
+    assert lines[0]["mono_ns"] < lines[-1]["mono_ns"]
+
+
+def test_args_merged_when_logged(tmp_path, monkeypatch):
+    shutdown_logging()
+    monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path))
+
+    log = create_logger("test_args_merged")
+    position = {"size": 1}
+    log.info("position %s", position)
+    position["size"] = 0
+    shutdown_logging()
+
+    lines = [json.loads(line) for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert [line["msg"] for line in lines] == ["position {'size': 1}"]
+
+
+def test_forked_child_logs(tmp_path, monkeypatch):
+    shutdown_logging()
+    monkeypatch.setattr(logger, "LOG_DIR", str(tmp_path))
+
+    log = create_logger("test_forked_child_logs")
+    log.info("parent")
+    pid = os.fork()
+    if pid == 0:
+        log.info("child")
+        shutdown_logging()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    shutdown_logging()
+
+    lines = [json.loads(line) for path in tmp_path.iterdir() for line in path.read_text().splitlines()]
+    assert sorted(line["msg"] for line in lines) == ["child", "parent"]
@@ -0,0 +1,52 @@
+import time
+
+import profiler
+from profiler import SamplingProfiler, profiling, timed, timer
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@timed("test.slow")
+def _slow():
+    _busy(0.01)
+    return 1
+
+
+def test_timers_inactive():
+    assert profiler._active is None
+    assert _slow() == 1
+    with timer("test.scope"):
+        pass
+
+
+def test_samples_and_timers(tmp_path):
+    with profiling(directory=str(tmp_path), interval_ms=1) as prof:
+        for _ in range(5):
+            _slow()
+        with timer("test.scope"):
+            _busy(0.05)
+
+    assert profiler._active is None
+    assert prof.samples > 10
+    assert prof.timers.stats["test.slow"][0] == 5
+    assert prof.timers.stats["test.scope"][1] >= 50_000_000
+
+    collapsed = next(tmp_path.glob("*.collapsed")).read_text().splitlines()
+    assert any("_busy" in line and line.startswith("MainThread;") for line in collapsed)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+
+    summary = next(tmp_path.glob("*.txt")).read_text()
+    assert "test.slow" in summary and "_busy" in summary
+
+
+def test_functions_self_and_total():
+    prof = SamplingProfiler()
+    prof.stacks.update({("main", "a", "b"): 3, ("main", "a"): 2, ("main", "a", "b", "b"): 1})
+
+    rows = {label: (own, total) for label, own, total in prof.functions()}
+    assert rows["a"] == (2, 6)
+    assert rows["b"] == (4, 4)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from backtest.robustness import ROBUSTNESS_COLUMNS, add_robustness, block_bootstrap, max_drawdown, robustness, shuffle_drawdowns
+
+
+def _trades(n_days=40, per_day=3, seed=1):
+    rng = np.random.default_rng(seed)
+    ticks = rng.integers(-20, 25, size=n_days * per_day).astype(np.int32)
+    days = np.repeat(np.arange(19000, 19000 + n_days, dtype=np.int32), per_day)
+    return ticks, days
+
+
+def test_max_drawdown():
+    assert max_drawdown(np.array([[1, -3, 2, -1], [5, 1, 1, 1]])).tolist() == [3, 0]
+
+
+def test_bootstrap_days():
+    ticks = np.array([1, 2, 30, 40, 50], dtype=np.int32)
+    days = np.array([7, 7, 9, 9, 9], dtype=np.int32)
+
+    # Two days drawn one by one: 3 + 3, 3 + 120 or 120 + 120
+    pnl, drawdown = block_bootstrap(ticks, days, np.random.default_rng(0), n=200, block=1, max_slippage=0)
+    assert set(pnl.tolist()) == {6, 123, 240}
+    assert (drawdown == 0).all()
+
+
+def test_shuffle_keeps_pnl():
+    ticks, _ = _trades()
+    rng = np.random.default_rng(0)
+
+    drawdowns = shuffle_drawdowns(ticks, rng, n=500, max_slippage=0)
+    assert drawdowns.shape == (500,)
+    assert (drawdowns >= 0).all()
+    assert drawdowns.min() < drawdowns.max()
+
+
+def test_bootstrap_whole_history():
+    ticks, days = _trades()
+    rng = np.random.default_rng(0)
+
+    # One block of every day is the original history
+    pnl, drawdown = block_bootstrap(ticks, days, rng, n=10, block=len(np.unique(days)), max_slippage=0)
+    assert (pnl == ticks.sum()).all()
+    assert (drawdown == max_drawdown(ticks[None, :])[0]).all()
+
+
+def test_slippage_costs():
+    ticks, days = _trades()
+    rng = np.random.default_rng(0)
+
+    clean, _ = block_bootstrap(ticks, days, rng, n=2000, block=len(np.unique(days)), max_slippage=0)
+    slipped, _ = block_bootstrap(ticks, days, rng, n=2000, block=len(np.unique(days)), max_slippage=1)
+    # Two fills per trade, 0.5 tick expected each
+    assert np.isclose(clean.mean() - slipped.mean(), len(ticks), rtol=0.05)
+
+
+def test_add_robustness():
+    results = pd.DataFrame({"stop": [1, 2, 3], "win_rate": [0.2, 0.6, 0.4]})
+    trades = [_trades(seed=i) for i in range(3)]
+
+    df = add_robustness(results, trades, top=2, n=200)
+    assert df[ROBUSTNESS_COLUMNS].iloc[0].isna().all()
+    assert df[ROBUSTNESS_COLUMNS].iloc[1:].notna().all().all()
+
+    stats = robustness(*trades[1], n=200)
+    assert stats["boot_pnl_p5"] <= stats["boot_pnl_p50"] <= stats["boot_pnl_p95"]
+    assert df.loc[1, "boot_pnl_p5"] <= df.loc[1, "boot_pnl_p95"]
+    assert np.isnan(robustness(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))["loss_prob"])
@@ -0,0 +1,79 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import session
+from session import SessionManager, TTLCache
+
+
+class _Response:
+    ok = True
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def _manager(tmp_path, issued: datetime) -> SessionManager:
+    path = tmp_path / "token.json"
+    path.write_text(json.dumps({"ts": int(issued.timestamp()), "token": "old"}))
+    return SessionManager(token_path=str(path))
+
+
+def test_ttl_cache():
+    cache = TTLCache(ttl=0.05)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get("a", loader) == 1
+    assert cache.get("a", loader) == 1
+    time.sleep(0.06)
+    assert cache.get("a", loader) == 2
+
+
+def test_token_from_disk(tmp_path):
+    manager = _manager(tmp_path, datetime.now() - timedelta(hours=2))
+    headers = manager.session.headers
+    manager.start()
+    manager.stop()
+
+    assert manager.token == "old"
+    assert manager.session.headers is headers
+    assert headers["Authorization"] == "Bearer old"
+    assert manager.expires_at - datetime.now() < timedelta(hours=23)
+
+
+def test_refresh_notifies(tmp_path, monkeypatch):
+    manager = _manager(tmp_path, datetime.now() - timedelta(hours=2))
+    manager.session.headers["X-Other"] = "kept"
+    manager.start()
+    manager.stop()
+
+    monkeypatch.setattr(manager.session, "post", lambda url, json: _Response({"success": True, "newToken": "new"}))
+    received = []
+    manager.on_token(received.append)
+    manager.refresh()
+
+    assert received == ["new"]
+    assert manager.session.headers["Authorization"] == "Bearer new"
+    assert manager.session.headers["X-Other"] == "kept"
+    assert json.loads((tmp_path / "token.json").read_text())["token"] == "new"
+
+
+def test_background_refresh_before_expiry(tmp_path, monkeypatch):
+    # Stored token enters the refresh margin about two seconds after loading
+    monkeypatch.setattr(session, "REFRESH_MARGIN", timedelta(hours=1))
+    manager = _manager(tmp_path, datetime.now() - timedelta(hours=22, minutes=59, seconds=58))
+    monkeypatch.setattr(manager.session, "post", lambda url, json: _Response({"success": True, "newToken": "new"}))
+
+    manager.start()
+    assert manager.token == "old"
+    time.sleep(2.5)
+    manager.stop()
+
+    assert manager.token == "new"
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.portfolio import TICK_VALUE, build_portfolio, build_positions, position_stats
+from backtest.robustness import trade_arrays
+from backtest.shards import WARMUP_MARGIN, ShardedBacktest, _flips, day_stats, plan_shards, reduce_days, shard_bounds
+from bars import CompactBars
+from connector import TIME_UNITS
+from strategies import StrategyConfig, StrategyFactory
+
+PARAMS = {"stop": 28, "fast_ma": 8, "slow_ma": 34}
+TF = (3, TIME_UNITS.Minute)
+
+
+def _bars() -> CompactBars:
+    return CompactBars.from_frame(pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time"], index_col=False))
+
+
+def test_shard_bounds():
+    bars = _bars()
+    shards = shard_bounds(bars, days_per_shard=1, warmup=50)
+
+    assert shards[0] == (0, 0, shards[1][1])
+    assert shards[-1][2] == len(bars)
+    for start, first, end in shards:
+        assert first - start <= 50
+        assert len(np.unique(bars.day[first:end])) == 1
+
+    assert shard_bounds(bars, days_per_shard=5) == [(0, 0, len(bars))]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("trading_hours", [[7, 22], [15, 17]])
+def test_sharded_matches_full(workers, trading_hours):
+    bars = _bars()
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=trading_hours))
+    positions = build_positions(build_portfolio(stra.run(**PARAMS), TF).positions)
+
+    with ShardedBacktest(bars, "DefaultStrategy", trading_hours, TF, workers=workers, days_per_shard=1, warmup=120) as backtest:
+        ticks, days = backtest.trades(PARAMS)
+        stats = backtest.run(PARAMS)
+
+    expected = trade_arrays(positions)
+    assert np.array_equal(ticks, expected[0])
+    assert np.array_equal(days, expected[1])
+    assert stats == position_stats(positions)
+
+
+def test_plan_shards_start_flat():
+    bars = _bars()
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    shards = plan_shards(stra, days_per_shard=1, **PARAMS)
+    df = stra.run(**PARAMS)
+
+    flips = _flips(df["long_entries"].to_numpy(), df["long_exits"].to_numpy())
+    assert shards[0][:2] == (0, 0) and shards[-1][2] == len(bars)
+    for (start, first, end, carry), following in zip(shards, shards[1:] + [None]):
+        assert np.searchsorted(flips, first, side="right") % 2 == 0
+        assert first - start == min(first, PARAMS["slow_ma"] + WARMUP_MARGIN)
+        assert following is None or following[1] == end
+        assert set(carry) == {"_in_position_prior", "in_position"}
+
+
+def test_sharded_default_warmup_matches_full():
+    bars = _bars()
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    expected = trade_arrays(build_positions(build_portfolio(stra.run(**PARAMS), TF).positions))
+
+    with ShardedBacktest(bars, "DefaultStrategy", [7, 22], TF, workers=1, days_per_shard=1) as backtest:
+        ticks, days = backtest.trades(PARAMS)
+
+    assert np.array_equal(ticks, expected[0])
+    assert np.array_equal(days, expected[1])
+
+
+def test_reduce_days_matches_position_stats():
+    rng = np.random.default_rng(1)
+    ticks = rng.integers(-40, 40, size=500).astype(np.int32)
+    days = np.sort(rng.integers(0, 60, size=500)).astype(np.int32)
+
+    expected = position_stats(pd.DataFrame({"Ticks": ticks, "Gain": ticks * TICK_VALUE}))
+    assert reduce_days(day_stats(ticks, days)) == expected
+
+    assert reduce_days(day_stats(ticks[ticks >= 0], days[ticks >= 0]))["average_loss"] == "/"
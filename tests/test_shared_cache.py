@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import CompactBars
+from connector import TIME_UNITS
+from dashboard.cache import SharedCache, cache_key, cached_run, source_files, source_hash
+from dashboard.chart import portfolio_views
+from strategies import StrategyConfig, StrategyFactory
+
+PARAMS = {"stop": 28, "fast_ma": 8, "slow_ma": 34}
+
+
+def _bars() -> CompactBars:
+    return CompactBars.from_frame(pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time"], index_col=False))
+
+
+def test_keys():
+    key = cache_key("chart", "abc", "DefaultStrategy", PARAMS, date=pd.Timestamp("2026-02-27 15:00"), hours=[7, 22])
+    assert key == cache_key("chart", "abc", "DefaultStrategy", dict(reversed(PARAMS.items())), date="2026-02-27", hours=[7, 22])
+    assert key != cache_key("chart", "abc", "DefaultStrategy", PARAMS, date="2026-02-26", hours=[7, 22])
+    assert key != cache_key("chart", "abd", "DefaultStrategy", PARAMS, date="2026-02-27", hours=[7, 22])
+
+
+def test_size_eviction(tmp_path):
+    cache = SharedCache(str(tmp_path), max_bytes=25_000)
+    for i in range(3):
+        cache.store(f"k{i}", np.zeros(1000))
+        os.utime(cache.path(f"k{i}"), (i, i))
+
+    cache.load("k0")  # most recently used now
+    cache.store("k3", np.zeros(1000))
+
+    assert cache.size() <= 25_000
+    assert cache.load("k0") is not None and cache.load("k3") is not None
+    assert cache.load("k1") is None
+
+
+def _compute(directory: str, marker: str):
+    def loader():
+        with open(marker, "a") as outfile:
+            outfile.write("x")
+        time.sleep(0.5)
+        return {"value": 42}
+
+    assert SharedCache(directory).get("shared", loader) == {"value": 42}
+
+
+def test_one_process_computes(tmp_path):
+    marker = str(tmp_path / "calls")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_compute, args=(str(tmp_path / "cache"), marker)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    with open(marker) as infile:
+        assert infile.read() == "x"
+
+
+def test_restored_run_matches(tmp_path):
+    bars = _bars()
+    cache = SharedCache(str(tmp_path))
+    key = cache_key("run", bars.fingerprint(), "DefaultStrategy", PARAMS)
+
+    first = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    expected = cached_run(cache, key, first, **PARAMS).copy()
+
+    second = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    second.run = None  # must not recompute
+    df = cached_run(cache, key, second, **PARAMS)
+
+    pd.testing.assert_frame_equal(df, expected)
+    assert [d.key for d in second.drawable_indicators] == [d.key for d in first.drawable_indicators]
+
+
+def test_source_hash():
+    files = StrategyFactory.source_files("DefaultStrategy")
+    assert any(f.endswith(os.path.join("strategies", "default_strategy.py")) for f in files)
+    assert any(f.endswith(os.path.join("graph", "nodes.py")) for f in files)
+    assert source_hash("DefaultStrategy") == source_hash("defaultstrategy")
+
+    # Bars, settings and the views outside the strategies package count too
+    views = {os.path.relpath(f) for f in source_files("DefaultStrategy")} - {os.path.relpath(f) for f in files}
+    assert {"config.py", os.path.join("bars", "compact.py"), os.path.join("bars", "calendar.py"), os.path.join("dashboard", "chart.py")} <= views
+    with pytest.raises(ValueError):
+        StrategyFactory.source_files("NoSuchStrategy")
+
+
+def test_summary_figure_loads_fast(tmp_path):
+    bars = _bars()
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    df = stra.run(**PARAMS)
+    positions, fig = portfolio_views(df, (3, TIME_UNITS.Minute))
+    # Wall time datetime64, no Timestamp objects left to unpickle
+    assert all(trace.x.dtype.kind == "M" for trace in fig.data if trace.x is not None)
+    assert pd.Timestamp(fig.data[0].x[0]) == df["time"].iloc[0].tz_localize(None)
+
+    cache = SharedCache(str(tmp_path))
+    cache.store("portfolio", (positions, fig))
+    loaded_positions, loaded = cache.load("portfolio")
+    pd.testing.assert_frame_equal(loaded_positions, positions)
+    assert len(loaded.data) == len(fig.data)
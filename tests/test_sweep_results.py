@@ -0,0 +1,55 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from backtest.results import SweepResults
+
+
+def _write_sweep(path, legacy=False):
+    rows = []
+    for stop, fast_ma, slow_ma in itertools.product(range(20, 25), range(5, 9), range(30, 33)):
+        params = {"stop": stop, "fast_ma": fast_ma, "slow_ma": slow_ma}
+        stats = {"total_ticks": stop + fast_ma * slow_ma, "trades": 10, "win_rate": fast_ma / slow_ma, "biggest_win": "/"}
+        rows.append({"params": params, **stats} if legacy else {**params, **stats})
+
+    df = pd.DataFrame(rows).sample(frac=1, random_state=0)  # sweeps are sorted by win_rate, not params
+    df.to_csv(path, index=False)
+
+
+def test_lookup(tmp_path):
+    _write_sweep(tmp_path / "_backtest_1.csv")
+    sweep = SweepResults(tmp_path / "_backtest_1.csv")
+
+    assert sweep.keys == ["stop", "fast_ma", "slow_ma"]
+    assert sweep.axes["fast_ma"].tolist() == [5, 6, 7, 8]
+
+    row = sweep.row({"stop": 22, "fast_ma": 7, "slow_ma": 31})
+    assert row["total_ticks"] == 22 + 7 * 31
+    assert np.isnan(row["biggest_win"])
+
+    assert sweep.row({"stop": 99, "fast_ma": 7, "slow_ma": 31}) is None
+
+
+def test_slice(tmp_path):
+    _write_sweep(tmp_path / "_backtest_1.csv")
+    sweep = SweepResults(tmp_path / "_backtest_1.csv")
+
+    z = sweep.slice("total_ticks", ["fast_ma", "slow_ma"], {"stop": 21})
+    assert z.shape == (4, 3)
+    assert z[1, 2] == 21 + 6 * 32
+
+    z = sweep.slice("total_ticks", ["slow_ma", "fast_ma"], {"stop": 21})
+    assert z.shape == (3, 4)
+    assert z[2, 1] == 21 + 6 * 32
+
+    line = sweep.slice("win_rate", ["stop"], {"fast_ma": 5, "slow_ma": 30})
+    assert np.allclose(line, 5 / 30)
+
+
+def test_legacy_params_column(tmp_path):
+    _write_sweep(tmp_path / "_backtest_1.csv", legacy=True)
+    sweep = SweepResults(tmp_path / "_backtest_1.csv")
+
+    assert sweep.keys == ["stop", "fast_ma", "slow_ma"]
+    assert sweep.row({"stop": 20, "fast_ma": 5, "slow_ma": 30})["total_ticks"] == 20 + 5 * 30
@@ -0,0 +1,94 @@
+import msgpack
+import numpy as np
+import pandas as pd
+
+from connector import TIME_UNITS
+from trading.candles import CandleBuilder, tf_nanos
+from trading.ticks import _messages, decode_times, decode_trade, decode_trades
+from ws import Websocket
+
+TF_NS = tf_nanos((3, TIME_UNITS.Minute))
+
+
+def test_decodes_iso_offsets():
+    values = ["2026-03-02T09:30:00.125-05:00", "2026-03-02T15:30:01+01:00", "2026-03-02T14:30:02Z", "2026-03-02T14:30:03.5+00:00"]
+    expected = [pd.Timestamp(v).value for v in values]
+    assert decode_times(values).tolist() == expected
+    # One offset per batch takes the numpy path
+    same = ["2026-03-02T09:30:00.125-05:00", "2026-03-02T09:30:01-05:00"]
+    assert decode_times(same).tolist() == [pd.Timestamp(v).value for v in same]
+
+
+def test_decodes_msgpack_timestamps():
+    ns = [pd.Timestamp("2026-03-02 14:30:00.25", tz="UTC").value + i * 1_000_000 for i in range(3)]
+    packed = msgpack.packb([{"timestamp": msgpack.Timestamp.from_unix_nano(n), "price": 6000.0} for n in ns])
+    trades = msgpack.unpackb(packed)
+    assert decode_times([t["timestamp"] for t in trades]).tolist() == ns
+    # DateTimeOffset arrives as [timestamp, offset minutes]
+    assert decode_times([[msgpack.Timestamp.from_unix_nano(n), 60] for n in ns]).tolist() == ns
+
+
+def test_decode_trades_orders_and_checks_ticks():
+    trades = [
+        {"timestamp": "2026-03-02T14:30:02+00:00", "price": 6000.5, "volume": 2},
+        {"timestamp": "2026-03-02T14:30:01+00:00", "price": 6000.25, "volume": 1},
+        {"timestamp": "2026-03-02T14:30:02+00:00", "price": 6001.0},
+    ]
+    times, ticks, size = decode_trades(trades, 0.25)
+    assert np.diff(times).min() >= 0
+    assert ticks.tolist() == [24001, 24002, 24004]
+    assert size.tolist() == [1, 2, 0]
+    assert times.dtype == np.int64 and ticks.dtype == np.int32
+
+    assert len(decode_trades([])[0]) == 0
+
+    # Off the tick grid: logged and dropped, the other trades of the message stay
+    times, ticks, _ = decode_trades([*trades, {"timestamp": "2026-03-02T14:30:03+00:00", "price": 6000.1}], 0.25)
+    assert ticks.tolist() == [24001, 24002, 24004]
+    assert decode_trade({"timestamp": "2026-03-02T14:30:02+00:00", "price": 6000.1}, 0.25) is None
+
+
+def test_single_trade_matches_batch():
+    trades = [
+        {"timestamp": "2026-03-02T15:30:02.5+01:00", "price": 6000.5, "volume": 2},
+        {"timestamp": "2026-03-02T14:30:02Z", "price": 6000.25},
+        {"timestamp": msgpack.Timestamp.from_unix_nano(1_772_461_802_000_000_123), "price": 6001.0, "volume": 3},
+        {"timestamp": [msgpack.Timestamp.from_unix_nano(1_772_461_802_000_000_123), 60], "price": 6001.0, "volume": 3},
+    ]
+    for trade in trades:
+        times, ticks, size = decode_trades([trade], 0.25)
+        assert decode_trade(trade, 0.25) == (times[0], ticks[0], size[0])
+
+
+def test_batches_build_the_same_candles():
+    rng = np.random.default_rng(3)
+    ts = np.sort(rng.integers(0, 5 * TF_NS, size=400))
+    prices = 6000 + rng.integers(-20, 21, size=400) * 0.25
+    volumes = rng.integers(1, 5, size=400)
+
+    single, batched = [], []
+    one, many = CandleBuilder(TF_NS, single.append), CandleBuilder(TF_NS, batched.append)
+    for t, p, v in zip(ts.tolist(), prices.tolist(), volumes.tolist()):
+        one.add(t, p, v, received_ns=7)
+    for lo in range(0, 400, 37):
+        many.add_batch(ts[lo : lo + 37], prices[lo : lo + 37], volumes[lo : lo + 37], received_ns=7)
+
+    assert [c.ohlc() + (c.time, c.volume, c.trade_ns, c.received_ns) for c in single] == [
+        c.ohlc() + (c.time, c.volume, c.trade_ns, c.received_ns) for c in batched
+    ]
+    assert many.current.ohlc() == one.current.ohlc() and many.current.trade_ns == one.current.trade_ns
+
+    # Trades of a bar already closed only count as late
+    many.add_batch(np.array([TF_NS, TF_NS + 1]), np.array([1.0, 2.0]), np.array([1, 1]))
+    assert many.late_trades == 2 and len(batched) == len(single)
+
+
+def test_handle_trades_batches():
+    ws = Websocket("CON.F.US.EP.H26", None, tf=(3, TIME_UNITS.Minute))
+    for batch in _messages(30, 20):
+        ws.handle_trades(batch)
+    last = _messages(30, 20)[-1][-1]
+    assert ws.last_price == last["price"]
+    assert ws.last_trade_ns == pd.Timestamp(last["timestamp"]).value
+    # 600 trades 5ms apart, all in the first 3 minute bar
+    assert ws.current_candle().volume == 600
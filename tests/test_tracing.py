@@ -0,0 +1,76 @@
+import time
+
+from connector import TIME_UNITS, Connector
+from strategies import Action, ActionType
+from trading.account import AccountState
+from trading.candles import CandleBuilder, tf_nanos
+from trading.runner import StrategyRunner
+from trading.trader import Trader
+from trading.tracing import STAGES, Tracer, load, mark, stage_stats, tracer
+
+TF_NS = tf_nanos((3, TIME_UNITS.Minute))
+CONTRACT = "CON.F.US.EP.H26"
+
+
+# Appends every bar and buys on each close
+class _Strategy:
+    buffer = []
+
+    def append_bar(self, *args):
+        pass
+
+    def update(self):
+        return Action(ActionType.BUY, 10.0)
+
+
+def _connector() -> Connector:
+    con = Connector.__new__(Connector)
+    con._account_id = 42
+    con._post = lambda url, json={}: time.sleep(0.002) or {"success": True}
+    return con
+
+
+def test_bar_to_order_trace(tmp_path):
+    runner = StrategyRunner(_Strategy(), Trader(CONTRACT, _connector(), AccountState()))
+    builder = CandleBuilder(TF_NS, runner.on_bar_close)
+
+    start = tracer.count
+    now = time.time_ns()
+    bucket = now - now % TF_NS
+    builder.add(bucket + 10**9, 6000.0, 1, received_ns=now)
+    builder.add(bucket + TF_NS + 5, 6000.25, 1, received_ns=now + 1000)
+
+    ids, marks = tracer.traces()
+    assert tracer.count == start + 1
+    assert ids[-1] == bucket
+    row = dict(zip(STAGES, marks[-1]))
+    assert row["exchange"] == bucket + TF_NS + 5 and row["received"] == now + 1000
+    assert all(row[stage] > 0 for stage in STAGES)
+    assert row["order_ack"] - row["order_sent"] >= 2_000_000
+    assert list(marks[-1][2:]) == sorted(marks[-1][2:])
+
+    # Outside a bar's trace the marks go nowhere
+    mark("execute")
+    assert (tracer.traces()[1][-1] == marks[-1]).all()
+
+    path = tracer.dump(str(tmp_path / "traces.npz"))
+    ids, loaded, stages = load(path)
+    assert stages == STAGES and (loaded[-1] == marks[-1]).all()
+
+
+def test_ring_and_stats():
+    ring = Tracer(capacity=4)
+    for i in range(6):
+        with ring.trace(i, exchange=1_000_000 * i + 1):
+            ring.mark("closed", 1_000_000 * i + 3_000_001)
+            if i % 2:
+                ring.mark("order_ack", 1_000_000 * i + 5_000_001)
+
+    ids, marks = ring.traces()
+    assert list(ids) == [2, 3, 4, 5]
+
+    stats = stage_stats(marks)
+    assert stats["closed"] == {"n": 4, "p50_ms": 3.0, "p99_ms": 3.0}
+    assert stats["order_ack"]["n"] == 2 and stats["order_ack"]["p50_ms"] == 2.0
+    assert stats["total"]["p99_ms"] == 5.0
+    assert "execute" not in stats
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.shards import day_stats, reduce_days
+from backtest.walkforward import DayTable, walk_forward
+from bars import CompactBars
+from strategies import StrategyConfig, StrategyFactory
+from strategies.graph import SMA
+
+DAYS = np.arange(19000, 19100, dtype=np.int32)
+PARAMS = [{"stop": stop} for stop in range(12)]
+
+
+def _trades(seed: int = 3) -> list[tuple[np.ndarray, np.ndarray]]:
+    # Per combination, a few trades on random days with its own edge
+    rng = np.random.default_rng(seed)
+    trades = []
+    for i in range(len(PARAMS)):
+        days = np.sort(rng.choice(DAYS, size=300))
+        trades.append(((rng.integers(-20, 21, size=300) + i - 6).astype(np.int32), days))
+    return trades
+
+
+def test_windows_match_day_stats():
+    trades = _trades()
+    table = DayTable(DAYS, trades)
+
+    for lo, hi in [(0, 100), (10, 40), (37, 38), (99, 100)]:
+        for i, (ticks, days) in enumerate(trades):
+            mask = (days >= DAYS[lo]) & (days < DAYS[hi - 1] + 1)
+            stats = reduce_days(day_stats(ticks[mask], days[mask]))
+            assert table.window("ticks", lo, hi)[i] == stats["total_ticks"]
+            assert table.window("trades", lo, hi)[i] == stats["trades"]
+            assert table.metric("win_rate", lo, hi)[i] == pytest.approx(stats["win_rate"])
+
+
+def test_steps_pick_in_sample_best():
+    trades = _trades()
+    steps, oos = walk_forward(PARAMS, trades, DAYS, in_sample=30, out_of_sample=10, min_trades=5)
+
+    assert len(steps) == 7
+    assert list(steps["out_of_sample_from"].iloc[:2]) == [pd.Timestamp(int(DAYS[d]) * 86_400 * 10**9).date() for d in (30, 40)]
+
+    total = 0
+    for row in steps.itertuples():
+        lo = row.step * 10
+        in_sample = [t[(d >= DAYS[lo]) & (d <= DAYS[lo + 29])].sum() for t, d in trades]
+        assert row.stop == int(np.argmax(in_sample))
+        assert row.in_sample_total_ticks == max(in_sample)
+
+        ticks, days = trades[row.stop]
+        hi = min(lo + 40, len(DAYS))
+        assert row.total_ticks == ticks[(days >= DAYS[lo + 30]) & (days <= DAYS[hi - 1])].sum()
+        total += row.total_ticks
+
+    assert oos["total_ticks"] == total
+
+
+def test_sweep_reuses_indicators(monkeypatch):
+    bars = CompactBars.from_frame(pd.read_csv("tests/data/test_data_2.csv", parse_dates=["time"], index_col=False))
+    stra = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+
+    calls = []
+    batch = SMA.batch
+    monkeypatch.setattr(SMA, "batch", lambda self, src: calls.append(self.window) or batch(self, src))
+
+    for stop in (20, 28, 36):
+        df = stra.run(stop=stop, fast_ma=8, slow_ma=34)
+    stra.run(stop=20, fast_ma=5, slow_ma=34)
+    assert sorted(calls) == [5, 8, 34]
+
+    fresh = StrategyFactory.create("DefaultStrategy", bars, StrategyConfig(trading_hours=[7, 22]))
+    pd.testing.assert_frame_equal(stra.run(stop=36, fast_ma=8, slow_ma=34).copy(), fresh.run(stop=36, fast_ma=8, slow_ma=34).copy())
+
+    # A changed last bar invalidates the memo
+    stra.update_bar(1e6, 0.0, 1e6)
+    stra.run(stop=36, fast_ma=8, slow_ma=34)
+    assert sorted(calls) == [5, 8, 8, 8, 34, 34, 34]  # fresh strategy, then the recomputed run
@@ -0,0 +1,70 @@
+import threading
+from typing import Optional
+
+from logger import create_logger
+
+log = create_logger(__name__)
+
+# Gateway enums, see the user hub docs
+ORDER_OPEN = {1, 6}  # Open, Pending
+POSITION_LONG, POSITION_SHORT = 1, 2
+MAX_FILLS = 1000
+
+
+# Orders, positions and fills of one account, kept current by user hub events (`ws.UserHub`).
+# A REST snapshot seeds it on (re)connect, events are applied by id so replays are harmless.
+# Reads are lock-protected dict lookups, cheap enough for every trading decision.
+class AccountState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.orders: dict[int, dict] = {}  # working orders by id
+        self.positions: dict[str, dict] = {}  # open positions by contract
+        self.fills: dict[int, dict] = {}  # latest `MAX_FILLS` trades by id
+        self.seeded = False
+
+    def seed(self, orders: list[dict], positions: list[dict]):
+        with self._lock:
+            self.orders = {o["id"]: o for o in orders if o.get("status", 1) in ORDER_OPEN}
+            self.positions = {p["contractId"]: p for p in positions if p.get("size")}
+            self.seeded = True
+
+    def apply_order(self, order: dict):
+        with self._lock:
+            if order.get("status") in ORDER_OPEN:
+                self.orders[order["id"]] = order
+            else:
+                self.orders.pop(order["id"], None)
+
+    def apply_position(self, position: dict):
+        with self._lock:
+            if position.get("size"):
+                self.positions[position["contractId"]] = position
+            else:
+                self.positions.pop(position["contractId"], None)
+
+    def apply_trade(self, trade: dict):
+        with self._lock:
+            if trade.get("voided"):
+                self.fills.pop(trade["id"], None)
+                return
+            self.fills[trade["id"]] = trade
+            if len(self.fills) > MAX_FILLS:
+                self.fills.pop(next(iter(self.fills)))
+
+    def position(self, contract_id: str) -> Optional[dict]:
+        with self._lock:
+            return self.positions.get(contract_id)
+
+    def net_size(self, contract_id: str) -> int:
+        # Signed, positive long
+        position = self.position(contract_id)
+        if not position:
+            return 0
+        return position["size"] if position.get("type") != POSITION_SHORT else -position["size"]
+
+    def in_position(self, contract_id: str) -> bool:
+        return self.net_size(contract_id) != 0
+
+    def open_orders(self, contract_id: str) -> list[dict]:
+        with self._lock:
+            return [o for o in self.orders.values() if o["contractId"] == contract_id]
@@ -0,0 +1,166 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+
+from connector import TIME_UNITS
+
+UNIT_SECONDS = {
+    TIME_UNITS.Second: 1,
+    TIME_UNITS.Minute: 60,
+    TIME_UNITS.Hour: 3600,
+    TIME_UNITS.Day: 86400,
+}
+
+CLOSE_GRACE = 0.25  # seconds after the boundary before a bar without a next trade is closed by the clock
+
+
+def tf_nanos(tf: tuple[int, TIME_UNITS]) -> int:
+    return tf[0] * UNIT_SECONDS[tf[1]] * 1_000_000_000
+
+
+class Candle:
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "closed_ns", "trade_ns", "received_ns", "closed_at")
+
+    def __init__(self, time: int, price: float, volume: int = 0):
+        self.time = time  # bucket start, epoch nanos UTC
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        self.closed_ns = 0  # monotonic time the close was detected
+        # Latency trace: exchange and receipt time of the last trade (the one that closed the bar, if any), wall clock close
+        self.trade_ns = self.received_ns = self.closed_at = 0
+
+    @classmethod
+    def from_bar(cls, time: int, open_: float, high: float, low: float, close: float, volume: int = 0) -> "Candle":
+        candle = cls(time, open_, volume)
+        candle.high, candle.low, candle.close = high, low, close
+        return candle
+
+    def add(self, price: float, volume: int = 0):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+
+    def merge(self, high: float, low: float, close: float, volume: int = 0):
+        # Several trades of this bucket at once
+        if high > self.high:
+            self.high = high
+        if low < self.low:
+            self.low = low
+        self.close = close
+        self.volume += volume
+
+    def ohlc(self) -> tuple[float, float, float, float]:
+        return self.open, self.high, self.low, self.close
+
+
+# Builds bars from trades keyed by the exchange timestamp, not the wall clock.
+# The first trade of a new bucket closes the previous bar right away on the calling (websocket) thread;
+# a clock thread closes it CLOSE_GRACE after the boundary when the market is quiet.
+# Close callbacks (strategy update, orders) run outside the candle lock, so trades keep merging into the next bar
+# meanwhile and callbacks may read the builder. Closed candles queue up in close order, one thread at a time drains them.
+class CandleBuilder:
+    tf_ns: int
+    current: Optional[Candle] = None
+
+    def __init__(self, tf_ns: int, on_close: Optional[Callable[[Candle], None]] = None):
+        self.tf_ns = tf_ns
+        self._on_close = [on_close] if on_close else []
+        self._lock = threading.Lock()
+        self._closed: deque[Candle] = deque()  # closed under `_lock`, handed to the callbacks under `_closing`
+        self._closing = threading.RLock()
+        self._clock: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.late_trades = 0
+
+    def on_close(self, callback: Callable[[Candle], None]):
+        self._on_close.append(callback)
+
+    def add(self, ts_ns: int, price: float, volume: int = 0, received_ns: int = 0):
+        self._merge(ts_ns - ts_ns % self.tf_ns, price, price, price, price, volume, ts_ns, ts_ns, received_ns, 1)
+
+    def add_batch(self, ts_ns: np.ndarray, prices: np.ndarray, volumes: np.ndarray, received_ns: int = 0):
+        # Time ordered trades of one message, one candle update per bucket instead of one per trade.
+        # Messages hold a handful of trades, plain lists beat numpy reductions at that size
+        buckets = (ts_ns - ts_ns % self.tf_ns).tolist()
+        times, prices, volumes = ts_ns.tolist(), prices.tolist(), volumes.tolist()
+        lo = 0
+        while lo < len(buckets):
+            hi = bisect_right(buckets, buckets[lo], lo)
+            segment = prices[lo:hi]
+            self._merge(
+                buckets[lo], segment[0], max(segment), min(segment), segment[-1], sum(volumes[lo:hi]), times[lo], times[hi - 1], received_ns, hi - lo
+            )
+            lo = hi
+
+    def _merge(self, bucket, open_, high, low, close, volume, first_ns, last_ns, received_ns, trades):
+        closed = None
+        with self._lock:
+            current = self.current
+            if current is None or bucket > current.time:
+                if current is not None:
+                    current.trade_ns, current.received_ns = first_ns, received_ns
+                    closed = current
+                    self._push(closed)
+                self.current = current = Candle.from_bar(bucket, open_, high, low, close, volume)
+            elif bucket == current.time:
+                current.merge(high, low, close, volume)
+            else:
+                # Bar already closed and handed to the strategy
+                self.late_trades += trades
+                return
+            current.trade_ns, current.received_ns = last_ns, received_ns
+
+        if closed is not None:
+            self._drain()
+
+    def reset(self, candle: Optional[Candle] = None):
+        # Replaces the bar in progress without closing it, e.g. with the server's partial bar after a gap
+        with self._lock:
+            self.current = candle
+
+    def close_due(self, now_ns: Optional[int] = None):
+        now_ns = now_ns if now_ns is not None else time.time_ns()
+
+        with self._lock:
+            current = self.current
+            if current is None or now_ns < current.time + self.tf_ns:
+                return
+            self.current = None
+            self._push(current)
+        self._drain()
+
+    def _push(self, candle: Candle):
+        # Under `_lock`, close latency counts from here
+        candle.closed_ns = time.perf_counter_ns()
+        candle.closed_at = time.time_ns()
+        self._closed.append(candle)
+
+    def _drain(self):
+        with self._closing:
+            while self._closed:
+                candle = self._closed.popleft()
+                for callback in self._on_close:
+                    callback(candle)
+
+    def start_clock(self, grace: float = CLOSE_GRACE) -> "CandleBuilder":
+        def run():
+            while not self._stopped.is_set():
+                now = time.time_ns()
+                boundary = now - now % self.tf_ns + self.tf_ns
+                if self._stopped.wait((boundary - now) / 1e9 + grace):
+                    return
+                self.close_due()
+
+        self._clock = threading.Thread(target=run, name="bar-clock", daemon=True)
+        self._clock.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,313 @@
+import json
+import os
+import signal
+import threading
+from datetime import datetime, time, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import requests
+
+from bars import CompactBars
+from config import DAEMON_DIR, DAEMON_PORT, LIVE_MAX_HISTORY, LOCAL_TIMEZONE, PARAMS
+from connector import Connector
+from logger import create_logger
+from strategies import Action, ActionType, BaseStrategy, StrategyConfig, StrategyFactory
+from trading.runner import StrategyRunner
+from trading.trader import Trader
+from trading.tracing import tracer
+from ws import UserHub, Websocket
+
+log = create_logger(__name__)
+
+BAR_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def live_window() -> list[str]:
+    # Yesterday midnight until now, enough warm-up for the live strategy
+    now_utc = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).astimezone(timezone.utc)
+    start = datetime.combine(now_utc, time.min) - timedelta(days=1)
+    return [start.isoformat(), now_utc.isoformat()]
+
+
+def _bars_snapshot(stra: BaseStrategy, since: int = 0) -> CompactBars:
+    # Copy of the bars at or after `since` (epoch nanos), callers hold the runner lock
+    df = stra.buffer.frame()
+    return CompactBars.from_frame(df[stra.buffer.column("time") >= since])
+
+
+# Bars and decisions of the last session, written atomically so a crash mid-write keeps the previous one
+class Checkpoint:
+    def __init__(self, directory: str = DAEMON_DIR):
+        self.directory = directory
+
+    @property
+    def bars_path(self) -> str:
+        return os.path.join(self.directory, "bars.npz")
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.directory, "state.json")
+
+    def save(self, bars: CompactBars, state: dict):
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp = self.bars_path + ".tmp.npz"
+        bars.save(tmp)
+        os.replace(tmp, self.bars_path)
+
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as outfile:
+            json.dump(state, outfile)
+        os.replace(tmp, self.state_path)
+
+    def load(self) -> Optional[tuple[CompactBars, dict]]:
+        try:
+            bars = CompactBars.load(self.bars_path)
+            with open(self.state_path) as infile:
+                state = json.load(infile)
+        except (OSError, ValueError) as e:
+            log.info(f"No checkpoint loaded: {e}")
+            return None
+
+        if not len(bars):
+            return None
+        return bars, state
+
+
+# Trading without the dashboard: history, websocket, strategy and orders in one process.
+# Bar closes run on the websocket thread (see StrategyRunner), the main thread only checkpoints and waits for a signal.
+# A dashboard can attach read-only through the state endpoint (`main.py --attach`).
+class TradingDaemon:
+    stra: Optional[BaseStrategy] = None
+    runner: Optional[StrategyRunner] = None
+    ws: Optional[Websocket] = None
+    user_hub: Optional[UserHub] = None
+    started_at: Optional[datetime] = None
+
+    def __init__(self, con: Connector, config: tuple, port: Optional[int] = DAEMON_PORT, directory: str = DAEMON_DIR):
+        self.contract_id, self.symbol, self.tf, self.strategy, _stream = config
+        self.con = con
+        self.port = port
+        self.checkpoint = Checkpoint(directory)
+        self._stopped = threading.Event()
+        self._dirty = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def identity(self) -> dict:
+        # What a checkpoint was written for, a checkpoint of another contract, timeframe or strategy is discarded
+        return {"contract_id": self.contract_id, "symbol": self.symbol, "tf": [self.tf[0], self.tf[1].value], "strategy": self.strategy}
+
+    def _restore(self, start: str) -> Optional[tuple[CompactBars, dict]]:
+        restored = self.checkpoint.load()
+        if restored is None:
+            return None
+
+        bars, state = restored
+        mismatch = [key for key, value in self.identity().items() if state.get(key) != value]
+        if mismatch:
+            log.info(f"Checkpoint discarded, {', '.join(mismatch)} changed")
+            return None
+        if bars.time[-1] < pd.Timestamp(start).value:
+            # Older than the live window, the gap would be fetched in full anyway
+            log.info(f"Checkpoint discarded, last bar {pd.Timestamp(bars.time[-1], tz='UTC')} before {start}")
+            return None
+        return restored
+
+    def load_history(self) -> tuple[CompactBars, dict]:
+        start, end = live_window()
+
+        restored = self._restore(start)
+        if restored is None:
+            df = self.con.get_bars(self.symbol, self.contract_id, tf=self.tf, times=[start, end], includePartialBar=True)
+            return CompactBars.from_frame(df), {}
+
+        # Only the gap since the last checkpointed bar is fetched, older history survives restarts
+        bars, state = restored
+        history = bars.to_frame()[BAR_COLUMNS]
+        last = pd.Timestamp(bars.time[-1], tz="UTC")
+        try:
+            fresh = self.con.get_bars(self.symbol, self.contract_id, tf=self.tf, times=[last.isoformat(), end], includePartialBar=True)
+            fresh = fresh[BAR_COLUMNS]
+            history = history[history["time"] < fresh["time"].iloc[0]]
+        except ValueError:
+            fresh = history.iloc[:0]
+
+        log.info(f"Restored {len(history)} bars up to {last}, fetched {len(fresh)}")
+        return CompactBars.from_frame(pd.concat([history, fresh], ignore_index=True)), state
+
+    def start(self) -> "TradingDaemon":
+        # Orders are never replayed after a restart, the user hub snapshot is the source of truth for the open position
+        self.user_hub = UserHub(self.con).run()
+
+        bars, state = self.load_history()
+
+        self.stra = StrategyFactory.create(
+            self.strategy,
+            bars,
+            StrategyConfig(trading_hours=PARAMS.get("trading_hours", [7, 22]), max_history=LIVE_MAX_HISTORY),
+        )
+        self.stra.run(**PARAMS)
+
+        trader = Trader(self.contract_id, self.con, self.user_hub.account)
+
+        self.runner = StrategyRunner(self.stra, trader)
+        if state.get("last_action"):
+            self.runner.last_action = Action(ActionType[state["last_action"]["type"]], state["last_action"]["stop"])
+
+        self.ws = Websocket(self.contract_id, self.con, tf=self.tf)
+        self.ws.on_bar_close(self.runner.on_bar_close)
+        self.ws.on_bar_close(lambda candle: self._dirty.set())
+        self.ws.on_backfill(self.runner.on_backfill)
+        self.ws.on_backfill(lambda candles: self._dirty.set())
+
+        if self.port:
+            self._server = serve_state(self, self.port)
+
+        self.started_at = datetime.now(timezone.utc)
+        self.ws.run()
+        self.save()
+
+        log.info(f"Daemon started with {len(self.stra.df)} bars, in_position={trader.in_position}")
+        return self
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop())
+
+        self.start()
+        try:
+            while not self._stopped.wait(1):
+                if self._dirty.is_set():
+                    self._dirty.clear()
+                    self.save()
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self._stopped.set()
+
+    def shutdown(self):
+        log.info("Daemon stopping")
+        if self.ws:
+            self.ws.stop()
+        if self.user_hub:
+            self.user_hub.stop()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.stra is not None:
+            self.save()
+        tracer.dump()
+
+    def save(self):
+        with self.runner.lock:
+            bars = _bars_snapshot(self.stra)
+        action = self.runner.last_action
+
+        self.checkpoint.save(
+            bars,
+            {
+                **self.identity(),
+                "saved_at": datetime.now(timezone.utc).isoformat(),
+                "last_action": action and {"type": action.action_type.name, "stop": action.stop},
+            },
+        )
+
+    def bars(self, since: int = 0) -> CompactBars:
+        with self.runner.lock:
+            return _bars_snapshot(self.stra, since)
+
+    def state(self) -> dict:
+        with self.runner.lock:
+            times = self.stra.buffer.column("time")
+            bar_time, n_bars = (int(times[-1]) if len(times) else None), len(times)
+
+        candle = self.ws.current_candle() if self.ws else None
+        action = self.runner.last_action
+
+        return {
+            **self.identity(),
+            "params": PARAMS,
+            "started_at": self.started_at and self.started_at.isoformat(),
+            "bars": n_bars,
+            "bar_time": bar_time,
+            "last_price": self.ws and self.ws.last_price,
+            "candle": candle and list(candle.ohlc()),
+            "last_action": action and {"type": action.action_type.name, "stop": action.stop},
+            "in_position": self.runner.trader.in_position if self.runner.trader else None,
+            "latency": self.runner.latency_stats(),
+        }
+
+
+class _StateHandler(BaseHTTPRequestHandler):
+    daemon: TradingDaemon
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/state":
+            body, content_type = json.dumps(self.daemon.state()).encode(), "application/json"
+        elif url.path == "/bars":
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+            out = BytesIO()
+            self.daemon.bars(since).save(out)
+            body, content_type = out.getvalue(), "application/octet-stream"
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+def serve_state(daemon: TradingDaemon, port: int = DAEMON_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    handler = type("StateHandler", (_StateHandler,), {"daemon": daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="daemon-state", daemon=True).start()
+    return server
+
+
+# Dashboard side of `--attach`, mirrors the daemon's bars into a local strategy, never trades
+class DaemonClient:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self._bar_time: Optional[int] = None
+
+    def state(self) -> dict:
+        res = self.session.get(f"{self.url}/state", timeout=5)
+        res.raise_for_status()
+        return res.json()
+
+    def bars(self, since: int = 0) -> CompactBars:
+        res = self.session.get(f"{self.url}/bars", params={"since": since}, timeout=30)
+        res.raise_for_status()
+        return CompactBars.load(BytesIO(res.content))
+
+    def sync(self, stra: BaseStrategy) -> dict:
+        state = self.state()
+        if state["bar_time"] is None or state["bar_time"] == self._bar_time:
+            return state
+
+        last = int(stra.buffer.column("time")[-1])
+        new = self.bars(since=last)
+        for i in range(len(new)):
+            open_, high, low, close = new.ohlc[i] * new.tick_size
+            if new.time[i] == last:
+                stra.update_bar(high, low, close)
+            else:
+                stra.append_bar(pd.Timestamp(new.time[i], tz="UTC"), open_, high, low, close, new.volume[i])
+
+        stra.update()
+        self._bar_time = state["bar_time"]
+        return state
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from logger import create_logger
+from strategies import Action, BaseStrategy
+from trading.candles import Candle
+from trading.trader import Trader
+from trading.tracing import mark, tracer
+
+log = create_logger(__name__)
+
+
+# Feeds closed bars into the strategy and dispatches its actions, called from the bar close event (websocket thread).
+# Independent of the dashboard, which only reads `stra.df` and `last_action`.
+class StrategyRunner:
+    stra: BaseStrategy
+    trader: Optional[Trader]
+    last_action: Optional[Action] = None
+
+    def __init__(self, stra: BaseStrategy, trader: Optional[Trader] = None):
+        self.stra = stra
+        self.trader = trader
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=10_000)  # bar close -> decision, nanos
+
+    def on_bar_close(self, candle: Candle):
+        try:
+            self._on_bar_close(candle)
+        except Exception as e:
+            log.exception(f"Bar close handling failed: {e}")
+
+    def _on_bar_close(self, candle: Candle):
+        time_ = pd.Timestamp(candle.time, tz="UTC")
+
+        # Trader and connector mark their stages on this thread's trace
+        with tracer.trace(candle.time, exchange=candle.trade_ns, received=candle.received_ns, closed=candle.closed_at):
+            with self.lock:
+                buffer = self.stra.buffer
+                if len(buffer) and buffer.column("time")[-1] == candle.time:
+                    # History was loaded with the partial bar of this bucket
+                    self.stra.update_bar(candle.high, candle.low, candle.close, candle.volume)
+                else:
+                    self.stra.append_bar(time_, *candle.ohlc(), candle.volume)
+
+                mark("update_start")
+                action = self.stra.update()
+                mark("update_end")
+
+            self.latencies.append(time.perf_counter_ns() - candle.closed_ns)
+            self._dispatch(action)
+
+    def on_backfill(self, candles: list[Candle]):
+        try:
+            self._on_backfill(candles)
+        except Exception as e:
+            log.exception(f"Backfill handling failed: {e}")
+
+    def _on_backfill(self, candles: list[Candle]):
+        # Closed bars missed while disconnected, the last known bar may have been closed incomplete by the clock.
+        # One update afterwards, the strategy advances over all of them incrementally
+        if not candles:
+            return
+
+        with self.lock:
+            buffer = self.stra.buffer
+            last = int(buffer.column("time")[-1]) if len(buffer) else None
+            added = 0
+            for candle in candles:
+                if last is not None and candle.time < last:
+                    continue
+                if candle.time == last:
+                    self.stra.replace_bar(*candle.ohlc(), candle.volume)
+                else:
+                    self.stra.append_bar(pd.Timestamp(candle.time, tz="UTC"), *candle.ohlc(), candle.volume)
+                    added += 1
+
+            action = self.stra.update()
+
+        log.info(f"Backfilled {added} bars after reconnect")
+        self._dispatch(action)
+
+    def _dispatch(self, action: Optional[Action]):
+        if action:
+            self.last_action = action
+            log.info(f"Action: {action.action_type}, Stop: {action.stop}")
+            if self.trader:
+                self.trader.execute(action)
+
+    def latency_stats(self) -> dict[str, float]:
+        if not self.latencies:
+            return {}
+        values = np.fromiter(self.latencies, dtype=np.int64) / 1e6
+        return {"p50_ms": float(np.percentile(values, 50)), "p99_ms": float(np.percentile(values, 99)), "bars": len(values)}
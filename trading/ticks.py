@@ -0,0 +1,167 @@
+import json
+import time
+from typing import Optional, Sequence
+
+import click
+import msgpack
+import numpy as np
+import pandas as pd
+
+from config import TICK_SIZE
+from connector import TIME_UNITS
+from logger import create_logger
+from trading.candles import CandleBuilder, tf_nanos
+
+log = create_logger(__name__)
+
+# Trade batches of the market hub as typed columns: epoch nanos (UTC), price ticks and size.
+# JSON messages carry ISO timestamps, MessagePack ones msgpack timestamps (or [timestamp, offset] for DateTimeOffset).
+# Trades off the tick grid are logged and dropped, the rest of their message still counts.
+
+
+_OFFSETS: dict[str, int] = {}  # ISO offset suffix -> nanos
+
+
+def _offset(value: str) -> tuple[str, int]:
+    # UTC offset suffix of an ISO timestamp and its nanos, ("", 0) for naive
+    if value[-1] == "Z":
+        return "Z", 0
+    suffix = value[-6:]
+    offset = _OFFSETS.get(suffix)
+    if offset is None:
+        if suffix[0] not in "+-" or suffix[3] != ":":
+            return "", 0
+        sign = 1 if suffix[0] == "+" else -1
+        offset = _OFFSETS[suffix] = sign * (int(suffix[1:3]) * 3600 + int(suffix[4:]) * 60) * 1_000_000_000
+    return suffix, offset
+
+
+def decode_times(values: Sequence) -> np.ndarray:
+    first = values[0]
+    if isinstance(first, str):
+        suffix, offset = _offset(first)
+        cut = len(suffix)
+        naive = [v[:-cut] for v in values if v.endswith(suffix)] if cut else values
+        if len(naive) == len(values):
+            # The hub sends one offset per batch, numpy parses the naive part in C
+            return np.array(naive, dtype="datetime64[ns]").view(np.int64) - offset
+        return pd.to_datetime(values, utc=True, format="ISO8601").as_unit("ns").asi8
+    if isinstance(first, (list, tuple)):
+        values = [v[0] for v in values]
+        first = values[0]
+    if isinstance(first, msgpack.Timestamp):
+        return np.fromiter((v.to_unix_nano() for v in values), dtype=np.int64, count=len(values))
+    return pd.to_datetime(values, utc=True).as_unit("ns").asi8
+
+
+def decode_time(value) -> int:
+    # One timestamp as `decode_times` reads it
+    if isinstance(value, str):
+        suffix, offset = _offset(value)
+        return np.datetime64(value[: len(value) - len(suffix)], "ns").item() - offset
+    if isinstance(value, (list, tuple)):
+        value = value[0]
+    if isinstance(value, msgpack.Timestamp):
+        return value.to_unix_nano()
+    return pd.Timestamp(value).value
+
+
+def decode_trade(trade: dict, tick_size: float = TICK_SIZE) -> Optional[tuple[int, int, int]]:
+    # (time, ticks, size) of a single trade message without the array setup of `decode_trades`, None off the tick grid
+    price = trade["price"]
+    ticks = round(price / tick_size)
+    if abs(ticks * tick_size - price) > tick_size * 1e-6:
+        log.warning(f"Trade off the tick size {tick_size} skipped: {trade}")
+        return None
+    return decode_time(trade["timestamp"]), ticks, trade.get("volume", 0)
+
+
+def decode_trades(trades: list[dict], tick_size: float = TICK_SIZE) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (time, ticks, size) ordered by exchange time, trades in a message are not guaranteed to be ordered
+    n = len(trades)
+    if not n:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+    times = decode_times([t["timestamp"] for t in trades])
+    prices = np.array([t["price"] for t in trades], dtype=np.float64)
+    ticks = np.rint(prices / tick_size).astype(np.int32)
+    size = np.array([t.get("volume", 0) for t in trades], dtype=np.int32)
+
+    off = np.abs(ticks * tick_size - prices) > tick_size * 1e-6
+    if off.any():
+        log.warning(f"{int(off.sum())} trades off the tick size {tick_size} skipped: {[trades[i] for i in np.flatnonzero(off)]}")
+        times, ticks, size = times[~off], ticks[~off], size[~off]
+
+    if len(times) > 1 and (np.diff(times) < 0).any():
+        order = np.argsort(times, kind="stable")
+        times, ticks, size = times[order], ticks[order], size[order]
+    return times, ticks, size
+
+
+def _messages(n: int, trades_per_message: int, seed: int = 0) -> list[list[dict]]:
+    # GatewayTrade payloads as the hub sends them, a random walk around 6000
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2026-03-02 14:30", tz="UTC").value
+    messages = []
+    for i in range(n):
+        times = start + (i * trades_per_message + np.arange(trades_per_message)) * 5_000_000
+        prices = 6000 + rng.integers(-8, 9, size=trades_per_message) * TICK_SIZE
+        messages.append(
+            [
+                {"symbolId": "F.US.EP", "price": float(p), "timestamp": pd.Timestamp(t, tz="UTC").isoformat(), "type": 0, "volume": 1}
+                for t, p in zip(times, prices)
+            ]
+        )
+    return messages
+
+
+def _legacy(candles: CandleBuilder, trades: list[dict]):
+    # Per trade parsing and candle updates as `Websocket.handle_trades` did before the batched decoder
+    for ts, price, volume in sorted((pd.Timestamp(t["timestamp"]).value, t["price"], t.get("volume", 0)) for t in trades):
+        candles.add(ts, price, volume)
+
+
+def _batched(candles: CandleBuilder, trades: list[dict]):
+    # As `Websocket.handle_trades`: single trades through the scalar path, larger messages as arrays
+    if len(trades) == 1:
+        trade = decode_trade(trades[0])
+        if trade is not None:
+            candles.add(trade[0], trade[1] * TICK_SIZE, trade[2])
+        return
+    times, ticks, size = decode_trades(trades)
+    candles.add_batch(times, ticks * TICK_SIZE, size)
+
+
+@click.command()
+@click.option("--messages", default=5000, help="Messages per run.")
+@click.option("--trades", "trades_per_message", default=20, help="Trades per message.")
+def bench(messages: int, trades_per_message: int):
+    batches = _messages(messages, trades_per_message)
+    as_json = [json.dumps({"type": 1, "target": "GatewayTrade", "arguments": ["F.US.EP", b]}) for b in batches]
+
+    as_msgpack = []
+    for batch in batches:
+        packed = [{**t, "timestamp": msgpack.Timestamp.from_unix_nano(pd.Timestamp(t["timestamp"]).value)} for t in batch]
+        as_msgpack.append(msgpack.packb([1, {}, None, "GatewayTrade", ["F.US.EP", packed], []]))
+
+    def feed(decode, parse, payloads):
+        # Fresh candles per path, each message is decoded and fed to the candles like the live handler does
+        candles = CandleBuilder(tf_nanos((3, TIME_UNITS.Minute)))
+        for payload in payloads:
+            decode(candles, parse(payload))
+
+    paths = {
+        "json + per trade": lambda: feed(_legacy, lambda m: json.loads(m)["arguments"][1], as_json),
+        "json + batched": lambda: feed(_batched, lambda m: json.loads(m)["arguments"][1], as_json),
+        "msgpack + batched": lambda: feed(_batched, lambda m: msgpack.unpackb(m)[4][1], as_msgpack),
+    }
+    print(f"{messages} messages x {trades_per_message} trades")
+    for name, run in paths.items():
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20}{messages / elapsed:>12,.0f} msg/s{messages * trades_per_message / elapsed:>14,.0f} trades/s")
+
+
+if __name__ == "__main__":
+    bench()
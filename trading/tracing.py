@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+import click
+import numpy as np
+
+from config import TRACE_CAPACITY, TRACE_DIR
+from logger import create_logger
+
+log = create_logger(__name__)
+
+# Path of one bar from the exchange to the order response, epoch nanos, 0 when a stage was not reached
+# (no trade closed the bar, no action, order skipped)
+STAGES = ("exchange", "received", "closed", "update_start", "update_end", "execute", "order_sent", "order_ack")
+
+
+# Per bar traces keyed by the bar time, in a preallocated ring of the last `capacity` bars.
+# A trace belongs to the thread that began it, so code further down the path (trader, connector) marks stages
+# through the module level `mark` without the trace being passed along.
+class Tracer:
+    def __init__(self, capacity: int = TRACE_CAPACITY):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.marks = np.zeros((capacity, len(STAGES)), dtype=np.int64)
+        self.count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def capacity(self) -> int:
+        return len(self.ids)
+
+    def begin(self, trace_id: int, **marks: int):
+        with self._lock:
+            row = self.count % self.capacity
+            self.count += 1
+        self.ids[row] = trace_id
+        self.marks[row] = 0
+        for stage, ns in marks.items():
+            if ns:
+                self.marks[row, STAGES.index(stage)] = ns
+        self._local.row = row
+
+    def mark(self, stage: str, ns: Optional[int] = None):
+        row = getattr(self._local, "row", None)
+        if row is not None:
+            self.marks[row, STAGES.index(stage)] = ns or time.time_ns()
+
+    def end(self):
+        self._local.row = None
+
+    @contextmanager
+    def trace(self, trace_id: int, **marks: int) -> Iterator[None]:
+        self.begin(trace_id, **marks)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def traces(self) -> tuple[np.ndarray, np.ndarray]:
+        # (ids, marks) oldest first
+        with self._lock:
+            n = min(self.count, self.capacity)
+            order = (np.arange(n) + self.count - n) % self.capacity
+        return self.ids[order], self.marks[order]
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        ids, marks = self.traces()
+        if not len(ids):
+            return None
+
+        path = path or os.path.join(TRACE_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.npz")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, ids=ids, marks=marks, stages=np.array(STAGES))
+        log.info(f"{len(ids)} bar traces written to {path}")
+        return path
+
+
+tracer = Tracer()
+
+
+def mark(stage: str, ns: Optional[int] = None):
+    # Stage of the bar traced on this thread, a no-op outside a trace
+    tracer.mark(stage, ns)
+
+
+def load(path: str) -> tuple[np.ndarray, np.ndarray, tuple[str, ...]]:
+    with np.load(path) as data:
+        return data["ids"], data["marks"], tuple(str(s) for s in data["stages"])
+
+
+def stage_stats(marks: np.ndarray, stages: tuple[str, ...] = STAGES) -> dict[str, dict[str, float]]:
+    # Per stage, time since the previous reached stage in ms, and end to end from the exchange to the order response
+    stats = {}
+
+    def add(name: str, values: np.ndarray):
+        if len(values):
+            values = values / 1e6
+            stats[name] = {"n": len(values), "p50_ms": float(np.percentile(values, 50)), "p99_ms": float(np.percentile(values, 99))}
+
+    for i in range(1, len(stages)):
+        reached = marks[:, i] > 0
+        # Latest earlier stage reached by each trace
+        earlier = marks[:, :i].max(axis=1)
+        ok = reached & (earlier > 0)
+        add(stages[i], marks[ok, i] - earlier[ok])
+
+    full = (marks[:, 0] > 0) & (marks[:, -1] > 0)
+    add("total", marks[full, -1] - marks[full, 0])
+    return stats
+
+
+@click.command()
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+def report(paths: tuple[str, ...]):
+    # Per stage p50/p99 over one or more trace dumps, e.g. every file of a session in _traces/
+    parts = [load(path) for path in paths]
+    if not parts:
+        raise click.UsageError("No trace files given")
+
+    marks = np.concatenate([p[1] for p in parts])
+    print(f"{len(marks)} bars, {int((marks[:, STAGES.index('order_sent')] > 0).sum())} orders")
+    print(f"{'stage':<14}{'n':>8}{'p50 ms':>12}{'p99 ms':>12}")
+    for name, s in stage_stats(marks, parts[0][2]).items():
+        print(f"{name:<14}{s['n']:>8}{s['p50_ms']:>12.3f}{s['p99_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    report()
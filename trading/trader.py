@@ -1,5 +1,9 @@
+from typing import Optional
+
 from connector import Connector
 from strategies import Action, ActionType
+from trading.account import AccountState
+from trading.tracing import mark
 
 import logging
 import chime
@@ -12,16 +16,26 @@ log = create_logger(__name__)
 
 
 class Trader:
-    in_position: bool = False
     contract_id: str = None
 
     _connector: Connector = None
+    _account: Optional[AccountState] = None
 
-    def __init__(self, contract_id: str, connector: Connector):
+    def __init__(self, contract_id: str, connector: Connector, account: Optional[AccountState] = None):
         self.contract_id = contract_id
         self._connector = connector
+        self._account = account
+
+    @property
+    def in_position(self) -> bool:
+        # Local user hub state, no REST call
+        return self._account is not None and self._account.in_position(self.contract_id)
+
+    def has_working_orders(self) -> bool:
+        return self._account is not None and bool(self._account.open_orders(self.contract_id))
 
     def execute(self, action: Action):
+        mark("execute")
 
         action_type, stop_price = action.action_type, action.stop
 
@@ -30,6 +44,9 @@ class Trader:
             if action_type == ActionType.CLOSE:
                 print("Closing position")
             pass
+        elif self.has_working_orders():
+            # Entry sent but not filled yet, a second one would double the position
+            log.info(f"Skipping {action_type}, order pending for {self.contract_id}")
         else:
             # OPEN
             if action_type == ActionType.BUY:
@@ -1,62 +1,52 @@
-from asyncio import sleep
 import asyncio
 import logging
-from datetime import datetime, timezone, time, timedelta
-from typing import Union, Optional
+import time as _time
+from typing import Callable, Optional
 
+import pandas as pd
 from signalrcore.hub_connection_builder import HubConnectionBuilder
-from config import MARKET_HUB_URL
+from signalrcore.protocol.messagepack_protocol import MessagePackHubProtocol
+from config import MARKET_HUB_PROTOCOL, MARKET_HUB_URL, TICK_SIZE, USER_HUB_URL
 
-from connector import Connector
+from connector import TIME_UNITS, Connector
+from logger import create_logger
+from trading.account import AccountState
+from trading.candles import Candle, CandleBuilder, tf_nanos
+from trading.ticks import decode_trade, decode_trades
 
+log = create_logger(__name__)
 
-class Websocket:
-    symbol: str
-    last_price: float = None
-    _connector: Connector = None
-    _candles_poped = 0
 
-    def __init__(self, symbol: str, connector: Connector):
-        self.symbol = symbol
-        self._connector = connector
-
-        self.buckets = {i: [] for i in range(20)}
-        self.buckets_set = set()
+class _Hub:
+    hub_url: str
+    protocol: str = "json"  # SignalR hub protocol, "json" or "messagepack"
+    _connector: Connector = None
+    _hub_connection = None
 
     def _login_function(self):
         return self._connector._token
 
-    def set_first_timestamp(self, ts):
-        if not self._first_timestamp:
-            self._first_timestamp = ts
-
-    def _get_bucket_index(self, offset=0) -> int:
-        bucket_now = datetime.now().minute // 3
-        return (bucket_now - offset) % 20
-
-    def pop_bucket(self) -> tuple[Optional[list[float]], int]:
-
-        last_bucket = self._get_bucket_index(offset=1)
+    def _url(self, token: str) -> str:
+        return f"{self.hub_url}?access_token={token}"
 
-        try:
-            self.buckets_set.remove(last_bucket)
-        except KeyError:
-            return None, -1
-
-        data = self.buckets.get(last_bucket)
-        self.buckets[last_bucket] = []
-        self._candles_poped += 1
-        return data, self._candles_poped
+    def _on_token(self, token: str):
+        # Automatic reconnects reuse the transport url and headers, keep both on the current token
+        hub_connection = self._hub_connection
+        if hub_connection is None:
+            return
+        hub_connection.headers["Authorization"] = f"Bearer {token}"
+        hub_connection.transport.url = self._url(token)
 
-    def get_current_bucket(self):
-        current_bucket = self._get_bucket_index(offset=0)
-        return self.buckets[current_bucket]
-
-    def run(self):
-        hub_connection = (
-            HubConnectionBuilder()
+    def _build(self):
+        builder = HubConnectionBuilder()
+        if self.protocol == "messagepack":
+            builder = builder.with_hub_protocol(MessagePackHubProtocol())
+        elif self.protocol != "json":
+            raise ValueError(f"Unknown hub protocol {self.protocol}")
+        return (
+            builder
             .with_url(
-                f"{MARKET_HUB_URL}?access_token={self._login_function()}",
+                self._url(self._login_function()),
                 options={
                     "skip_negotiation": True,
                     "access_token_factory": self._login_function,
@@ -74,20 +64,115 @@ class Websocket:
             .build()
         )
 
-        def handle_trade(data):
-            _symbol, trades = data
 
-            prices = [t["price"] for t in trades]
+class Websocket(_Hub):
+    hub_url = MARKET_HUB_URL
+    symbol: str
+    last_price: float = None
+    last_trade_ns: Optional[int] = None  # exchange time of the newest trade seen
+    candles: CandleBuilder
+
+    def __init__(
+        self,
+        symbol: str,
+        connector: Connector,
+        tf: tuple[int, TIME_UNITS] = (3, TIME_UNITS.Minute),
+        protocol: str = MARKET_HUB_PROTOCOL,
+        tick_size: float = TICK_SIZE,
+    ):
+        self.symbol = symbol
+        self.tf = tf
+        self.protocol = protocol
+        self.tick_size = tick_size
+        self._connector = connector
+        self.candles = CandleBuilder(tf_nanos(tf))
+        self._on_backfill: list[Callable[[list[Candle]], None]] = []
+        self._gap = False
+
+    def set_first_timestamp(self, ts):
+        if not self._first_timestamp:
+            self._first_timestamp = ts
+
+    def on_bar_close(self, callback: Callable[[Candle], None]):
+        self.candles.on_close(callback)
+
+    def on_backfill(self, callback: Callable[[list[Candle]], None]):
+        # Closed bars missed while disconnected, oldest first
+        self._on_backfill.append(callback)
+
+    def current_candle(self) -> Optional[Candle]:
+        return self.candles.current
+
+    def handle_trades(self, trades: list[dict]):
+        # Exchange time decides the bar, the whole message goes through the candles as typed arrays.
+        # Single trade messages, most of them in a quiet market, skip the array setup
+        received = _time.time_ns()
+        if len(trades) == 1:
+            trade = decode_trade(trades[0], self.tick_size)
+            if trade is None:
+                return
+            times, ticks, size = [trade[0]], [trade[1]], [trade[2]]
+        else:
+            times, ticks, size = decode_trades(trades, self.tick_size)
+            if not len(times):
+                return
+
+        if self._gap:
+            self._gap = False
+            self.backfill(int(times[0]))
 
-            bucket = int(trades[0]["timestamp"][14:16]) // 3  # 3 min hardcoded
-            self.buckets_set.add(bucket)
-            self.buckets[bucket].extend(prices)
+        if len(trades) == 1:
+            self.candles.add(times[0], ticks[0] * self.tick_size, size[0], received)
+        else:
+            self.candles.add_batch(times, ticks * self.tick_size, size, received)
 
-            self.last_price = trades[0]["price"]
+        self.last_price = float(ticks[-1]) * self.tick_size
+        self.last_trade_ns = max(self.last_trade_ns or 0, int(times[-1]))
+
+    def backfill(self, first_ns: int):
+        # Trades between `last_trade_ns` and the first one after a reconnect were missed.
+        # Bars from the last seen bucket are fetched with the partial one: closed bars go to the `on_backfill` callbacks,
+        # the partial bar replaces the candle in progress. The fetch ends just before `first_ns`, the trades of the
+        # message from there on are added by the caller and must not be in the partial bar already.
+        # Without a reply, or without a partial bar in it, the live candles continue as they are.
+        # The fetch blocks the hub's receive thread: trades queue up behind it and are merged once it returns
+        if self.last_trade_ns is None:
+            return
+
+        tf_ns = self.candles.tf_ns
+        start = self.last_trade_ns - self.last_trade_ns % tf_ns
+        live = first_ns - first_ns % tf_ns
+
+        retrieve = self._connector.retrieve_bars(self.symbol, self.tf, includePartialBar=True)
+        try:
+            df = retrieve(pd.Timestamp(start, tz="UTC"), pd.Timestamp(first_ns - 1, tz="UTC"))
+        except Exception as e:
+            log.error(f"Backfill after reconnect failed: {e}")
+            return
+
+        bars = [
+            Candle.from_bar(pd.Timestamp(row.time).value, row.open, row.high, row.low, row.close, int(row.volume))
+            for row in df.itertuples()
+        ]
+        bars.sort(key=lambda bar: bar.time)
+        closed = [bar for bar in bars if bar.time < live]
+        partial = next((bar for bar in bars if bar.time == live), None)
+
+        if partial is not None:
+            self.candles.reset(partial)
+        log.info(f"Reconnect gap from {pd.Timestamp(start, tz='UTC')}, {len(closed)} bars backfilled")
+        for callback in self._on_backfill:
+            callback(closed)
+
+    def run(self):
+        hub_connection = self._build()
+
+        def handle_trade(data):
+            _symbol, trades = data
+            self.handle_trades(trades)
 
         def subscribe():
             hub_connection.send("SubscribeContractTrades", [self.symbol])
-            hub_connection.on("GatewayTrade", handle_trade)
 
         def on_open():
             print("WS connection opened and handshake received ready to send messages")
@@ -95,18 +180,84 @@ class Websocket:
 
         def on_reconnect():
             print("WS reconnected")
+            # Handlers survive the reconnect, only the subscription is renewed
+            self._gap = True
             subscribe()
 
+        hub_connection.on("GatewayTrade", handle_trade)
+
         hub_connection.on_open(on_open)
 
         hub_connection.on_reconnect(on_reconnect)
         hub_connection.on_close(lambda e: print(f"rad connection closed -> {e}"))
         hub_connection.on_error(lambda e: print(f"rad err -> {e}"))
 
+        self._hub_connection = hub_connection
+        self._connector.on_token(self._on_token)
+
+        hub_connection.start()
+        self.candles.start_clock()
+
+        return self
+
+    def stop(self):
+        self.candles.stop()
+        if self._hub_connection:
+            self._hub_connection.stop()
+
+
+def _payload(data) -> dict:
+    # Handlers get the event arguments as a list, user hub events carry one object
+    return data[0] if isinstance(data, list) else data
+
+
+# Order, position and trade events of our account into `AccountState`, so trading decisions need no REST round trip
+class UserHub(_Hub):
+    hub_url = USER_HUB_URL
+    account: AccountState
+
+    def __init__(self, connector: Connector, account: Optional[AccountState] = None, connection=None):
+        self._connector = connector
+        self.account = account or AccountState()
+        self._connection = connection  # prebuilt hub connection, e.g. a local stand-in
+
+    def run(self):
+        hub_connection = self._connection or self._build()
+        account_id = int(self._connector._account_id)
+
+        def subscribe():
+            hub_connection.send("SubscribeAccounts", [])
+            hub_connection.send("SubscribeOrders", [account_id])
+            hub_connection.send("SubscribePositions", [account_id])
+            hub_connection.send("SubscribeTrades", [account_id])
+            # Subscribed before the snapshot, so nothing falls between the two
+            try:
+                self.account.seed(self._connector.get_open_orders(), self._connector.get_open_positions())
+            except Exception as e:
+                log.error(f"Account snapshot failed: {e}")
+
+        hub_connection.on("GatewayUserOrder", lambda data: self.account.apply_order(_payload(data)))
+        hub_connection.on("GatewayUserPosition", lambda data: self.account.apply_position(_payload(data)))
+        hub_connection.on("GatewayUserTrade", lambda data: self.account.apply_trade(_payload(data)))
+
+        hub_connection.on_open(subscribe)
+        hub_connection.on_reconnect(subscribe)
+        # signalrcore calls on_close without arguments, on_error with the error message
+        hub_connection.on_close(lambda: log.warning("User hub closed"))
+        hub_connection.on_error(lambda e: log.error(f"User hub error: {e}"))
+
+        self._hub_connection = hub_connection
+        if self._connection is None:
+            self._connector.on_token(self._on_token)
+
         hub_connection.start()
 
         return self
 
+    def stop(self):
+        if self._hub_connection:
+            self._hub_connection.stop()
+
 
 if __name__ == "__main__":
     Websocket("CON.F.US.EP.M25", Connector()).run()